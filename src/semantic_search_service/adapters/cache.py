@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import numpy as np
+import psycopg
+from psycopg import sql
+from pydantic import BaseModel
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.psql_repo import ARTICLES_WRITTEN_CHANNEL
+from semantic_search_service.domain.search import SearchPage
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    entries: int
+    size_bytes: int
+    hit_rate: float
+
+
+class LRUCache:
+    """LRU cache bounded by entry count and approximate memory, with per-entry TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self._clock() + self.ttl_seconds, size, value)
+        self._size_bytes += size
+        while len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def stats(self) -> CacheStats:
+        lookups = self.hits + self.misses
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            entries=len(self._entries),
+            size_bytes=self._size_bytes,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+        )
+
+    def _sizeof(self, value: Any) -> int:
+        return sys.getsizeof(value)
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size_bytes -= size
+
+
+class EmbeddingCache(LRUCache):
+    def put(self, key: Hashable, value: np.ndarray) -> None:
+        # Read-only so callers can't corrupt a vector shared between requests
+        value.flags.writeable = False
+        super().put(key, value)
+
+    def _sizeof(self, value: np.ndarray) -> int:
+        return value.nbytes
+
+
+class SearchResultCache(LRUCache):
+    """Caches search responses until the next article write.
+
+    Every write bumps ``generation``. Searches read the generation before querying Postgres and pass
+    it to ``put``, so results computed concurrently with a write are never stored. Writes made by this
+    process invalidate it directly; ``run_result_cache_invalidation`` does it for the writes of every
+    other process, and without it entries of other processes' writes live until their TTL expires.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.generation = 0
+
+    def put(self, key: Hashable, value: SearchPage, generation: int | None = None) -> None:
+        if generation is not None and generation != self.generation:
+            return
+        super().put(key, value.model_copy(deep=True))
+
+    def get(self, key: Hashable) -> SearchPage | None:
+        value = super().get(key)
+        return value.model_copy(deep=True) if value is not None else None
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.clear()
+
+    def _sizeof(self, value: SearchPage) -> int:
+        return sum(
+            sys.getsizeof(article.title) + sys.getsizeof(article.excerpt) + sys.getsizeof(article.body)
+            for article in value.results
+        )
+
+
+async def run_result_cache_invalidation(
+    result_cache: SearchResultCache,
+    conn_info: str,
+    stop: asyncio.Event,
+    poll_seconds: float = settings.RESULT_CACHE_POLL_SECONDS,
+    replica_lag_seconds: float = 0,
+) -> None:
+    """Invalidate ``result_cache`` on every article write, from any process, until ``stop`` is set.
+
+    Writes are seen through the notification each write statement sends, set up with the schema, so other API workers, CLI
+    imports and embedding workers reach this cache too. With ``replica_lag_seconds``, the cache is
+    invalidated once more after that long, dropping results read from a replica that was still behind.
+    """
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        try:
+            async with await psycopg.AsyncConnection.connect(conn_info, autocommit=True) as conn:
+                await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(ARTICLES_WRITTEN_CHANNEL)))
+                # Notifications may have been missed while disconnected
+                result_cache.invalidate()
+                while not stop.is_set():
+                    if not [notify async for notify in conn.notifies(timeout=poll_seconds, stop_after=1)]:
+                        continue
+                    # Drain whatever else is already buffered, so a bulk write invalidates once
+                    async for _ in conn.notifies(timeout=0):
+                        pass
+                    result_cache.invalidate()
+                    if replica_lag_seconds > 0:
+                        loop.call_later(replica_lag_seconds, result_cache.invalidate)
+        except Exception:
+            logger.exception("Result cache invalidation listener failed, reconnecting")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+def normalize_query(user_query: str) -> str:
+    # Both served models use lower-cased tokenizers, so case and spacing don't change the embedding
+    return " ".join(user_query.split()).casefold()
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+
+import numpy as np
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.metrics import encoder_batch_seconds, encoder_batch_size
+from semantic_search_service.domain.models import Model, check_model_enabled, get_model
+
+
+@dataclass
+class _PendingRequest:
+    texts: list[str]
+    future: asyncio.Future
+
+
+class BatchEncoder:
+    """Runs ``model.encode`` in a worker pool, coalescing concurrent calls into one batch.
+
+    Requests arriving within ``max_wait_ms`` of each other are encoded together. A batch is
+    dispatched early as soon as ``max_batch_size`` texts are pending. Given ``load_model`` instead of
+    ``model``, the model is loaded by the first batch, in the worker pool rather than on the event loop.
+    """
+
+    def __init__(
+        self,
+        model: Any = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5,
+        executor: Executor | None = None,
+        name: str = "default",
+        load_model: Callable[[], Any] | None = None,
+    ) -> None:
+        self.model = model
+        self.load_model = load_model
+        self._load_lock = threading.Lock()
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="encoder")
+        self._pending: list[_PendingRequest] = []
+        self._pending_size = 0
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def encode(self, texts: str | list[str]) -> np.ndarray:
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if not batch:
+            return np.empty((0, 0), dtype=np.float32)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingRequest(texts=batch, future=future))
+        self._pending_size += len(batch)
+        if self._pending_size >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        embeddings = await future
+        return embeddings[0] if single else embeddings
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        requests, self._pending, self._pending_size = self._pending, [], 0
+        if not requests:
+            return
+        task = asyncio.ensure_future(self._run_batch(requests))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, requests: list[_PendingRequest]) -> None:
+        texts = [text for request in requests for text in request.texts]
+        loop = asyncio.get_running_loop()
+        encoder_batch_size.observe(len(texts), model=self.name)
+        started_at = time.perf_counter()
+        try:
+            embeddings = await loop.run_in_executor(self.executor, self._encode_sync, texts)
+        except Exception as exc:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(exc)
+            return
+        finally:
+            encoder_batch_seconds.observe(time.perf_counter() - started_at, model=self.name)
+
+        offset = 0
+        for request in requests:
+            size = len(request.texts)
+            if not request.future.done():
+                request.future.set_result(embeddings[offset:offset + size])
+            offset += size
+
+    def _encode_sync(self, texts: list[str]) -> np.ndarray:
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    self.model = self.load_model()
+        return self.model.encode(texts, batch_size=self.max_batch_size)
+
+    async def close(self) -> None:
+        self._flush()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+
+_encoders: dict[Model, BatchEncoder] = {}
+
+
+def get_encoder(model: Model) -> BatchEncoder:
+    model = Model(model)
+    if model not in _encoders:
+        # Checked here so a disabled model fails the request at once; loading waits for the first batch
+        check_model_enabled(model)
+        _encoders[model] = BatchEncoder(
+            load_model=partial(get_model, model),
+            max_batch_size=settings.ENCODER_MAX_BATCH_SIZE,
+            max_wait_ms=settings.ENCODER_MAX_WAIT_MS,
+            executor=ThreadPoolExecutor(max_workers=settings.ENCODER_WORKERS, thread_name_prefix=f"encoder-{model}"),
+            name=str(model),
+        )
+    return _encoders[model]
+
+
+async def close_encoders() -> None:
+    while _encoders:
+        _, encoder = _encoders.popitem()
+        await encoder.close()
@@ -0,0 +1,382 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import psycopg
+from psycopg import sql
+from psycopg_pool import AsyncConnectionPool
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import SearchResultCache
+from semantic_search_service.adapters.metrics import timed
+from semantic_search_service.adapters.psql_repo import ARTICLE_CHANGES_CHANNEL, PSQLRepo
+from semantic_search_service.adapters.replicas import ReplicaPools
+from semantic_search_service.domain.articles import EmbeddingField
+from semantic_search_service.domain.models import Model, model_dimensions
+from semantic_search_service.domain.search import ResultField, SearchOptions
+
+logger = logging.getLogger(__name__)
+
+
+class _IndexData:
+    """Row-aligned arrays for every article: ids, dates, result columns and one embedding matrix per
+    model and field. Embeddings are normalized on insert, so cosine distance is ``1 - matrix @ query``.
+
+    Deleting an article moves the last row into its slot, keeping the arrays dense.
+    """
+
+    def __init__(self, models: list[Model], mmap_dir: Path | None = None) -> None:
+        self.models = models
+        self.mmap_dir = mmap_dir
+        self.size = 0
+        self.capacity = 0
+        self.positions: dict[int, int] = {}
+        self.ids = np.empty(0, dtype=np.int64)
+        self.created_at = np.empty(0, dtype="datetime64[us]")
+        self.updated_at = np.empty(0, dtype="datetime64[us]")
+        self.columns: dict[ResultField, list] = {_field: [] for _field in ResultField}
+        self.matrices = {
+            (_model, _field): self._allocate(0, model_dimensions[_model]) for _model in models for _field in EmbeddingField
+        }
+        self.present = {_key: np.zeros(0, dtype=bool) for _key in self.matrices}
+
+    def _allocate(self, rows: int, dimensions: int) -> np.ndarray:
+        if self.mmap_dir is None or rows == 0:
+            return np.zeros((rows, dimensions), dtype=np.float32)
+        # Page-cache backed, so the kernel can evict cold rows; unlinked right away, the mapping keeps it alive
+        fd, path = tempfile.mkstemp(suffix=".f32", dir=self.mmap_dir)
+        os.close(fd)
+        matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(rows, dimensions))
+        os.unlink(path)
+        return matrix
+
+    def copy(self) -> "_IndexData":
+        """A copy to change while searches keep reading this one, which is never written to again."""
+        data = _IndexData(self.models, self.mmap_dir)
+        data.size, data.capacity = self.size, self.capacity
+        data.positions = dict(self.positions)
+        data.ids, data.created_at, data.updated_at = self.ids.copy(), self.created_at.copy(), self.updated_at.copy()
+        data.columns = {_field: list(values) for _field, values in self.columns.items()}
+        for key, matrix in self.matrices.items():
+            data.matrices[key] = self._allocate(self.capacity, matrix.shape[1])
+            data.matrices[key][:self.size] = matrix[:self.size]
+            data.present[key] = self.present[key].copy()
+        return data
+
+    def _grow(self) -> None:
+        capacity = max(1024, self.capacity * 2)
+        self.ids = _resized(self.ids, capacity)
+        self.created_at = _resized(self.created_at, capacity)
+        self.updated_at = _resized(self.updated_at, capacity)
+        for key, matrix in self.matrices.items():
+            grown = self._allocate(capacity, matrix.shape[1])
+            grown[:self.size] = matrix[:self.size]
+            self.matrices[key] = grown
+            self.present[key] = _resized(self.present[key], capacity)
+        self.capacity = capacity
+
+    def upsert(self, row: dict) -> None:
+        position = self.positions.get(row["id"])
+        if position is None:
+            if self.size == self.capacity:
+                self._grow()
+            position = self.size
+            self.size += 1
+            self.positions[row["id"]] = position
+            for values in self.columns.values():
+                values.append(None)
+        self.ids[position] = row["id"]
+        self.created_at[position] = _to_datetime64(row["created_at"])
+        self.updated_at[position] = _to_datetime64(row["updated_at"])
+        for _field, values in self.columns.items():
+            values[position] = row[_field]
+        for (model, _field), matrix in self.matrices.items():
+            embedding = row[_field.column(model)]
+            self.present[(model, _field)][position] = embedding is not None
+            matrix[position] = _normalize(np.asarray(embedding, dtype=np.float32)) if embedding is not None else 0
+
+    def delete(self, article_id: int) -> None:
+        position = self.positions.pop(article_id, None)
+        if position is None:
+            return
+        last = self.size - 1
+        if position != last:
+            self.positions[int(self.ids[last])] = position
+            for array in (self.ids, self.created_at, self.updated_at, *self.present.values()):
+                array[position] = array[last]
+            for matrix in self.matrices.values():
+                matrix[position] = matrix[last]
+            for values in self.columns.values():
+                values[position] = values[last]
+        for values in self.columns.values():
+            values.pop()
+        self.size = last
+
+    def candidates(self, model: Model, options: SearchOptions) -> np.ndarray:
+        """Boolean mask of the rows that have an embedding and pass the created/updated filters."""
+        mask = self.present[(model, options.field)][:self.size].copy()
+        for dates, operator, option in (
+            (self.created_at, np.greater_equal, "created_after"),
+            (self.created_at, np.less, "created_before"),
+            (self.updated_at, np.greater_equal, "updated_after"),
+            (self.updated_at, np.less, "updated_before"),
+        ):
+            value = getattr(options, option)
+            if value is not None:
+                mask &= operator(dates[:self.size], _to_datetime64(value))
+        return mask
+
+    def top_k(self, distances: np.ndarray, mask: np.ndarray, limit: int) -> np.ndarray:
+        """Positions of the ``limit`` smallest masked distances, ordered by (distance, id) like the SQL."""
+        positions = np.flatnonzero(mask)
+        if len(positions) > limit:
+            positions = positions[np.argpartition(distances[positions], limit - 1)[:limit]]
+        return positions[np.lexsort((self.ids[positions], distances[positions]))]
+
+    def rows(self, positions: np.ndarray, distances: np.ndarray, fields: list[ResultField]) -> list[dict]:
+        return [
+            {
+                "id": int(self.ids[position]),
+                "score": 1 - float(distances[position]),
+                "distance": float(distances[position]),
+                **{str(_field): self.columns[_field][position] for _field in fields},
+            }
+            for position in positions
+        ]
+
+
+class InMemoryVectorIndex:
+    """Exact cosine kNN over an in-process copy of the articles' embeddings.
+
+    Searches and updates run in worker threads, so the event loop is never blocked by a matrix product.
+    Updates are copy-on-write: they change a copy of the arrays and swap it in, so searches only hold the
+    lock to take the current copy and never see a half-applied change. Until the swap, both copies are
+    in memory.
+    """
+
+    def __init__(self, models: Iterable[Model | str], mmap_dir: Path | None = None) -> None:
+        self.models = [Model(_model) for _model in models]
+        self.mmap_dir = mmap_dir
+        self.loaded = asyncio.Event()
+        # Guards the swap of ``_data``; ``_write_lock`` keeps concurrent updates from dropping each other
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._data = _IndexData(self.models, mmap_dir)
+
+    @property
+    def size(self) -> int:
+        return self._data.size
+
+    def serves(self, model: Model) -> bool:
+        return self.loaded.is_set() and Model(model) in self.models
+
+    async def load(self, repo: PSQLRepo, chunk_size: int = 1000) -> None:
+        """Build a fresh copy from Postgres and swap it in; searches keep using the old one meanwhile."""
+        data = _IndexData(self.models, self.mmap_dir)
+        async for rows in repo.iter_index_rows(self.models, chunk_size):
+            await asyncio.to_thread(_upsert_all, data, rows)
+        await asyncio.to_thread(self._swap, data)
+        self.loaded.set()
+        logger.info("Loaded %d articles into the in-memory index", data.size)
+
+    async def apply(self, article_ids: Iterable[int], rows: list[dict]) -> None:
+        """Upsert ``rows`` and delete the ``article_ids`` that have no row anymore."""
+        await asyncio.to_thread(self._apply, set(article_ids), rows)
+
+    def _apply(self, article_ids: set[int], rows: list[dict]) -> None:
+        with self._write_lock:
+            data = self._snapshot().copy()
+            _upsert_all(data, rows)
+            for article_id in article_ids - {row["id"] for row in rows}:
+                data.delete(article_id)
+            with self._lock:
+                self._data = data
+
+    def _swap(self, data: _IndexData) -> None:
+        with self._write_lock, self._lock:
+            self._data = data
+
+    def _snapshot(self) -> _IndexData:
+        with self._lock:
+            return self._data
+
+    async def search(
+        self, user_query_embedding: np.ndarray, model: Model, options: SearchOptions
+    ) -> list[dict]:
+        return await asyncio.to_thread(self._search, user_query_embedding, Model(model), options)
+
+    def _search(self, user_query_embedding: np.ndarray, model: Model, options: SearchOptions) -> list[dict]:
+        data = self._snapshot()
+        matrix = data.matrices[(model, options.field)][:data.size]
+        # float64, so a cursor's distance compares equal to the recomputed one on the next page
+        distances = 1 - (matrix @ _normalize(np.asarray(user_query_embedding, dtype=np.float32))).astype(np.float64)
+        mask = data.candidates(model, options)
+        after = options.after
+        if after is not None:
+            after_distance, after_id = after
+            ids = data.ids[:data.size]
+            mask &= (distances > after_distance) | ((distances == after_distance) & (ids > after_id))
+        return data.rows(data.top_k(distances, mask, options.limit), distances, options.result_fields)
+
+    async def batch_search(
+        self, user_query_embeddings: list[np.ndarray], model: Model, options: SearchOptions
+    ) -> list[list[dict]]:
+        return await asyncio.to_thread(self._batch_search, user_query_embeddings, Model(model), options)
+
+    def _batch_search(
+        self, user_query_embeddings: list[np.ndarray], model: Model, options: SearchOptions
+    ) -> list[list[dict]]:
+        data = self._snapshot()
+        matrix = data.matrices[(model, options.field)][:data.size]
+        queries = _normalize(np.asarray(user_query_embeddings, dtype=np.float32))
+        distances = 1 - (queries @ matrix.T).astype(np.float64)
+        mask = data.candidates(model, options)
+        results = []
+        for query_distances in distances:
+            rows = data.rows(data.top_k(query_distances, mask, options.limit), query_distances, options.result_fields)
+            results.append([{_key: _value for _key, _value in row.items() if _key != "distance"} for row in rows])
+        return results
+
+
+class InMemoryRepo(PSQLRepo):
+    """``PSQLRepo`` answering semantic searches from an ``InMemoryVectorIndex``.
+
+    Writes, exports and the multi-field, hybrid and chunk modes still go to Postgres, as do searches for
+    models the index doesn't hold or before it has loaded. Searches are exact, so ef_search and probes
+    are ignored.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        db_name: str,
+        index: InMemoryVectorIndex,
+        prepare: bool = settings.DB_PREPARE_STATEMENTS,
+        replicas: ReplicaPools | None = None,
+    ) -> None:
+        super().__init__(pool, db_name, prepare, replicas=replicas)
+        self.index = index
+
+    async def semantic_search_articles(
+        self, user_query_embedding: np.ndarray[np.float32], model: Model, options: SearchOptions | None = None
+    ) -> list[dict]:
+        options = options or SearchOptions()
+        if not self.index.serves(model):
+            return await super().semantic_search_articles(user_query_embedding, model, options)
+        with timed("memory_search"):
+            return await self.index.search(user_query_embedding, model, options)
+
+    async def batch_semantic_search_articles(
+        self, user_query_embeddings: list[np.ndarray[np.float32]], model: Model, options: SearchOptions | None = None
+    ) -> list[list[dict]]:
+        options = options or SearchOptions()
+        if not self.index.serves(model):
+            return await super().batch_semantic_search_articles(user_query_embeddings, model, options)
+        with timed("memory_search"):
+            return await self.index.batch_search(user_query_embeddings, model, options)
+
+
+async def run_index_sync(
+    repo: PSQLRepo,
+    index: InMemoryVectorIndex,
+    conn_info: str,
+    stop: asyncio.Event,
+    batch_size: int = settings.MEMORY_INDEX_SYNC_BATCH_SIZE,
+    poll_seconds: float = settings.MEMORY_INDEX_POLL_SECONDS,
+    result_cache: SearchResultCache | None = None,
+) -> None:
+    """Load ``index`` and keep it in step with the articles table until ``stop`` is set.
+
+    The LISTEN starts before the load, so writes made while loading are applied afterwards rather than
+    lost. Notifications may have been missed while disconnected, so every reconnect reloads in full.
+    A failure before the first load completes is raised, so startup fails instead of waiting on it.
+    """
+    while not stop.is_set():
+        try:
+            async with await psycopg.AsyncConnection.connect(conn_info, autocommit=True) as conn:
+                await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(ARTICLE_CHANGES_CHANNEL)))
+                await index.load(repo)
+                if result_cache is not None:
+                    result_cache.invalidate()
+                while not stop.is_set():
+                    article_ids: set[int] = set()
+                    async for notify in conn.notifies(timeout=poll_seconds, stop_after=1):
+                        article_ids.update(_notified_ids(notify.payload))
+                    if not article_ids:
+                        continue
+                    # Drain whatever else is already buffered, so bulk writes are fetched in batches
+                    async for notify in conn.notifies(timeout=0):
+                        article_ids.update(_notified_ids(notify.payload))
+                        if len(article_ids) >= batch_size:
+                            break
+                    await index.apply(article_ids, await repo.select_index_rows(sorted(article_ids), index.models))
+                    if result_cache is not None:
+                        result_cache.invalidate()
+        except Exception:
+            if not index.loaded.is_set():
+                raise
+            logger.exception("In-memory index sync failed, reconnecting")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def wait_until_loaded(
+    index: InMemoryVectorIndex,
+    index_sync: asyncio.Task,
+    stop: asyncio.Event,
+    timeout: float = settings.MEMORY_INDEX_LOAD_TIMEOUT_SECONDS,
+) -> None:
+    """Wait for the first load of ``index`` by ``index_sync``, raising the sync's error if it fails first.
+
+    On failure or timeout, ``stop`` is set and the sync is cancelled.
+    """
+    loaded = asyncio.create_task(index.loaded.wait())
+    await asyncio.wait({loaded, index_sync}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    if index.loaded.is_set():
+        return
+    loaded.cancel()
+    stop.set()
+    if not index_sync.done():
+        index_sync.cancel()
+        raise TimeoutError(f"The in-memory index didn't load within {timeout:g}s")
+    index_sync.result()
+    raise RuntimeError("The in-memory index sync stopped before loading the index")
+
+
+def _notified_ids(payload: str) -> list[int]:
+    return [int(article_id) for article_id in payload.split(",")]
+
+
+def _upsert_all(data: _IndexData, rows: list[dict]) -> None:
+    for row in rows:
+        data.upsert(row)
+
+
+def _resized(array: np.ndarray, capacity: int) -> np.ndarray:
+    resized = np.zeros(capacity, dtype=array.dtype) if array.dtype == bool else np.empty(capacity, dtype=array.dtype)
+    resized[:len(array)] = array
+    return resized
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _to_datetime64(value: datetime | str | None) -> np.datetime64:
+    if value is None:
+        return np.datetime64("NaT", "us")
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        # The columns are naive TIMESTAMPs written in UTC
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "us")
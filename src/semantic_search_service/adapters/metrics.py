@@ -0,0 +1,109 @@
+"""Latency histograms rendered in the Prometheus text format.
+
+The service only needs histograms and a few gauges, so they are implemented here rather than adding
+prometheus_client. Observations are made from the event loop thread, so no locking is needed.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class _Series:
+    __slots__ = ("bucket_counts", "sum", "count")
+
+    def __init__(self, buckets: int) -> None:
+        # One slot per bucket plus the +Inf overflow
+        self.bucket_counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[_name]) for _name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(len(self.buckets))
+        series.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip((*map(_format_value, self.buckets), "+Inf"), series.bucket_counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series.count}")
+        return "\n".join(lines) + "\n"
+
+
+def render_gauge(name: str, documentation: str, samples: list[tuple[dict[str, str], float]]) -> str:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{_name}="{str(_value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for _name, _value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+search_stage_seconds = Histogram(
+    "search_stage_seconds", "Time spent in each stage of a search request.", ("stage",)
+)
+encoder_batch_size = Histogram(
+    "encoder_batch_size", "Texts per model.encode call.", ("model",), buckets=SIZE_BUCKETS
+)
+encoder_batch_seconds = Histogram("encoder_batch_seconds", "Duration of model.encode calls.", ("model",))
+
+histograms = [search_stage_seconds, encoder_batch_size, encoder_batch_seconds]
+
+# Stage durations of the current request, reported in its Server-Timing header
+request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    search_stage_seconds.observe(seconds, stage=stage)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started_at)
@@ -1,31 +1,93 @@
 import asyncio
-from typing import LiteralString
+import re
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, LiteralString
 import sys
 
 import numpy as np
 import psycopg
 from psycopg import sql
+from psycopg.rows import dict_row
 from psycopg_pool import AsyncConnectionPool
 from pgvector.psycopg import register_vector_async
 
-from src.semantic_search_service.domain.articles import ArticleWithEmbeddings, Article, ArticlePatch, \
-    ArticlePatchWithEmbeddings
+from semantic_search_service import settings
+from semantic_search_service.adapters.metrics import record_stage, timed
+from semantic_search_service.adapters.replicas import PRIMARY_LSN_QUERY, ReplicaPools
+from semantic_search_service.domain.articles import Article, ArticlePatchWithEmbeddings, ArticleWithEmbeddings, \
+    EmbeddingField, content_hash
+from semantic_search_service.domain.chunks import ChunkAggregation, chunk_column
+from semantic_search_service.domain.models import EmbeddingDimensionMismatch, Model, model_dimensions
+from semantic_search_service.domain.search import IndexMethod, SearchOptions, FusionMethod, Quantization, \
+    ResultField
 
+# Reciprocal rank fusion constant, the value from the original RRF paper
+RRF_K = 60
+# pgvector's default and maximum hnsw.ef_search
+DEFAULT_EF_SEARCH = 40
+MAX_EF_SEARCH = 1000
+# pgvector's default ivfflat.probes
+DEFAULT_IVFFLAT_PROBES = 1
 
-async def config_pool(conn) -> None:
+# Distance operator and operator class of the index over each quantized expression
+QUANTIZATION_OPERATORS = {
+    Quantization.NONE: ("<=>", "vector_cosine_ops"),
+    Quantization.HALFVEC: ("<=>", "halfvec_cosine_ops"),
+    Quantization.BINARY: ("<~>", "bit_hamming_ops"),
+}
+
+# NOTIFY channel carrying the comma-separated ids of inserted, updated or deleted articles
+ARTICLE_CHANGES_CHANNEL = "article_changes"
+# NOTIFY channel with one empty notification per statement that writes articles
+ARTICLES_WRITTEN_CHANNEL = "articles_written"
+
+ENQUEUE_EMBEDDING_JOB_QUERY: LiteralString = """
+    INSERT INTO embedding_jobs (article_id, model) VALUES (%s, %s)
+    ON CONFLICT (article_id, model) DO UPDATE SET
+        status = 'pending', attempts = 0, error = NULL, locked_until = NULL, updated_at = now()
+"""
+
+
+async def create_vector_extension(conn_info: str) -> None:
+    """Install pgvector once, before the pool opens; ``config_pool`` needs its types to exist."""
+    async with await psycopg.AsyncConnection.connect(conn_info, autocommit=True) as conn:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+
+async def config_pool(conn: psycopg.AsyncConnection) -> None:
     await register_vector_async(conn)
+    if not settings.DB_PREPARE_STATEMENTS:
+        # Behind a transaction-pooling proxy, server-side prepared statements don't survive between transactions
+        conn.prepare_threshold = None
 
 
 class PSQLRepo:
-    def __init__(self, pool: AsyncConnectionPool, db_name: str) -> None:
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        db_name: str,
+        prepare: bool = settings.DB_PREPARE_STATEMENTS,
+        quantization: Quantization = Quantization(settings.SEARCH_QUANTIZATION),
+        replicas: ReplicaPools | None = None,
+    ) -> None:
+        # The primary's pool, for writes and the reads they depend on
         self.pool = pool
         self.db_name = db_name
+        # Passed to execute() for the fixed read queries, so they are planned once per connection
+        self.prepare = prepare
+        self.quantization = quantization
+        # Searches, article lookups and exports read from these when set
+        self.replicas = replicas
+        # The text search configuration search_vector was built with, looked up on the first hybrid search
+        self.text_search_config: str | None = None
 
     async def select_article_by_id(self, article_id: int) -> Article | None:
         query: LiteralString = """SELECT (title, excerpt, body, updated_at, created_at) FROM articles WHERE id=%s"""
-        async with self.pool.connection() as conn:
+        async with self._read_connection() as conn:
             async with conn.cursor() as cur:
-                await cur.execute(query, (article_id,))
+                await cur.execute(query, (article_id,), prepare=self.prepare)
                 raw_article = await cur.fetchone()
                 if not raw_article:
                     return None
@@ -38,17 +100,22 @@ class PSQLRepo:
                     created_at=raw_article[4],
                 )
 
-    async def insert_new_article(self, article: ArticleWithEmbeddings) -> int:
-        article_dict = article.model_dump(exclude_none=True)
+    async def insert_new_article(
+        self, article: Article | ArticleWithEmbeddings, model: Model, enqueue_embeddings: bool = False
+    ) -> int:
+        """Insert ``article``; with ``enqueue_embeddings``, queue a job for ``model``'s embeddings in the same transaction."""
+        article_dict = self._with_embedding_columns(article.model_dump(exclude_none=True), model)
 
         query = sql.SQL("INSERT INTO articles ({}) VALUES ({}) RETURNING id").format(
         sql.SQL(', ').join(map(sql.Identifier, article_dict.keys())),
             sql.SQL(', ').join(map(sql.Placeholder, article_dict.keys())),
         )
-        async with self.pool.connection() as conn:
+        async with self._write_connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(query, article_dict)
                 inserted_id = await cur.fetchone()
+                if enqueue_embeddings:
+                    await cur.execute(ENQUEUE_EMBEDDING_JOB_QUERY, (inserted_id[0], model))
             await conn.commit()
             return inserted_id
 
@@ -56,15 +123,26 @@ class PSQLRepo:
         query: LiteralString = """
             DELETE FROM articles WHERE id=%s RETURNING id
         """
-        async with self.pool.connection() as conn:
+        async with self._write_connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(query, (article_id,))
                 deleted_id = await cur.fetchone()
             await conn.commit()
             return deleted_id
 
-    async def patch_article_by_id(self, article_id: int, article: ArticlePatchWithEmbeddings) -> Article | None:
-        article_dict = article.model_dump(exclude_none=True)
+    async def patch_article_by_id(
+        self, article_id: int, article: ArticlePatchWithEmbeddings, model: Model, enqueue_embeddings: bool = False
+    ) -> Article | None:
+        """Patch an article; with ``enqueue_embeddings``, changed text queues a job for ``model``'s embeddings.
+
+        Until the job runs, searches keep using ``model``'s previous embeddings of the article.
+        """
+        article_dict = self._with_embedding_columns(article.model_dump(exclude_none=True), model)
+        text_changed = any(_field in article_dict for _field in EmbeddingField)
+        # Embeddings of the other models no longer match the new text; the backfill recomputes them
+        for _field in EmbeddingField:
+            if _field in article_dict:
+                article_dict.update({_field.column(_other): None for _other in Model if _other != model})
         if "updated_at" not in article_dict:
             # THIS IS SATAN. FIX IT LATER
             article_dict["updated_at"] = "NOW()"
@@ -78,10 +156,12 @@ class PSQLRepo:
             sql.Placeholder("id")
         )
         article_dict["id"] = article_id
-        async with self.pool.connection() as conn:
+        async with self._write_connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(query, article_dict)
                 res = await cur.fetchone()
+                if res and enqueue_embeddings and text_changed:
+                    await cur.execute(ENQUEUE_EMBEDDING_JOB_QUERY, (article_id, model))
             await conn.commit()
             if not res:
                 return None
@@ -94,6 +174,138 @@ class PSQLRepo:
             )
 
 
+    async def insert_articles(
+        self, articles: list[Article] | list[ArticleWithEmbeddings], model: Model, enqueue_embeddings: bool = False
+    ) -> list[int]:
+        """Insert ``articles`` with one statement and return their ids in order.
+
+        Articles without embeddings are inserted without vectors; with ``enqueue_embeddings`` a job for
+        ``model`` is queued for each of them in the same transaction.
+        """
+        with_embeddings = all(isinstance(article, ArticleWithEmbeddings) for article in articles)
+        if not with_embeddings and not enqueue_embeddings:
+            raise ValueError("Articles inserted without embeddings must queue them with enqueue_embeddings")
+        for article in articles:
+            self._check_dimensions(article.model_dump(), model)
+        embedding_fields = list(EmbeddingField) if with_embeddings else []
+        columns = [*EmbeddingField, "created_at", "updated_at", *(_field.attribute for _field in embedding_fields)]
+        query = sql.SQL(
+            "INSERT INTO articles (title, excerpt, body, created_at, updated_at{embedding_columns}) "
+            "SELECT title, excerpt, body, COALESCE(created_at, CURRENT_TIMESTAMP), "
+            "COALESCE(updated_at, CURRENT_TIMESTAMP){embeddings} "
+            "FROM unnest({arrays}) WITH ORDINALITY AS v({columns}, position) ORDER BY position RETURNING id"
+        ).format(
+            embedding_columns=sql.SQL("").join(
+                sql.SQL(", {}, {}").format(
+                    sql.Identifier(_field.column(model)), sql.Identifier(_field.embedding_hash_column(model))
+                )
+                for _field in embedding_fields
+            ),
+            embeddings=sql.SQL("").join(
+                sql.SQL(", {}, md5({})").format(sql.Identifier(_field.attribute), sql.Identifier(_field))
+                for _field in embedding_fields
+            ),
+            arrays=sql.SQL(", ").join(
+                sql.SQL("{}::{}").format(sql.Placeholder(_column), sql.SQL(_type))
+                for _column, _type in zip(
+                    columns, ["text[]"] * 3 + ["timestamp[]"] * 2 + ["vector[]"] * len(embedding_fields)
+                )
+            ),
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        )
+        params = {_column: [getattr(article, _column) for article in articles] for _column in columns}
+        async with self._write_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                # Ids come from the sequence in insertion order, which follows the ORDER BY
+                inserted_ids = sorted(row[0] for row in await cur.fetchall())
+                if enqueue_embeddings:
+                    await cur.executemany(ENQUEUE_EMBEDDING_JOB_QUERY, [(_id, model) for _id in inserted_ids])
+            await conn.commit()
+        return inserted_ids
+
+    async def patch_articles(
+        self, patches: dict[int, ArticlePatchWithEmbeddings], model: Model, enqueue_embeddings: bool = False
+    ) -> dict[int, Article]:
+        """Apply every patch with one UPDATE, like ``patch_article_by_id`` does for a single article.
+
+        Text fields left unset keep their value and embeddings. A changed field takes the patch's ``model``
+        embedding, or keeps the previous one until the queued job runs, and loses the other models'.
+        """
+        for patch in patches.values():
+            self._check_dimensions(patch.model_dump(), model)
+        columns = ["id", *EmbeddingField, "created_at", "updated_at", *(_field.attribute for _field in EmbeddingField)]
+        types = ["int[]"] + ["text[]"] * 3 + ["timestamp[]"] * 2 + ["vector[]"] * 3
+        embedding_updates = [
+            sql.SQL("{column} = COALESCE(v.{embedding}, a.{column})").format(
+                column=sql.Identifier(_field.column(model)), embedding=sql.Identifier(_field.attribute)
+            )
+            for _field in EmbeddingField
+        ] + [
+            # A changed field whose embedding is left to the queued job keeps the hash of the text it came from
+            sql.SQL("{hash} = CASE WHEN v.{embedding} IS NULL THEN a.{hash} ELSE md5(COALESCE(v.{field}, a.{field})) END").format(
+                hash=sql.Identifier(_field.embedding_hash_column(model)),
+                embedding=sql.Identifier(_field.attribute),
+                field=sql.Identifier(_field),
+            )
+            for _field in EmbeddingField
+        ] + [
+            sql.SQL("{column} = CASE WHEN v.{field} IS NULL THEN a.{column} END").format(
+                column=sql.Identifier(_field.column(_other)), field=sql.Identifier(_field)
+            )
+            for _field in EmbeddingField
+            for _other in Model
+            if _other != model
+        ]
+        query = sql.SQL(
+            "UPDATE articles a SET {texts}, created_at = COALESCE(v.created_at, a.created_at), "
+            "updated_at = COALESCE(v.updated_at, now()), {embeddings} "
+            "FROM unnest({arrays}) AS v({columns}) WHERE a.id = v.id "
+            "RETURNING a.id, a.title, a.excerpt, a.body, a.updated_at, a.created_at"
+        ).format(
+            texts=sql.SQL(", ").join(
+                sql.SQL("{field} = COALESCE(v.{field}, a.{field})").format(field=sql.Identifier(_field))
+                for _field in EmbeddingField
+            ),
+            embeddings=sql.SQL(", ").join(embedding_updates),
+            arrays=sql.SQL(", ").join(
+                sql.SQL("{}::{}").format(sql.Placeholder(_column), sql.SQL(_type)) for _column, _type in zip(columns, types)
+            ),
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        )
+        params = {
+            _column: [article_id if _column == "id" else getattr(patch, _column) for article_id, patch in patches.items()]
+            for _column in columns
+        }
+        text_changed = [
+            article_id
+            for article_id, patch in patches.items()
+            if any(getattr(patch, _field) is not None for _field in EmbeddingField)
+        ]
+        async with self._write_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                rows = await cur.fetchall()
+                if enqueue_embeddings:
+                    updated_ids = {row[0] for row in rows}
+                    await cur.executemany(ENQUEUE_EMBEDDING_JOB_QUERY, [
+                        (article_id, model) for article_id in text_changed if article_id in updated_ids
+                    ])
+            await conn.commit()
+        return {
+            row[0]: Article(title=row[1], excerpt=row[2], body=row[3], updated_at=str(row[4]), created_at=str(row[5]))
+            for row in rows
+        }
+
+    async def delete_articles(self, article_ids: list[int]) -> list[int]:
+        query: LiteralString = "DELETE FROM articles WHERE id = ANY(%s) RETURNING id"
+        async with self._write_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, (article_ids,))
+                deleted_ids = [row[0] for row in await cur.fetchall()]
+            await conn.commit()
+        return deleted_ids
+
     async def create_articles_table(self) -> None:
         query: LiteralString = """
             CREATE TABLE IF NOT EXISTS articles (
@@ -110,23 +322,248 @@ class PSQLRepo:
             await conn.commit()
 
     async def alter_articles_table_add_embeddings(self) -> None:
+        """Add one nullable vector column per model and field, sized to the model's dimension.
+
+        Nullable columns without a default are a catalog-only change, so this is safe on a live table.
+        """
+        query = sql.SQL("ALTER TABLE articles {}").format(
+            sql.SQL(", ").join(
+                sql.SQL("ADD COLUMN IF NOT EXISTS {} vector({})").format(
+                    sql.Identifier(_field.column(_model)), sql.Literal(model_dimensions[_model])
+                )
+                for _model in Model
+                for _field in EmbeddingField
+            )
+        )
+        async with self.pool.connection() as conn:
+            await conn.execute(query)
+            await conn.commit()
+
+    async def alter_articles_table_add_search_vector(self) -> None:
+        """Add a generated, GIN-indexed tsvector over title (A), excerpt (B) and body (C).
+
+        Adding a stored generated column rewrites the table once; afterwards Postgres keeps it up to date on writes.
+        """
+        query = sql.SQL(
+            "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector({config}, title), 'A') || "
+            "setweight(to_tsvector({config}, excerpt), 'B') || "
+            "setweight(to_tsvector({config}, body), 'C')"
+            ") STORED"
+        ).format(config=sql.Literal(settings.TEXT_SEARCH_CONFIG))
+        index_query: LiteralString = """
+            CREATE INDEX IF NOT EXISTS articles_search_vector_idx ON articles USING gin (search_vector)
+        """
+        async with self.pool.connection() as conn:
+            await conn.execute(query)
+            await conn.execute(index_query)
+            await conn.commit()
+
+    async def select_text_search_config(self) -> str:
+        """The configuration ``search_vector`` was generated with, so queries are parsed the way it was.
+
+        Changing ``settings.TEXT_SEARCH_CONFIG`` doesn't rebuild an existing column, so the setting only
+        applies when the column is first added, or when the column can't be found.
+        """
+        if self.text_search_config is not None:
+            return self.text_search_config
         query: LiteralString = """
-            ALTER TABLE articles
-            ADD COLUMN title_embedding vector(384),
-            ADD COLUMN excerpt_embedding vector(384),
-            ADD COLUMN body_embedding vector(384);
+            SELECT generation_expression FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'articles' AND column_name = 'search_vector'
         """
+        async with self._read_connection() as conn:
+            row = await (await conn.execute(query)).fetchone()
+        match = re.search(r"to_tsvector\('([^']+)'::regconfig", row[0] or "") if row else None
+        self.text_search_config = match.group(1) if match else settings.TEXT_SEARCH_CONFIG
+        return self.text_search_config
+
+    async def create_article_chunks_table(self) -> None:
+        """One row per body chunk, with a nullable embedding column per model like ``articles``."""
+        query = sql.SQL(
+            "CREATE TABLE IF NOT EXISTS article_chunks ("
+            "article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE, "
+            "position INTEGER NOT NULL, "
+            "content_hash TEXT NOT NULL, "
+            "chunk TEXT NOT NULL, "
+            "{embeddings}, "
+            "PRIMARY KEY (article_id, position))"
+        ).format(
+            embeddings=sql.SQL(", ").join(
+                sql.SQL("{} vector({})").format(sql.Identifier(chunk_column(_model)), sql.Literal(model_dimensions[_model]))
+                for _model in Model
+            )
+        )
         async with self.pool.connection() as conn:
             await conn.execute(query)
             await conn.commit()
 
-    async def add_many_articles(self, articles: list[ArticleWithEmbeddings]) -> None:
+    async def create_embedding_jobs_table(self) -> None:
+        """Jobs are keyed by (article, model), so re-queuing an article that is already queued is a no-op."""
+        query: LiteralString = """
+            CREATE TABLE IF NOT EXISTS embedding_jobs (
+                id BIGSERIAL PRIMARY KEY,
+                article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+                model TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                locked_until TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (article_id, model)
+            )
+        """
+        index_query: LiteralString = """
+            CREATE INDEX IF NOT EXISTS embedding_jobs_queued_idx ON embedding_jobs (id)
+            WHERE status IN ('pending', 'running')
+        """
+        async with self.pool.connection() as conn:
+            await conn.execute(query)
+            await conn.execute(index_query)
+            await conn.commit()
+
+    async def create_article_change_triggers(self, notify_ids: bool) -> None:
+        """NOTIFY once per statement that writes articles, and with ``notify_ids`` the ids it wrote.
+
+        Result caches only need to know that something changed, so every write statement sends one
+        notification however many rows it touches. The ids, which in-process indexes need to follow the table,
+        are read from the statement's transition table and sent in batches of ``ids_per_notify``; without
+        ``notify_ids`` those triggers are dropped, so bulk writes don't pay for them.
+        Part of the schema rather than of the listeners: replacing a trigger locks the table, and dropping
+        and recreating it would lose the notifications of writes made in between.
+        """
+        ids_per_notify = 500  # Below the 8000 byte payload limit with any bigint id
+        written_function_query = sql.SQL("""
+            CREATE OR REPLACE FUNCTION notify_articles_written() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify({channel}, '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """).format(channel=sql.Literal(ARTICLES_WRITTEN_CHANNEL))
+        written_trigger_query: LiteralString = """
+            CREATE OR REPLACE TRIGGER articles_notify_written AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+            ON articles FOR EACH STATEMENT EXECUTE FUNCTION notify_articles_written()
+        """
+        ids_function_query = sql.SQL("""
+            CREATE OR REPLACE FUNCTION notify_article_ids() RETURNS trigger AS $$
+            DECLARE
+                ids text;
+            BEGIN
+                FOR ids IN
+                    SELECT string_agg(id::text, ',')
+                    FROM (SELECT id, (row_number() OVER () - 1) / {ids_per_notify} AS part FROM changed_articles) AS parts
+                    GROUP BY part
+                LOOP
+                    PERFORM pg_notify({channel}, ids);
+                END LOOP;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """).format(channel=sql.Literal(ARTICLE_CHANGES_CHANNEL), ids_per_notify=sql.Literal(ids_per_notify))
+        # A trigger with a transition table fires on a single event, so each event gets its own
+        ids_triggers = {
+            "articles_notify_inserted_ids": sql.SQL("AFTER INSERT ON articles REFERENCING NEW TABLE AS changed_articles"),
+            "articles_notify_updated_ids": sql.SQL("AFTER UPDATE ON articles REFERENCING NEW TABLE AS changed_articles"),
+            "articles_notify_deleted_ids": sql.SQL("AFTER DELETE ON articles REFERENCING OLD TABLE AS changed_articles"),
+        }
+        async with self.pool.connection() as conn:
+            # Replaced by the statement level triggers below
+            await conn.execute("DROP TRIGGER IF EXISTS articles_notify_change ON articles")
+            await conn.execute("DROP FUNCTION IF EXISTS notify_article_change()")
+            await conn.execute(written_function_query)
+            await conn.execute(written_trigger_query)
+            if notify_ids:
+                await conn.execute(ids_function_query)
+            for name, event in ids_triggers.items():
+                if notify_ids:
+                    await conn.execute(
+                        sql.SQL(
+                            "CREATE OR REPLACE TRIGGER {name} {event} FOR EACH STATEMENT EXECUTE FUNCTION notify_article_ids()"
+                        ).format(name=sql.Identifier(name), event=event)
+                    )
+                else:
+                    await conn.execute(
+                        sql.SQL("DROP TRIGGER IF EXISTS {name} ON articles").format(name=sql.Identifier(name))
+                    )
+            await conn.commit()
+
+    async def alter_articles_table_add_content_hashes(self) -> None:
+        """Add generated, indexed ``md5`` columns of title, excerpt and body, and the hash of each embedding's text.
+
+        Writes that don't change a field's hash don't need new embeddings. Identical texts in other articles
+        can share theirs, looked up by the hash written with every embedding: until its queued job runs, a
+        patched article's embedding still belongs to the previous text. Like the search vector, adding the
+        generated columns rewrites the table once. Existing embeddings are assumed to match their text unless
+        a job for them is still unfinished, so ``create_embedding_jobs_table`` must have run first.
+        """
+        async with self.pool.connection() as conn:
+            for _field in EmbeddingField:
+                await conn.execute(sql.SQL(
+                    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS {hash} TEXT GENERATED ALWAYS AS (md5({field})) STORED"
+                ).format(hash=sql.Identifier(_field.hash_column), field=sql.Identifier(_field)))
+                await conn.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON articles ({})").format(
+                    sql.Identifier(f"articles_{_field.hash_column}_idx"), sql.Identifier(_field.hash_column)
+                ))
+                for _model in Model:
+                    embedding_hash = sql.Identifier(_field.embedding_hash_column(_model))
+                    await conn.execute(
+                        sql.SQL("ALTER TABLE articles ADD COLUMN IF NOT EXISTS {} TEXT").format(embedding_hash)
+                    )
+                    await conn.execute(sql.SQL(
+                        "UPDATE articles a SET {hash} = md5(a.{field}) "
+                        "WHERE a.{hash} IS NULL AND a.{column} IS NOT NULL AND NOT EXISTS ("
+                        "SELECT 1 FROM embedding_jobs j WHERE j.article_id = a.id AND j.model = {model} "
+                        "AND j.status <> 'done')"
+                    ).format(
+                        hash=embedding_hash,
+                        field=sql.Identifier(_field),
+                        column=sql.Identifier(_field.column(_model)),
+                        model=sql.Literal(str(_model)),
+                    ))
+                    await conn.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON articles ({})").format(
+                        sql.Identifier(f"articles_{_field.embedding_hash_column(_model)}_idx"), embedding_hash
+                    ))
+            await conn.commit()
+
+    async def migrate_legacy_embedding_columns(self) -> None:
+        """Rename the original unprefixed 384-dim columns, which hold MINI_LM vectors, and their indexes."""
+        query: LiteralString = """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'articles' AND column_name = ANY(%s)
+        """
+        legacy_columns = [_field.attribute for _field in EmbeddingField]
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, (legacy_columns,))
+                existing_columns = [row[0] for row in await cur.fetchall()]
+                for _field in EmbeddingField:
+                    if _field.attribute not in existing_columns:
+                        continue
+                    await cur.execute(sql.SQL("ALTER TABLE articles RENAME COLUMN {} TO {}").format(
+                        sql.Identifier(_field.attribute), sql.Identifier(_field.column(Model.MINI_LM))
+                    ))
+                    for method in IndexMethod:
+                        await cur.execute(sql.SQL("ALTER INDEX IF EXISTS {} RENAME TO {}").format(
+                            sql.Identifier(f"articles_{_field.attribute}_{method}_idx"),
+                            sql.Identifier(self._embedding_index_name(Model.MINI_LM, _field, method)),
+                        ))
+            await conn.commit()
+
+    async def add_many_articles(self, articles: list[ArticleWithEmbeddings], model: Model) -> None:
+        for article in articles:
+            self._check_dimensions(article.model_dump(), model)
         rows = [
             (article.title, article.excerpt, article.body, article.title_embedding, article.excerpt_embedding,
-             article.body_embedding)
+             article.body_embedding, *(content_hash(getattr(article, _field)) for _field in EmbeddingField))
             for article in articles
         ]
-        query = """INSERT INTO articles (title, excerpt, body, title_embedding, excerpt_embedding, body_embedding) VALUES (%s, %s, %s, %s, %s, %s)"""
+        query = sql.SQL(
+            "INSERT INTO articles (title, excerpt, body, {}, {}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+        ).format(
+            sql.SQL(", ").join(sql.Identifier(_field.column(model)) for _field in EmbeddingField),
+            sql.SQL(", ").join(sql.Identifier(_field.embedding_hash_column(model)) for _field in EmbeddingField),
+        )
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 await cur.executemany(query, rows)
@@ -134,14 +571,979 @@ class PSQLRepo:
             await conn.commit()
 
 
-    async def semantic_search_articles(self, user_query_embedding: np.ndarray[np.float32]) -> list[tuple[str, str, str, str, str]]:
-        query = """SELECT (title, excerpt, body, updated_at, created_at) FROM articles ORDER BY body_embedding <=> %s LIMIT 5;"""
+    async def copy_articles(self, articles: list[ArticleWithEmbeddings], model: Model) -> int:
+        for article in articles:
+            self._check_dimensions(article.model_dump(), model)
+        query = sql.SQL(
+            "COPY articles (title, excerpt, body, updated_at, created_at, {}, {}) FROM STDIN WITH (FORMAT BINARY)"
+        ).format(
+            sql.SQL(", ").join(sql.Identifier(_field.column(model)) for _field in EmbeddingField),
+            sql.SQL(", ").join(sql.Identifier(_field.embedding_hash_column(model)) for _field in EmbeddingField),
+        )
+        # Binary COPY needs real timestamps; fall back to the column default's value (server runs in UTC)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                async with cur.copy(query) as copy:
+                    copy.set_types(
+                        ["varchar", "text", "text", "timestamp", "timestamp", "vector", "vector", "vector"] + ["text"] * 3
+                    )
+                    for article in articles:
+                        await copy.write_row((
+                            article.title,
+                            article.excerpt,
+                            article.body,
+                            datetime.fromisoformat(article.updated_at) if article.updated_at else now,
+                            datetime.fromisoformat(article.created_at) if article.created_at else now,
+                            article.title_embedding,
+                            article.excerpt_embedding,
+                            article.body_embedding,
+                            *(content_hash(getattr(article, _field)) for _field in EmbeddingField),
+                        ))
+            await conn.commit()
+        return len(articles)
+
+    async def select_articles_missing_embeddings(
+        self, model: Model, after_id: int, limit: int
+    ) -> list[tuple[int, str, str, str, datetime]]:
+        """(id, title, excerpt, body, updated_at) of articles lacking any of ``model``'s embeddings."""
+        query = sql.SQL(
+            "SELECT id, title, excerpt, body, updated_at FROM articles WHERE id > %s AND ({}) ORDER BY id LIMIT %s"
+        ).format(
+            sql.SQL(" OR ").join(
+                sql.SQL("{} IS NULL").format(sql.Identifier(_field.column(model))) for _field in EmbeddingField
+            )
+        )
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, (after_id, limit))
+                return await cur.fetchall()
+
+    async def update_article_embeddings(
+        self,
+        model: Model,
+        embeddings: list[tuple[int, datetime, tuple[str, str, str], tuple[np.ndarray, np.ndarray, np.ndarray]]],
+    ) -> list[int]:
+        """Store (article id, article updated_at, encoded texts, their embeddings) and return the ids updated.
+
+        Like ``complete_embedding_jobs``, an article edited since it was read is left alone, and each
+        embedding is stored with the hash of the text it was encoded from.
+        """
+        for _, _, _, field_embeddings in embeddings:
+            self._check_dimensions(dict(zip([_field.attribute for _field in EmbeddingField], field_embeddings)), model)
+        query = sql.SQL(
+            "UPDATE articles SET {} WHERE id = %s AND updated_at IS NOT DISTINCT FROM %s RETURNING id"
+        ).format(
+            sql.SQL(", ").join(
+                sql.SQL("{} = %s, {} = %s").format(
+                    sql.Identifier(_field.column(model)), sql.Identifier(_field.embedding_hash_column(model))
+                )
+                for _field in EmbeddingField
+            )
+        )
+        params = [
+            (
+                *(_value for embedding, text in zip(field_embeddings, texts) for _value in (embedding, content_hash(text))),
+                article_id,
+                updated_at,
+            )
+            for article_id, updated_at, texts, field_embeddings in embeddings
+        ]
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(query, params, returning=True)
+                updated_ids = []
+                while True:
+                    updated_ids.extend(row[0] for row in await cur.fetchall())
+                    if not cur.nextset():
+                        break
+            await conn.commit()
+        return updated_ids
+
+    async def select_content_hashes(self, article_id: int) -> dict[str, str] | None:
+        query = sql.SQL("SELECT {} FROM articles WHERE id = %s").format(
+            sql.SQL(", ").join(
+                sql.SQL("{} AS {}").format(sql.Identifier(_field.hash_column), sql.Identifier(_field))
+                for _field in EmbeddingField
+            )
+        )
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(query, (article_id,), prepare=self.prepare)
+                return await cur.fetchone()
+
+    async def select_content_hashes_by_ids(self, article_ids: list[int]) -> dict[int, dict[str, str]]:
+        """``select_content_hashes`` for many articles, keyed by id; missing ids are left out."""
+        query = sql.SQL("SELECT id, {} FROM articles WHERE id = ANY(%s)").format(
+            sql.SQL(", ").join(
+                sql.SQL("{} AS {}").format(sql.Identifier(_field.hash_column), sql.Identifier(_field))
+                for _field in EmbeddingField
+            )
+        )
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(query, (article_ids,), prepare=self.prepare)
+                return {row.pop("id"): row for row in await cur.fetchall()}
+
+    async def select_embeddings_by_hash(self, model: Model, hashes: list[str]) -> dict[str, np.ndarray]:
+        """Stored ``model`` embeddings of any article field computed from a text that hashes to one of ``hashes``.
+
+        Matching is on the hash recorded with each embedding rather than the current text's, which differs
+        while a patched article waits for its embedding job.
+        """
+        query = sql.SQL("SELECT DISTINCT ON (hash) hash, embedding FROM ({}) matches").format(
+            sql.SQL(" UNION ALL ").join(
+                sql.SQL(
+                    "SELECT {hash} AS hash, {column} AS embedding FROM articles "
+                    "WHERE {hash} = ANY(%(hashes)s) AND {column} IS NOT NULL"
+                ).format(
+                    hash=sql.Identifier(_field.embedding_hash_column(model)),
+                    column=sql.Identifier(_field.column(model)),
+                )
+                for _field in EmbeddingField
+            )
+        )
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
-                await cur.execute(query, (user_query_embedding, ))
-                res = await cur.fetchall()
-                return res
+                await cur.execute(query, {"hashes": hashes}, prepare=self.prepare)
+                return dict(await cur.fetchall())
 
+    async def select_articles_missing_chunk_embeddings(
+        self, model: Model, after_id: int, limit: int
+    ) -> list[tuple[int, str]]:
+        """(id, body) of articles with no chunks yet, or with chunks lacking ``model``'s embedding."""
+        query = sql.SQL(
+            "SELECT a.id, a.body FROM articles a WHERE a.id > %s AND ("
+            "NOT EXISTS (SELECT 1 FROM article_chunks c WHERE c.article_id = a.id) "
+            "OR EXISTS (SELECT 1 FROM article_chunks c WHERE c.article_id = a.id AND c.{} IS NULL)"
+            ") ORDER BY a.id LIMIT %s"
+        ).format(sql.Identifier(chunk_column(model)))
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, (after_id, limit))
+                return await cur.fetchall()
+
+    async def select_chunk_embeddings(self, model: Model, article_ids: list[int]) -> list[tuple[int, str, np.ndarray]]:
+        """(article id, content hash, embedding) of the stored chunks that have ``model``'s embedding."""
+        query = sql.SQL(
+            "SELECT article_id, content_hash, {column} FROM article_chunks "
+            "WHERE article_id = ANY(%s) AND {column} IS NOT NULL"
+        ).format(column=sql.Identifier(chunk_column(model)))
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, (article_ids,), prepare=self.prepare)
+                return await cur.fetchall()
+
+    async def upsert_article_chunks(
+        self,
+        model: Model,
+        chunks: list[tuple[int, int, str, str, np.ndarray]],
+        chunk_counts: dict[int, int],
+    ) -> None:
+        """Write (article id, position, content hash, text, embedding) rows and drop positions past each article's count.
+
+        Other models keep their embedding of a position only if its content hash is unchanged.
+        """
+        for *_, embedding in chunks:
+            if len(embedding) != model_dimensions[model]:
+                raise EmbeddingDimensionMismatch(
+                    f"Chunk embedding has {len(embedding)} dimensions, {model} produces {model_dimensions[model]}"
+                )
+        other_columns = [sql.Identifier(chunk_column(_other)) for _other in Model if _other != model]
+        query = sql.SQL(
+            "INSERT INTO article_chunks (article_id, position, content_hash, chunk, {column}) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (article_id, position) DO UPDATE SET "
+            "content_hash = EXCLUDED.content_hash, chunk = EXCLUDED.chunk, {column} = EXCLUDED.{column}{others}"
+        ).format(
+            column=sql.Identifier(chunk_column(model)),
+            others=sql.SQL("").join(
+                sql.SQL(
+                    ", {other} = CASE WHEN article_chunks.content_hash = EXCLUDED.content_hash "
+                    "THEN article_chunks.{other} END"
+                ).format(other=_column)
+                for _column in other_columns
+            ),
+        )
+        trim_query: LiteralString = """
+            DELETE FROM article_chunks c USING unnest(%s::integer[], %s::integer[]) AS counts(article_id, chunk_count)
+            WHERE c.article_id = counts.article_id AND c.position >= counts.chunk_count
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                if chunks:
+                    await cur.executemany(query, chunks)
+                await cur.execute(trim_query, (list(chunk_counts), list(chunk_counts.values())))
+            await conn.commit()
+
+    async def claim_embedding_jobs(self, limit: int, lease_seconds: float, max_attempts: int) -> list[dict]:
+        """Lease up to ``limit`` queued jobs, returning them with their article's text and ``updated_at``.
+
+        SKIP LOCKED lets many workers claim concurrently without waiting on each other. A job whose worker
+        died is claimed again once its lease runs out.
+        """
+        query: LiteralString = """
+            WITH claimed AS (
+                SELECT id FROM embedding_jobs
+                WHERE status IN ('pending', 'running')
+                    AND (locked_until IS NULL OR locked_until < now())
+                    AND attempts < %(max_attempts)s
+                ORDER BY id LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE embedding_jobs j SET
+                status = 'running',
+                attempts = j.attempts + 1,
+                locked_until = now() + make_interval(secs => %(lease_seconds)s),
+                updated_at = now()
+            FROM claimed, articles a
+            WHERE j.id = claimed.id AND a.id = j.article_id
+            RETURNING j.id, j.article_id, j.model, a.title, a.excerpt, a.body, a.updated_at
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(
+                    query, {"limit": limit, "lease_seconds": lease_seconds, "max_attempts": max_attempts}
+                )
+                jobs = await cur.fetchall()
+            await conn.commit()
+            return jobs
+
+    async def complete_embedding_jobs(
+        self, model: Model, embeddings: list[tuple[int, int, datetime, np.ndarray, np.ndarray, np.ndarray]]
+    ) -> list[int]:
+        """Store (job id, article id, article updated_at, title, excerpt, body embeddings) and mark the jobs done.
+
+        An article edited after its job was claimed is left alone, and its job is put back in the queue to be
+        encoded again from the new text rather than marked done. Returns the ids of the articles updated.
+        """
+        for _, _, _, *field_embeddings in embeddings:
+            self._check_dimensions(dict(zip([_field.attribute for _field in EmbeddingField], field_embeddings)), model)
+        query = sql.SQL(
+            "UPDATE articles SET {} WHERE id = %s AND updated_at IS NOT DISTINCT FROM %s RETURNING id"
+        ).format(
+            sql.SQL(", ").join(
+                sql.SQL("{} = %s, {} = md5({})").format(
+                    sql.Identifier(_field.column(model)),
+                    sql.Identifier(_field.embedding_hash_column(model)),
+                    sql.Identifier(_field),
+                )
+                for _field in EmbeddingField
+            )
+        )
+        done_query: LiteralString = """
+            UPDATE embedding_jobs SET status = 'done', error = NULL, locked_until = NULL, updated_at = now()
+            WHERE id = ANY(%s) AND status = 'running'
+        """
+        requeue_query: LiteralString = """
+            UPDATE embedding_jobs SET
+                status = 'pending', attempts = 0, error = NULL, locked_until = NULL, updated_at = now()
+            WHERE id = ANY(%s) AND status = 'running'
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(query, [
+                    (*field_embeddings, article_id, updated_at)
+                    for _, article_id, updated_at, *field_embeddings in embeddings
+                ], returning=True)
+                updated_ids = []
+                while True:
+                    updated_ids.extend(row[0] for row in await cur.fetchall())
+                    if not cur.nextset():
+                        break
+                updated = set(updated_ids)
+                await cur.execute(
+                    done_query, ([job_id for job_id, article_id, *_ in embeddings if article_id in updated],)
+                )
+                await cur.execute(
+                    requeue_query, ([job_id for job_id, article_id, *_ in embeddings if article_id not in updated],)
+                )
+            await conn.commit()
+            return updated_ids
+
+    async def fail_embedding_jobs(self, job_ids: list[int], error: str, max_attempts: int) -> None:
+        """Put the jobs back in the queue, or mark them failed once they have used up ``max_attempts``."""
+        query: LiteralString = """
+            UPDATE embedding_jobs SET
+                status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                error = %s,
+                locked_until = NULL,
+                updated_at = now()
+            WHERE id = ANY(%s) AND status = 'running'
+        """
+        async with self.pool.connection() as conn:
+            await conn.execute(query, (max_attempts, error, job_ids))
+            await conn.commit()
+
+    async def select_embedding_jobs(self, article_id: int) -> list[dict]:
+        query: LiteralString = """
+            SELECT article_id, model, status, attempts, error, updated_at FROM embedding_jobs
+            WHERE article_id = %s ORDER BY model
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(query, (article_id,))
+                return await cur.fetchall()
+
+    async def create_embedding_index(
+        self,
+        model: Model,
+        field: EmbeddingField,
+        method: IndexMethod = IndexMethod.HNSW,
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: int = 100,
+        concurrently: bool = False,
+        quantization: Quantization = Quantization.NONE,
+    ) -> None:
+        """Create an ANN index on one embedding column, using cosine distance like the search queries.
+
+        With ``quantization`` the index is built over the column cast to ``halfvec`` or binary-quantized to ``bit``,
+        which makes it 2x or 32x smaller. IVFFlat picks its centroids from the rows present at build time, so build
+        it after loading data.
+        """
+        await self._create_vector_index(
+            "articles",
+            field.column(model),
+            self._embedding_index_name(model, field, method, quantization),
+            method,
+            m=m,
+            ef_construction=ef_construction,
+            lists=lists,
+            concurrently=concurrently,
+            quantization=quantization,
+            dimensions=model_dimensions[model],
+        )
+
+    async def create_chunk_embedding_index(
+        self,
+        model: Model,
+        method: IndexMethod = IndexMethod.HNSW,
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: int = 100,
+        concurrently: bool = False,
+    ) -> None:
+        await self._create_vector_index(
+            "article_chunks",
+            chunk_column(model),
+            f"article_chunks_{chunk_column(model)}_{method}_idx",
+            method,
+            m=m,
+            ef_construction=ef_construction,
+            lists=lists,
+            concurrently=concurrently,
+        )
+
+    async def _create_vector_index(
+        self,
+        table: str,
+        column: str,
+        index_name: str,
+        method: IndexMethod,
+        m: int,
+        ef_construction: int,
+        lists: int,
+        concurrently: bool,
+        quantization: Quantization = Quantization.NONE,
+        dimensions: int | None = None,
+    ) -> None:
+        match method:
+            case IndexMethod.HNSW:
+                index_params = sql.SQL("m = {}, ef_construction = {}").format(
+                    sql.Literal(m), sql.Literal(ef_construction)
+                )
+            case IndexMethod.IVFFLAT:
+                index_params = sql.SQL("lists = {}").format(sql.Literal(lists))
+        query = sql.SQL(
+            "CREATE INDEX {concurrently} IF NOT EXISTS {index} ON {table} USING {method} ({column} {opclass}) WITH ({params})"
+        ).format(
+            concurrently=sql.SQL("CONCURRENTLY" if concurrently else ""),
+            index=sql.Identifier(index_name),
+            table=sql.Identifier(table),
+            method=sql.SQL(method),
+            column=self._quantized(sql.Identifier(column), quantization, dimensions),
+            opclass=sql.SQL(QUANTIZATION_OPERATORS[quantization][1]),
+            params=index_params,
+        )
+        async with self.pool.connection() as conn:
+            if concurrently:
+                # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+                await conn.set_autocommit(True)
+                try:
+                    await conn.execute(query)
+                finally:
+                    await conn.set_autocommit(False)
+            else:
+                await conn.execute(query)
+                await conn.commit()
+
+    async def drop_embedding_index(
+        self,
+        model: Model,
+        field: EmbeddingField,
+        method: IndexMethod = IndexMethod.HNSW,
+        quantization: Quantization = Quantization.NONE,
+    ) -> None:
+        query = sql.SQL("DROP INDEX IF EXISTS {}").format(
+            sql.Identifier(self._embedding_index_name(model, field, method, quantization))
+        )
+        async with self.pool.connection() as conn:
+            await conn.execute(query)
+            await conn.commit()
+
+    async def create_embedding_indexes(
+        self,
+        model: Model,
+        method: IndexMethod = IndexMethod.HNSW,
+        quantization: Quantization = Quantization.NONE,
+        **index_params,
+    ) -> None:
+        for field in EmbeddingField:
+            await self.create_embedding_index(model, field, method, quantization=quantization, **index_params)
+        # Chunk, multi-field and hybrid searches always scan the full-precision indexes
+        await self.create_chunk_embedding_index(model, method, **index_params)
+
+    @staticmethod
+    def _embedding_index_name(
+        model: Model, field: EmbeddingField, method: IndexMethod, quantization: Quantization = Quantization.NONE
+    ) -> str:
+        if quantization == Quantization.NONE:
+            return f"articles_{field.column(model)}_{method}_idx"
+        return f"articles_{field.column(model)}_{method}_{quantization}_idx"
+
+    @staticmethod
+    def _quantized(expression: sql.Composable, quantization: Quantization, dimensions: int | None) -> sql.Composable:
+        """``expression`` as the indexed compact type; search queries must spell it the same to use the index."""
+        match quantization:
+            case Quantization.HALFVEC:
+                return sql.SQL("({}::halfvec({}))").format(expression, sql.Literal(dimensions))
+            case Quantization.BINARY:
+                return sql.SQL("(binary_quantize({})::bit({}))").format(expression, sql.Literal(dimensions))
+        return expression
+
+    @classmethod
+    def _with_embedding_columns(cls, article_dict: dict, model: Model) -> dict:
+        """Rename the model-agnostic ``<field>_embedding`` keys to ``model``'s columns, next to their text's hash."""
+        cls._check_dimensions(article_dict, model)
+        columns = {
+            (EmbeddingField(_key.removesuffix("_embedding")).column(model) if _key.endswith("_embedding") else _key): _value
+            for _key, _value in article_dict.items()
+        }
+        columns.update({
+            _field.embedding_hash_column(model): content_hash(article_dict[_field])
+            for _field in EmbeddingField
+            if _field.attribute in article_dict and _field in article_dict
+        })
+        return columns
+
+    @staticmethod
+    def _check_dimensions(article_dict: dict, model: Model) -> None:
+        for _field in EmbeddingField:
+            embedding = article_dict.get(_field.attribute)
+            if embedding is not None and len(embedding) != model_dimensions[model]:
+                raise EmbeddingDimensionMismatch(
+                    f"{_field.attribute} has {len(embedding)} dimensions, {model} produces {model_dimensions[model]}"
+                )
+
+    @asynccontextmanager
+    async def _search_connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """``_read_connection()``, recording how long the search waited for a free connection."""
+        started_at = time.perf_counter()
+        async with self._read_connection() as conn:
+            record_stage("pool_acquire", time.perf_counter() - started_at)
+            yield conn
+
+    @asynccontextmanager
+    async def _read_connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """A connection to a healthy replica, or to the primary when there is none or it can't be reached."""
+        pool = self.replicas.read_pool() if self.replicas is not None else self.pool
+        async with AsyncExitStack() as stack:
+            try:
+                conn = await stack.enter_async_context(pool.connection())
+            except psycopg.OperationalError:
+                if pool is self.pool:
+                    raise
+                self.replicas.mark_unhealthy(pool)
+                conn = await stack.enter_async_context(self.pool.connection())
+            yield conn
+
+    @asynccontextmanager
+    async def _write_connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """``pool.connection()`` for article writes, recording where they end in the WAL for read-your-writes."""
+        async with self.pool.connection() as conn:
+            yield conn
+            if self.replicas is not None and self.replicas.tracks_writes():
+                cur = await conn.execute(PRIMARY_LSN_QUERY)
+                (lsn,) = await cur.fetchone()
+                await conn.commit()
+                self.replicas.mark_written(lsn)
+
+    async def _fetch_searches(
+        self, query: sql.Composable, query_params: list[dict], options: SearchOptions
+    ) -> list[list[dict]]:
+        """Run ``query`` once per parameter set on a single connection and return the rows of each.
+
+        Several sets are pipelined, so a batch costs one connection and about one round trip instead of
+        holding a pool connection per query.
+        """
+        if not query_params:
+            return []
+        async with self._search_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await self._apply_search_options(cur, options, iterative_scan=options.has_filters)
+                with timed("db_execute"):
+                    if len(query_params) == 1:
+                        await cur.execute(query, query_params[0], prepare=self.prepare)
+                        return [await cur.fetchall()]
+                    await cur.executemany(query, query_params, returning=True)
+                    results = []
+                    while True:
+                        results.append(await cur.fetchall())
+                        if not cur.nextset():
+                            break
+                    return results
+
+    @staticmethod
+    async def _apply_search_options(
+        cur: psycopg.AsyncCursor, options: SearchOptions, iterative_scan: bool = False
+    ) -> None:
+        # set_config(..., true) is scoped to the current transaction, so the knobs never leak
+        # to other users of the pooled connection.
+        knobs = {"hnsw.ef_search": options.ef_search, "ivfflat.probes": options.probes}
+        if iterative_scan and settings.ITERATIVE_SCAN != "off":
+            knobs.update({"hnsw.iterative_scan": settings.ITERATIVE_SCAN, "ivfflat.iterative_scan": settings.ITERATIVE_SCAN})
+        knobs = {_name: str(_value) for _name, _value in knobs.items() if _value is not None}
+        if not knobs:
+            return
+        query = sql.SQL("SELECT {}").format(
+            sql.SQL(", ").join(
+                sql.SQL("set_config({}, {}, true)").format(sql.Literal(_name), sql.Placeholder())
+                for _name in knobs
+            )
+        )
+        await cur.execute(query, list(knobs.values()))
+
+    @staticmethod
+    def _search_filters(options: SearchOptions, table: str | None = None) -> sql.Composable:
+        """`` AND ...`` conditions for the created/updated ranges in ``options``, bound as named placeholders."""
+        conditions = [
+            sql.SQL("{} {} {}").format(
+                sql.Identifier(table, _column) if table else sql.Identifier(_column),
+                sql.SQL(_operator),
+                sql.Placeholder(_option),
+            )
+            for _column, _operator, _option in (
+                ("created_at", ">=", "created_after"),
+                ("created_at", "<", "created_before"),
+                ("updated_at", ">=", "updated_after"),
+                ("updated_at", "<", "updated_before"),
+            )
+            if getattr(options, _option) is not None
+        ]
+        return sql.SQL("").join(sql.SQL(" AND {}").format(_condition) for _condition in conditions)
+
+    @staticmethod
+    def _result_columns(options: SearchOptions, table: str | None = None) -> sql.Composable:
+        """``, col, ...`` for the article columns requested in ``options``, so unused bodies never leave Postgres."""
+        return sql.SQL("").join(
+            sql.SQL(", {}").format(sql.Identifier(table, _field) if table else sql.Identifier(_field))
+            for _field in options.result_fields
+        )
+
+    @staticmethod
+    def _embedding_columns(model: Model) -> sql.Composable:
+        """``, <model column> AS <field>_embedding, ...`` for all of ``model``'s embedding columns."""
+        return sql.SQL("").join(
+            sql.SQL(", {} AS {}").format(sql.Identifier(_field.column(model)), sql.Identifier(_field.attribute))
+            for _field in EmbeddingField
+        )
+
+    def _nearest_query(
+        self, model: Model, options: SearchOptions, embedding: sql.Composable, keyset: sql.Composable
+    ) -> sql.Composed:
+        """``SELECT id, distance, <columns>`` of the ``%(limit)s`` articles closest to ``embedding``.
+
+        Ties in distance are broken by id, like the (distance, id) keyset, so articles with equal distances
+        are cut at the same point by the LIMIT and by the page boundary.
+
+        With quantization the index over the compact expression yields ``max(candidates, limit)`` rows, which are
+        re-ranked by exact cosine distance on the float32 column.
+        """
+        column = sql.Identifier(options.field.column(model))
+        if self.quantization == Quantization.NONE:
+            return sql.SQL(
+                "SELECT id, {column} <=> {embedding} AS distance{columns} "
+                "FROM articles WHERE {column} IS NOT NULL{filters}{keyset} "
+                "ORDER BY {column} <=> {embedding}, id LIMIT %(limit)s"
+            ).format(
+                column=column,
+                embedding=embedding,
+                columns=self._result_columns(options),
+                filters=self._search_filters(options),
+                keyset=keyset,
+            )
+        dimensions = model_dimensions[model]
+        return sql.SQL(
+            "SELECT id, {column} <=> {embedding} AS distance{columns} "
+            "FROM articles WHERE id IN ("
+            "SELECT id FROM articles WHERE {column} IS NOT NULL{filters}{keyset} "
+            "ORDER BY {quantized_column} {operator} {quantized_embedding}, id "
+            "LIMIT GREATEST(%(candidates)s, %(limit)s)"
+            ") ORDER BY distance, id LIMIT %(limit)s"
+        ).format(
+            column=column,
+            embedding=embedding,
+            columns=self._result_columns(options),
+            filters=self._search_filters(options),
+            keyset=keyset,
+            quantized_column=self._quantized(column, self.quantization, dimensions),
+            operator=sql.SQL(QUANTIZATION_OPERATORS[self.quantization][0]),
+            quantized_embedding=self._quantized(embedding, self.quantization, dimensions),
+        )
+
+    def _scan_size(self, options: SearchOptions) -> int:
+        """Rows the index scan must yield, the lower bound for ``hnsw.ef_search``."""
+        if self.quantization == Quantization.NONE:
+            return options.limit
+        return max(options.candidates, options.limit)
+
+    @staticmethod
+    def _search_params(options: SearchOptions, **params) -> dict:
+        return {
+            **options.model_dump(include={"created_after", "created_before", "updated_after", "updated_before"}),
+            "limit": options.limit,
+            "candidates": options.candidates,
+            **params,
+        }
+
+    async def semantic_search_articles(
+        self, user_query_embedding: np.ndarray[np.float32], model: Model, options: SearchOptions | None = None
+    ) -> list[dict]:
+        """Return one page of nearest articles as rows with id, score, distance and the requested columns.
+
+        Paging is keyset-based on (distance, id), and filters are applied inside the index scan. Without
+        pgvector's iterative scans, an HNSW/IVFFlat scan only yields ef_search/probes worth of candidates
+        before filtering, so a short page is retried with a wider scan, until a wider scan finds no new rows
+        or both knobs are at their maximum.
+        """
+        options = options or SearchOptions()
+        after = options.after
+        keyset = sql.SQL(" AND ({column} <=> %(embedding)s, id) > (%(after_distance)s, %(after_id)s)") if after else sql.SQL("")
+        query = sql.SQL(
+            "WITH nearest AS MATERIALIZED ({nearest}) "
+            "SELECT id, 1 - distance AS score, distance{columns} FROM nearest ORDER BY distance, id"
+        ).format(
+            nearest=self._nearest_query(
+                model,
+                options,
+                sql.Placeholder("embedding"),
+                keyset.format(column=sql.Identifier(options.field.column(model))),
+            ),
+            columns=self._result_columns(options),
+        )
+        query_params = self._search_params(
+            options,
+            embedding=user_query_embedding,
+            after_distance=after[0] if after else None,
+            after_id=after[1] if after else None,
+        )
+        filtered = options.has_filters or after is not None
+        ef_search = max(options.ef_search or DEFAULT_EF_SEARCH, self._scan_size(options))
+        probes = options.probes or DEFAULT_IVFFLAT_PROBES
+        found = -1
+        async with self._search_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                while True:
+                    scan_options = options.model_copy(update={"ef_search": ef_search, "probes": probes})
+                    await self._apply_search_options(cur, scan_options, iterative_scan=filtered)
+                    with timed("db_execute"):
+                        await cur.execute(query, query_params, prepare=self.prepare)
+                        res = await cur.fetchall()
+                    if (
+                        len(res) >= options.limit
+                        or not filtered
+                        or settings.ITERATIVE_SCAN != "off"
+                        # A wider scan found nothing new: no index, or the filter matches fewer rows than the page
+                        or len(res) == found
+                        or (ef_search >= MAX_EF_SEARCH and probes >= settings.IVFFLAT_LISTS)
+                    ):
+                        return res
+                    found = len(res)
+                    ef_search = min(ef_search * 4, MAX_EF_SEARCH)
+                    probes = min(probes * 4, settings.IVFFLAT_LISTS)
+
+    async def batch_semantic_search_articles(
+        self, user_query_embeddings: list[np.ndarray[np.float32]], model: Model, options: SearchOptions | None = None
+    ) -> list[list[dict]]:
+        """Run one nearest-neighbour lookup per embedding through a single LATERAL join."""
+        options = options or SearchOptions()
+        query = sql.SQL(
+            "SELECT q.position, a.id, 1 - a.distance AS score{result_columns} "
+            "FROM unnest(%(embeddings)s::vector[]) WITH ORDINALITY AS q(embedding, position) "
+            "CROSS JOIN LATERAL ({nearest}) a "
+            "ORDER BY q.position, a.distance, a.id"
+        ).format(
+            nearest=self._nearest_query(model, options, sql.SQL("q.embedding"), sql.SQL("")),
+            result_columns=self._result_columns(options, table="a"),
+        )
+        query_params = self._search_params(options, embeddings=list(user_query_embeddings))
+        options = options.model_copy(
+            update={"ef_search": max(options.ef_search or DEFAULT_EF_SEARCH, self._scan_size(options))}
+        )
+        results: list[list[dict]] = [[] for _ in user_query_embeddings]
+        async with self._search_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await self._apply_search_options(cur, options, iterative_scan=options.has_filters)
+                with timed("db_execute"):
+                    await cur.execute(query, query_params, prepare=self.prepare)
+                    rows = await cur.fetchall()
+                for row in rows:
+                    results[row.pop("position") - 1].append(row)
+        return results
+
+    async def multi_field_search_articles(
+        self, user_query_embedding: np.ndarray[np.float32], model: Model, options: SearchOptions
+    ) -> list[dict]:
+        """Rank articles by title, excerpt and body embeddings in a single query.
+
+        The top ``options.candidates`` articles are taken from each field's ANN index, then the union
+        is ordered by a weighted cosine similarity sum or by weighted reciprocal rank fusion.
+        """
+        [rows] = await self.batch_multi_field_search_articles([user_query_embedding], model, options)
+        return rows
+
+    async def batch_multi_field_search_articles(
+        self, user_query_embeddings: list[np.ndarray[np.float32]], model: Model, options: SearchOptions
+    ) -> list[list[dict]]:
+        """``multi_field_search_articles`` for each embedding, all of them on one connection."""
+        fields = [_field for _field in EmbeddingField if options.weight(_field) > 0]
+        if not fields:
+            return [[] for _ in user_query_embeddings]
+        hits = sql.SQL(", ").join(
+            sql.SQL(
+                "{hits} AS (SELECT id, {column} <=> %(embedding)s AS distance FROM articles "
+                "WHERE {column} IS NOT NULL{filters} ORDER BY {column} <=> %(embedding)s LIMIT %(candidates)s)"
+            ).format(
+                hits=sql.Identifier(f"{_field}_hits"),
+                column=sql.Identifier(_field.column(model)),
+                filters=self._search_filters(options),
+            )
+            for _field in fields
+        )
+        candidates = sql.SQL(" UNION ").join(
+            sql.SQL("SELECT id FROM {}").format(sql.Identifier(f"{_field}_hits")) for _field in fields
+        )
+        match options.fusion:
+            case FusionMethod.WEIGHTED:
+                score = sql.SQL(" + ").join(
+                    sql.SQL("COALESCE({weight} * (1 - ({column} <=> %(embedding)s)), 0)").format(
+                        weight=sql.Literal(options.weight(_field)), column=sql.Identifier("a", _field.column(model))
+                    )
+                    for _field in fields
+                )
+                joins = sql.SQL("")
+            case FusionMethod.RRF:
+                score = sql.SQL(" + ").join(
+                    sql.SQL("COALESCE({weight} / ({k} + {ranks}.rank), 0)").format(
+                        weight=sql.Literal(options.weight(_field)),
+                        k=sql.Literal(float(RRF_K)),
+                        ranks=sql.Identifier(f"{_field}_ranks"),
+                    )
+                    for _field in fields
+                )
+                joins = sql.SQL(" ").join(
+                    sql.SQL(
+                        "LEFT JOIN (SELECT id, row_number() OVER (ORDER BY distance) AS rank FROM {hits}) {ranks} USING (id)"
+                    ).format(hits=sql.Identifier(f"{_field}_hits"), ranks=sql.Identifier(f"{_field}_ranks"))
+                    for _field in fields
+                )
+        query = sql.SQL(
+            "WITH {hits}, candidates AS ({candidates}) "
+            "SELECT a.id, {score} AS score{columns} "
+            "FROM candidates JOIN articles a USING (id) {joins} "
+            "ORDER BY score DESC LIMIT %(limit)s"
+        ).format(
+            hits=hits, candidates=candidates, joins=joins, score=score, columns=self._result_columns(options, table="a")
+        )
+
+        query_params = [
+            self._search_params(options, embedding=embedding) for embedding in user_query_embeddings
+        ]
+        # An HNSW scan returns at most ef_search rows, so it must cover the candidate pool
+        options = options.model_copy(update={"ef_search": max(options.ef_search or 0, options.candidates)})
+        return await self._fetch_searches(query, query_params, options)
+
+    async def hybrid_search_articles(
+        self, user_query_embedding: np.ndarray[np.float32], user_query: str, model: Model, options: SearchOptions
+    ) -> list[dict]:
+        """Fuse the ANN ranking with the full-text ranking of ``user_query`` by weighted reciprocal rank fusion."""
+        [rows] = await self.batch_hybrid_search_articles([user_query_embedding], [user_query], model, options)
+        return rows
+
+    async def batch_hybrid_search_articles(
+        self,
+        user_query_embeddings: list[np.ndarray[np.float32]],
+        user_queries: list[str],
+        model: Model,
+        options: SearchOptions,
+    ) -> list[list[dict]]:
+        """``hybrid_search_articles`` for each embedding and its query text, all of them on one connection."""
+        query = sql.SQL(
+            "WITH semantic AS ("
+            "SELECT id, row_number() OVER (ORDER BY distance) AS rank FROM ("
+            "SELECT id, {column} <=> %(embedding)s AS distance FROM articles WHERE {column} IS NOT NULL{filters} "
+            "ORDER BY {column} <=> %(embedding)s LIMIT %(candidates)s"
+            ") nearest), "
+            "lexical AS ("
+            "SELECT id, row_number() OVER (ORDER BY ts_rank_cd(search_vector, tsquery) DESC) AS rank "
+            "FROM articles, websearch_to_tsquery(%(config)s::regconfig, %(user_query)s) tsquery "
+            "WHERE search_vector @@ tsquery{filters} ORDER BY rank LIMIT %(candidates)s) "
+            "SELECT a.id, COALESCE(%(semantic_weight)s / (%(k)s + semantic.rank), 0) "
+            "+ COALESCE(%(lexical_weight)s / (%(k)s + lexical.rank), 0) AS score{columns} "
+            "FROM semantic FULL OUTER JOIN lexical USING (id) JOIN articles a USING (id) "
+            "ORDER BY score DESC LIMIT %(limit)s"
+        ).format(
+            column=sql.Identifier(options.field.column(model)),
+            columns=self._result_columns(options, table="a"),
+            filters=self._search_filters(options),
+        )
+        config = await self.select_text_search_config()
+        query_params = [
+            self._search_params(
+                options,
+                embedding=embedding,
+                user_query=user_query,
+                config=config,
+                semantic_weight=options.semantic_weight,
+                lexical_weight=options.lexical_weight,
+                k=float(RRF_K),
+            )
+            for embedding, user_query in zip(user_query_embeddings, user_queries)
+        ]
+        options = options.model_copy(update={"ef_search": max(options.ef_search or 0, options.candidates)})
+        return await self._fetch_searches(query, query_params, options)
+
+    async def chunk_search_articles(
+        self, user_query_embedding: np.ndarray[np.float32], model: Model, options: SearchOptions
+    ) -> list[dict]:
+        """Rank articles by their body chunks: the nearest ``options.candidates`` chunks are grouped per article
+        and scored by their best (max) or average (mean) cosine similarity.
+        """
+        [rows] = await self.batch_chunk_search_articles([user_query_embedding], model, options)
+        return rows
+
+    async def batch_chunk_search_articles(
+        self, user_query_embeddings: list[np.ndarray[np.float32]], model: Model, options: SearchOptions
+    ) -> list[list[dict]]:
+        """``chunk_search_articles`` for each embedding, all of them on one connection."""
+        match options.chunk_aggregation:
+            case ChunkAggregation.MAX:
+                score = sql.SQL("max(1 - nearest.distance)")
+            case ChunkAggregation.MEAN:
+                score = sql.SQL("avg(1 - nearest.distance)")
+        query = sql.SQL(
+            "WITH nearest AS ("
+            "SELECT c.article_id, c.{column} <=> %(embedding)s AS distance "
+            "FROM article_chunks c JOIN articles a ON a.id = c.article_id "
+            "WHERE c.{column} IS NOT NULL{filters} ORDER BY c.{column} <=> %(embedding)s LIMIT %(candidates)s) "
+            "SELECT a.id, {score} AS score{columns} "
+            "FROM nearest JOIN articles a ON a.id = nearest.article_id "
+            "GROUP BY a.id ORDER BY score DESC, a.id LIMIT %(limit)s"
+        ).format(
+            column=sql.Identifier(chunk_column(model)),
+            filters=self._search_filters(options, table="a"),
+            score=score,
+            columns=self._result_columns(options, table="a"),
+        )
+        query_params = [
+            self._search_params(options, embedding=embedding) for embedding in user_query_embeddings
+        ]
+        options = options.model_copy(update={"ef_search": max(options.ef_search or 0, options.candidates)})
+        return await self._fetch_searches(query, query_params, options)
+
+    async def iter_articles(
+        self, fields: list[ResultField], model: Model | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[list[dict]]:
+        """Yield every article in id order, ``chunk_size`` rows at a time, from a server-side cursor.
+
+        With ``model``, its embeddings are included as ``<field>_embedding``. The pooled connection is held
+        until the iterator is exhausted or closed.
+        """
+        query = sql.SQL("SELECT id{columns}{embeddings} FROM articles ORDER BY id").format(
+            columns=sql.SQL("").join(sql.SQL(", {}").format(sql.Identifier(_field)) for _field in fields),
+            embeddings=self._embedding_columns(model) if model else sql.SQL(""),
+        )
+        async with self._read_connection() as conn:
+            async with conn.cursor(name="articles_export", row_factory=dict_row) as cur:
+                await cur.execute(query)
+                while rows := await cur.fetchmany(chunk_size):
+                    yield rows
+
+    async def iter_index_rows(self, models: list[Model], chunk_size: int = 1000) -> AsyncIterator[list[dict]]:
+        """Yield every article with its result columns and ``models``' embedding columns, in id order."""
+        query = self._index_rows_query(models, sql.SQL(""))
+        async with self.pool.connection() as conn:
+            async with conn.cursor(name="index_rows", row_factory=dict_row) as cur:
+                await cur.execute(query)
+                while rows := await cur.fetchmany(chunk_size):
+                    yield rows
+
+    async def select_index_rows(self, article_ids: list[int], models: list[Model]) -> list[dict]:
+        """The ``iter_index_rows`` rows of ``article_ids``; ids that were deleted are missing."""
+        query = self._index_rows_query(models, sql.SQL(" WHERE id = ANY(%s)"))
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(query, (article_ids,), prepare=self.prepare)
+                return await cur.fetchall()
+
+    @staticmethod
+    def _index_rows_query(models: list[Model], where: sql.Composable) -> sql.Composed:
+        return sql.SQL("SELECT id{columns}{embeddings} FROM articles{where} ORDER BY id").format(
+            columns=sql.SQL("").join(sql.SQL(", {}").format(sql.Identifier(_field)) for _field in ResultField),
+            embeddings=sql.SQL("").join(
+                sql.SQL(", {}").format(sql.Identifier(_field.column(_model)))
+                for _model in models
+                for _field in EmbeddingField
+            ),
+            where=where,
+        )
+
+    async def iter_semantic_search_articles(
+        self,
+        user_query_embedding: np.ndarray[np.float32],
+        model: Model,
+        options: SearchOptions,
+        limit: int,
+        include_embeddings: bool = False,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[list[dict]]:
+        """Yield up to ``limit`` nearest articles, ``chunk_size`` rows at a time, from a server-side cursor.
+
+        An HNSW scan stops after ef_search (at most 1000) rows unless iterative scans are enabled, so
+        larger exports need ``settings.ITERATIVE_SCAN`` or no index on the column.
+        """
+        query = sql.SQL(
+            "SELECT id, 1 - ({column} <=> %(embedding)s) AS score{columns}{embeddings} "
+            "FROM articles WHERE {column} IS NOT NULL{filters} "
+            "ORDER BY {column} <=> %(embedding)s LIMIT %(limit)s"
+        ).format(
+            column=sql.Identifier(options.field.column(model)),
+            columns=self._result_columns(options),
+            embeddings=self._embedding_columns(model) if include_embeddings else sql.SQL(""),
+            filters=self._search_filters(options),
+        )
+        query_params = self._search_params(options, embedding=user_query_embedding, limit=limit)
+        options = options.model_copy(
+            update={"ef_search": min(max(options.ef_search or DEFAULT_EF_SEARCH, limit), MAX_EF_SEARCH)}
+        )
+        async with self._read_connection() as conn:
+            async with conn.cursor() as cur:
+                await self._apply_search_options(cur, options, iterative_scan=True)
+            async with conn.cursor(name="search_export", row_factory=dict_row) as cur:
+                await cur.execute(query, query_params)
+                while rows := await cur.fetchmany(chunk_size):
+                    yield rows
 
 
 if __name__ == "__main__":
@@ -150,8 +1552,7 @@ if __name__ == "__main__":
 
     async def main():
         conn_info = "dbname=vectordb host=localhost user=admin password=admin"
-        with psycopg.connect(conn_info, autocommit=True) as sync_conn:
-            sync_conn.execute("""CREATE EXTENSION IF NOT EXISTS vector""")
+        await create_vector_extension(conn_info)
 
         pool = AsyncConnectionPool(
             conninfo=conn_info, open=False, timeout=5, configure=config_pool
@@ -159,7 +1560,9 @@ if __name__ == "__main__":
         await pool.open()
         repo = PSQLRepo(pool, db_name="vectordb")
         try:
-            res = await repo.patch_article_by_id(article_id=11, article=ArticlePatch(title="blah", excerpt="blo"))
+            res = await repo.patch_article_by_id(
+                article_id=11, article=ArticlePatchWithEmbeddings(title="blah", excerpt="blo"), model=Model.MINI_LM
+            )
             print(res)
         finally:
             await pool.close()
@@ -0,0 +1,167 @@
+import asyncio
+import itertools
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import LiteralString
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+
+from semantic_search_service import settings
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_LSN_QUERY: LiteralString = "SELECT pg_current_wal_lsn()"
+
+# Seconds the replica is behind the primary, given the primary's current WAL position. 0 once it has replayed up
+# to that position, which keeps an idle primary from looking like lag; a replica whose WAL receiver is
+# disconnected never gets there, so its lag keeps growing. NULL, i.e. unhealthy, when it has replayed nothing yet.
+# A server that isn't in recovery is the primary itself and never lags.
+# Also returns how far the replica has replayed, for read-your-writes.
+REPLICATION_LAG_QUERY: LiteralString = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_replay_lsn() >= %(primary_lsn)s::pg_lsn THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END, pg_last_wal_replay_lsn()
+"""
+
+
+@dataclass
+class ClientWrites:
+    """WAL positions of one client's writes, carried between its requests in a cookie.
+
+    ``read_after`` is the end of its last write, which its reads must see; ``written`` is set when this
+    request wrote, so the response can hand the new position back to the client.
+    """
+
+    read_after: int | None = None
+    written: str | None = None
+
+
+# Set per request by the read-your-writes middleware; None outside requests, e.g. in the embedding worker
+client_writes: ContextVar[ClientWrites | None] = ContextVar("client_writes", default=None)
+
+
+def parse_lsn(lsn: str) -> int:
+    """A ``pg_lsn`` such as ``16/B374D848`` as an integer, so positions can be compared."""
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+class ReplicaPools:
+    """Connection pools of read replicas in front of the primary's.
+
+    Reads rotate over the replicas that passed their last health check and fall back to the primary when
+    none did. A client that wrote an article, per ``client_writes``, only reads from replicas that had
+    replayed its write at their last check, so it doesn't see a replica's older copy of its own change.
+    Other clients' reads are unaffected.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncConnectionPool,
+        replicas: list[AsyncConnectionPool],
+        max_lag_seconds: float = settings.DB_REPLICA_MAX_LAG_SECONDS,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.unhealthy: set[AsyncConnectionPool] = set()
+        # WAL position each replica had replayed at its last check
+        self.replayed: dict[AsyncConnectionPool, int] = {}
+        self._rotation = itertools.count()
+
+    @property
+    def pools(self) -> list[AsyncConnectionPool]:
+        return [self.primary, *self.replicas]
+
+    def read_pool(self) -> AsyncConnectionPool:
+        healthy = [_pool for _pool in self.replicas if _pool not in self.unhealthy]
+        writes = client_writes.get()
+        if writes is not None and writes.read_after is not None:
+            healthy = [_pool for _pool in healthy if self.replayed.get(_pool, -1) >= writes.read_after]
+        if not healthy:
+            return self.primary
+        return healthy[next(self._rotation) % len(healthy)]
+
+    @staticmethod
+    def tracks_writes() -> bool:
+        """Whether the current request's writes should record their WAL position, with ``mark_written``."""
+        return client_writes.get() is not None
+
+    @staticmethod
+    def mark_written(lsn: str) -> None:
+        """Pin the current client's reads to servers that have replayed up to ``lsn``, the end of its write."""
+        writes = client_writes.get()
+        if writes is not None:
+            writes.read_after = parse_lsn(lsn)
+            writes.written = lsn
+
+    def mark_unhealthy(self, pool: AsyncConnectionPool) -> None:
+        if pool not in self.unhealthy:
+            logger.warning("Replica %s is unavailable, reading from the primary until it recovers", pool.name)
+        self.unhealthy.add(pool)
+
+    async def check(self) -> None:
+        """Measure every replica's lag; those unreachable or behind by more than ``max_lag_seconds`` stop serving."""
+        primary_lsn = await self._primary_lsn()
+        if primary_lsn is None:
+            # Lag can't be told apart from an idle primary, so the replicas keep their last state
+            return
+        for pool in self.replicas:
+            lag, replayed = await self._replication_lag(pool, primary_lsn)
+            if replayed is not None:
+                self.replayed[pool] = parse_lsn(replayed)
+            if lag is not None and lag <= self.max_lag_seconds:
+                if pool in self.unhealthy:
+                    logger.info("Replica %s recovered, lag %.1fs", pool.name, lag)
+                self.unhealthy.discard(pool)
+            else:
+                self.mark_unhealthy(pool)
+
+    async def _primary_lsn(self) -> str | None:
+        try:
+            async with self.primary.connection() as conn:
+                cur = await conn.execute(PRIMARY_LSN_QUERY)
+                (lsn,) = await cur.fetchone()
+                return lsn
+        except psycopg.Error:
+            logger.warning("Couldn't read the primary's WAL position, skipping the replica health check")
+            return None
+
+    @staticmethod
+    async def _replication_lag(pool: AsyncConnectionPool, primary_lsn: str) -> tuple[float | None, str | None]:
+        """The replica's lag in seconds and the WAL position it has replayed, both None when unreachable."""
+        try:
+            async with pool.connection() as conn:
+                cur = await conn.execute(REPLICATION_LAG_QUERY, {"primary_lsn": primary_lsn})
+                lag, replayed = await cur.fetchone()
+                return (float(lag) if lag is not None else None), replayed
+        except psycopg.Error:
+            return None, None
+
+    async def open(self) -> None:
+        # Don't wait for the replicas: one that is down is skipped by the first health check
+        for pool in self.replicas:
+            await pool.open()
+
+    async def close(self) -> None:
+        for pool in self.replicas:
+            await pool.close()
+
+
+async def run_replica_health_checks(
+    replicas: ReplicaPools, stop: asyncio.Event, interval_seconds: float = settings.DB_REPLICA_HEALTH_CHECK_SECONDS
+) -> None:
+    """Check the replicas every ``interval_seconds`` until ``stop`` is set."""
+    while not stop.is_set():
+        try:
+            await replicas.check()
+        except Exception:
+            logger.exception("Replica health check failed")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from psycopg_pool import AsyncConnectionPool
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import EmbeddingCache
+from semantic_search_service.adapters.encoder import close_encoders
+from semantic_search_service.adapters.psql_repo import PSQLRepo, config_pool, create_vector_extension
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import IndexMethod, Quantization
+from semantic_search_service.services.embedding_jobs_services import run_embedding_worker
+from semantic_search_service.services.ingestion_services import backfill_chunk_embeddings, backfill_embeddings, \
+    ingest_articles, iter_articles_from_file
+
+default_conn_info = os.environ.get("DATABASE_CONNINFO", "dbname=vectordb host=localhost user=admin password=admin")
+
+
+async def run_ingest(args: argparse.Namespace) -> None:
+    async with open_repo(args.conninfo) as repo:
+        embedding_cache = EmbeddingCache(
+            max_entries=settings.ARTICLE_EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ARTICLE_EMBEDDING_CACHE_TTL_SECONDS,
+            max_bytes=settings.ARTICLE_EMBEDDING_CACHE_MAX_BYTES,
+        )
+        report = await ingest_articles(
+            iter_articles_from_file(args.path),
+            repo,
+            args.model,
+            batch_size=args.batch_size,
+            embedding_cache=embedding_cache,
+        )
+        logging.info(
+            "Ingested %d articles in %.1fs (%.1f articles/s)",
+            report.articles, report.seconds, report.articles_per_second,
+        )
+        if args.index:
+            await create_indexes(repo, args.model, args.index, args.quantization)
+
+
+async def run_backfill(args: argparse.Namespace) -> None:
+    async with open_repo(args.conninfo) as repo:
+        report = await backfill_embeddings(repo, args.model, batch_size=args.batch_size)
+        logging.info(
+            "Backfilled %s embeddings for %d articles in %.1fs (%.1f articles/s)",
+            args.model, report.articles, report.seconds, report.articles_per_second,
+        )
+        report = await backfill_chunk_embeddings(repo, args.model, batch_size=args.batch_size)
+        logging.info(
+            "Backfilled %s chunk embeddings for %d articles in %.1fs (%.1f articles/s)",
+            args.model, report.articles, report.seconds, report.articles_per_second,
+        )
+        if args.index:
+            await create_indexes(repo, args.model, args.index, args.quantization, concurrently=True)
+
+
+async def run_worker(args: argparse.Namespace) -> None:
+    async with open_repo(args.conninfo) as repo:
+        logging.info("Draining embedding jobs in batches of %d", args.batch_size)
+        # Runs until interrupted; a job left running is claimed again when its lease expires
+        await run_embedding_worker(repo, asyncio.Event(), batch_size=args.batch_size)
+
+
+@asynccontextmanager
+async def open_repo(conn_info: str) -> AsyncIterator[PSQLRepo]:
+    await create_vector_extension(conn_info)
+    pool = AsyncConnectionPool(conninfo=conn_info, open=False, timeout=5, configure=config_pool)
+    await pool.open()
+    repo = PSQLRepo(pool, db_name="vectordb")
+    try:
+        await create_schema(repo)
+        yield repo
+    finally:
+        await close_encoders()
+        await pool.close()
+
+
+async def create_schema(repo: PSQLRepo) -> None:
+    await repo.create_articles_table()
+    await repo.migrate_legacy_embedding_columns()
+    await repo.alter_articles_table_add_embeddings()
+    await repo.alter_articles_table_add_search_vector()
+    await repo.create_article_chunks_table()
+    await repo.create_embedding_jobs_table()
+    await repo.alter_articles_table_add_content_hashes()
+    # Only the in-memory index needs the written ids
+    await repo.create_article_change_triggers(notify_ids=settings.SEARCH_BACKEND == "memory")
+
+
+async def create_indexes(
+    repo: PSQLRepo,
+    model: Model,
+    method: IndexMethod,
+    quantization: Quantization = Quantization.NONE,
+    concurrently: bool = False,
+) -> None:
+    await repo.create_embedding_indexes(
+        model,
+        method,
+        quantization,
+        m=settings.HNSW_M,
+        ef_construction=settings.HNSW_EF_CONSTRUCTION,
+        lists=settings.IVFFLAT_LISTS,
+        concurrently=concurrently,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="semantic-search")
+    parser.add_argument("--conninfo", default=default_conn_info)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Load articles from a JSON array or JSONL file")
+    ingest.add_argument("path")
+    ingest.add_argument("--model", type=Model, choices=list(Model), default=Model.MINI_LM)
+    ingest.add_argument("--batch-size", type=int, default=1024)
+    ingest.add_argument("--index", type=IndexMethod, choices=list(IndexMethod), default=None,
+                        help="Build ANN indexes once loading finishes")
+    ingest.add_argument("--quantization", type=Quantization, choices=list(Quantization),
+                        default=Quantization(settings.SEARCH_QUANTIZATION),
+                        help="Build the article indexes over halfvec or binary-quantized embeddings")
+    ingest.set_defaults(handler=run_ingest)
+
+    backfill = subparsers.add_parser("backfill", help="Compute a model's embeddings for articles that lack them")
+    backfill.add_argument("--model", type=Model, choices=list(Model), required=True)
+    backfill.add_argument("--batch-size", type=int, default=256)
+    backfill.add_argument("--index", type=IndexMethod, choices=list(IndexMethod), default=None,
+                          help="Build ANN indexes concurrently once the backfill finishes")
+    backfill.add_argument("--quantization", type=Quantization, choices=list(Quantization),
+                          default=Quantization(settings.SEARCH_QUANTIZATION),
+                          help="Build the article indexes over halfvec or binary-quantized embeddings")
+    backfill.set_defaults(handler=run_backfill)
+
+    worker = subparsers.add_parser("worker", help="Encode articles written with async_embeddings=true")
+    worker.add_argument("--batch-size", type=int, default=settings.EMBEDDING_JOB_BATCH_SIZE)
+    worker.set_defaults(handler=run_worker)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    args = build_parser().parse_args(argv)
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,38 @@
-from pydantic import BaseModel, ConfigDict
+import hashlib
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 import numpy as np
 
+from semantic_search_service.domain.models import Model
+
+
+class EmbeddingField(StrEnum):
+    TITLE = "title"
+    EXCERPT = "excerpt"
+    BODY = "body"
+
+    @property
+    def attribute(self) -> str:
+        return f"{self}_embedding"
+
+    def column(self, model: Model) -> str:
+        return f"{model}_{self}_embedding"
+
+    @property
+    def hash_column(self) -> str:
+        return f"{self}_hash"
+
+    def embedding_hash_column(self, model: Model) -> str:
+        """Column holding the hash of the text ``model``'s stored embedding of this field was computed from."""
+        return f"{self.column(model)}_hash"
+
+
+def content_hash(text: str) -> str:
+    """Hex MD5 of ``text``, equal to Postgres' ``md5(text)`` so hashes can be computed on either side."""
+    return hashlib.md5(text.encode()).hexdigest()
+
 
 class ArticlePatch(BaseModel):
     title: str | None = None
@@ -31,3 +62,39 @@ class ArticleWithEmbeddings(Article):
     excerpt_embedding: np.ndarray[np.float32]
     body_embedding: np.ndarray[np.float32]
 
+
+class ArticlePatchItem(ArticlePatch):
+    id: int
+
+
+class BulkInsertRequest(BaseModel):
+    articles: list[Article] = Field(min_length=1, max_length=1000)
+
+
+class BulkPatchRequest(BaseModel):
+    articles: list[ArticlePatchItem] = Field(min_length=1, max_length=1000)
+
+    @field_validator("articles")
+    @classmethod
+    def ids_are_unique(cls, articles: list[ArticlePatchItem]) -> list[ArticlePatchItem]:
+        if len({article.id for article in articles}) != len(articles):
+            raise ValueError("each article id can only be patched once per request")
+        return articles
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=1000)
+
+
+class BulkItemStatus(StrEnum):
+    CREATED = "created"
+    QUEUED = "queued"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+
+
+class BulkItemResult(BaseModel):
+    """Outcome of one item of a bulk request, in request order. ``queued`` means embeddings are pending."""
+    id: int
+    status: BulkItemStatus
@@ -0,0 +1,29 @@
+from enum import StrEnum
+
+from semantic_search_service.domain.models import Model
+
+
+class ChunkAggregation(StrEnum):
+    MAX = "max"
+    MEAN = "mean"
+
+
+def chunk_column(model: Model) -> str:
+    return f"{model}_embedding"
+
+
+def chunk_text(text: str, size: int, overlap: int) -> list[str]:
+    """Split ``text`` into windows of ``size`` words, each sharing ``overlap`` words with the previous one.
+
+    Words stand in for model tokens so chunking doesn't need a tokenizer; ``size`` is picked to stay under
+    the models' max sequence length, which is what the encoder would otherwise silently truncate at.
+    """
+    if not 0 <= overlap < size:
+        raise ValueError(f"overlap must be in [0, {size}), got {overlap}")
+    words = text.split()
+    step = size - overlap
+    return [
+        " ".join(words[start:start + size])
+        for start in range(0, max(len(words) - overlap, 1), step)
+        if words[start:start + size]
+    ]
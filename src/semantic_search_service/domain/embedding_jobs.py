@@ -0,0 +1,22 @@
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+from semantic_search_service.domain.models import Model
+
+
+class JobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class EmbeddingJob(BaseModel):
+    article_id: int
+    model: Model
+    status: JobStatus
+    attempts: int
+    error: str | None = None
+    updated_at: datetime
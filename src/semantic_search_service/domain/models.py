@@ -1,30 +1,98 @@
+import os
 from enum import StrEnum
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
-from sentence_transformers import SentenceTransformer
-from functools import lru_cache
+from semantic_search_service import settings
 
 
 model_name = "sentence-transformers/all-MiniLM-L6-v2"
 asymmetric_model_name = "sentence-transformers/multi-qa-mpnet-base-dot-v1"
 
-mini_lm_model = SentenceTransformer(model_name)
-asymmetric_model = SentenceTransformer(asymmetric_model_name)
-
 
 class ModelNotFound(Exception):
     pass
 
+
+class EmbeddingDimensionMismatch(ValueError):
+    pass
+
+
 class Model(StrEnum):
     MINI_LM = "mini_lm"
     MP_NET = "mp_net"
 
 
+model_names = {
+    Model.MINI_LM: model_name,
+    Model.MP_NET: asymmetric_model_name,
+}
+
+model_dimensions = {
+    Model.MINI_LM: 384,
+    Model.MP_NET: 768,
+}
+
+
+def check_model_enabled(model: Model) -> None:
+    if model not in list(Model):
+        raise ModelNotFound(f"{model} not available")
+    if model not in settings.ENABLED_MODELS:
+        raise ModelNotFound(f"{model} is not enabled")
+
+
 @lru_cache
 def get_model(model: Model) -> Any:
-    match model:
-        case Model.MINI_LM:
-            return mini_lm_model
-        case Model.MP_NET:
-            return asymmetric_model
-    raise ModelNotFound(f"{model_name} not available")
+    """Load ``model`` on first use; later calls return the same instance."""
+    check_model_enabled(model)
+    return load_sentence_transformer(model_names[Model(model)])
+
+
+def load_sentence_transformer(name: str) -> Any:
+    # Imported here because torch alone takes seconds to import
+    from sentence_transformers import SentenceTransformer
+
+    if settings.MODEL_NUM_THREADS:
+        set_model_threads(settings.MODEL_NUM_THREADS)
+    if settings.MODEL_BACKEND == "onnx" and settings.MODEL_QUANTIZE:
+        return _load_quantized_onnx_model(name)
+    sentence_transformer = SentenceTransformer(name, device=settings.MODEL_DEVICE, backend=settings.MODEL_BACKEND)
+    if settings.MODEL_BACKEND == "torch" and settings.MODEL_QUANTIZE:
+        import torch
+
+        sentence_transformer = torch.ao.quantization.quantize_dynamic(
+            sentence_transformer, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return sentence_transformer
+
+
+def _load_quantized_onnx_model(name: str) -> Any:
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    export_dir = Path(settings.MODEL_CACHE_DIR) / name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{settings.ONNX_QUANTIZATION_CONFIG}.onnx"
+    if not (export_dir / file_name).exists():
+        onnx_model = SentenceTransformer(name, device="cpu", backend="onnx")
+        onnx_model.save(str(export_dir))
+        export_dynamic_quantized_onnx_model(onnx_model, settings.ONNX_QUANTIZATION_CONFIG, str(export_dir))
+    return SentenceTransformer(str(export_dir), device="cpu", backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def threads_per_worker(workers: int, cpu_count: int | None = None) -> int:
+    """torch threads for each of ``workers`` processes sharing the host, ``MODEL_NUM_THREADS`` when set."""
+    if settings.MODEL_NUM_THREADS:
+        return settings.MODEL_NUM_THREADS
+    return max(1, (cpu_count or os.cpu_count() or 1) // workers)
+
+
+def set_model_threads(num_threads: int) -> None:
+    import torch
+
+    torch.set_num_threads(num_threads)
+
+
+def warmup_models(models: list[Model] | None = None) -> None:
+    """Load the enabled models and run one forward pass so the first request doesn't pay for it."""
+    for model in models or settings.ENABLED_MODELS:
+        get_model(Model(model)).encode(["warmup"])
@@ -0,0 +1,149 @@
+import base64
+import json
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel, Field
+
+from semantic_search_service.domain.articles import EmbeddingField
+from semantic_search_service.domain.chunks import ChunkAggregation
+
+
+class IndexMethod(StrEnum):
+    HNSW = "hnsw"
+    IVFFLAT = "ivfflat"
+
+
+class Quantization(StrEnum):
+    """Compact representation scanned by the ANN index before exact re-ranking on the float32 column."""
+
+    NONE = "none"
+    HALFVEC = "halfvec"
+    BINARY = "binary"
+
+
+class SearchMode(StrEnum):
+    SEMANTIC = "semantic"
+    MULTI_FIELD = "multi_field"
+    HYBRID = "hybrid"
+    CHUNKS = "chunks"
+
+
+class FusionMethod(StrEnum):
+    WEIGHTED = "weighted"
+    RRF = "rrf"
+
+
+class ResultField(StrEnum):
+    TITLE = "title"
+    EXCERPT = "excerpt"
+    BODY = "body"
+    UPDATED_AT = "updated_at"
+    CREATED_AT = "created_at"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidResultFields(ValueError):
+    pass
+
+
+class UnsupportedSearchMode(ValueError):
+    pass
+
+
+def encode_cursor(distance: float, article_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([distance, article_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        distance, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(distance), int(article_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid cursor {cursor!r}") from exc
+
+
+def parse_result_fields(fields: str | None) -> list[ResultField]:
+    """Parse a comma-separated list of article columns; all of them when ``fields`` is empty."""
+    if not fields:
+        return list(ResultField)
+    names = [_name.strip() for _name in fields.split(",") if _name.strip()]
+    unknown = [_name for _name in names if _name not in set(ResultField)]
+    if unknown:
+        raise InvalidResultFields(f"Unknown result fields {unknown}, expected some of {list(map(str, ResultField))}")
+    return [_field for _field in ResultField if _field in names]
+
+
+class SearchOptions(BaseModel):
+    mode: SearchMode = SearchMode.SEMANTIC
+    limit: int = Field(default=5, ge=1, le=100)
+    cursor: str | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    updated_after: datetime | None = None
+    updated_before: datetime | None = None
+    field: EmbeddingField = EmbeddingField.BODY
+    ef_search: int | None = Field(default=None, ge=1, le=1000)
+    probes: int | None = Field(default=None, ge=1)
+    fusion: FusionMethod = FusionMethod.WEIGHTED
+    title_weight: float = Field(default=1.0, ge=0)
+    excerpt_weight: float = Field(default=1.0, ge=0)
+    body_weight: float = Field(default=1.0, ge=0)
+    semantic_weight: float = Field(default=1.0, ge=0)
+    lexical_weight: float = Field(default=1.0, ge=0)
+    # Per-field candidates for multi_field / hybrid, and candidates re-ranked at full precision with quantization
+    candidates: int = Field(default=50, ge=1, le=1000)
+    chunk_aggregation: ChunkAggregation = ChunkAggregation.MAX
+    # Comma-separated article columns to return, e.g. "title,excerpt". All of them when unset
+    fields: str | None = None
+
+    def weight(self, field: EmbeddingField) -> float:
+        return getattr(self, f"{field}_weight")
+
+    @property
+    def after(self) -> tuple[float, int] | None:
+        """The (distance, id) of the last result of the previous page."""
+        return decode_cursor(self.cursor) if self.cursor else None
+
+    @property
+    def result_fields(self) -> list[ResultField]:
+        return parse_result_fields(self.fields)
+
+    @property
+    def has_filters(self) -> bool:
+        return any(
+            _value is not None
+            for _value in (self.created_after, self.created_before, self.updated_after, self.updated_before)
+        )
+
+
+class SearchResult(BaseModel):
+    """One search hit. Only the columns requested through ``SearchOptions.fields`` are set.
+
+    ``score`` is higher for better matches: cosine similarity in semantic mode, the fused score otherwise.
+    """
+
+    id: int
+    score: float
+    title: str | None = None
+    excerpt: str | None = None
+    body: str | None = None
+    updated_at: datetime | None = None
+    created_at: datetime | None = None
+
+
+class SearchPage(BaseModel):
+    results: list[SearchResult]
+    next_cursor: str | None = None
+
+
+class BatchSearchRequest(BaseModel):
+    user_queries: list[str] = Field(min_length=1, max_length=1000)
+
+
+class BatchSearchResult(BaseModel):
+    user_query: str
+    results: list[SearchResult]
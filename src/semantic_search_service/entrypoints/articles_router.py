@@ -1,18 +1,76 @@
 
 from fastapi import APIRouter, HTTPException
 from fastapi.params import Depends
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache
 from semantic_search_service.adapters.psql_repo import PSQLRepo
-from semantic_search_service.domain.articles import Article, ArticlePatch
+from semantic_search_service.domain.articles import Article, ArticlePatch, BulkDeleteRequest, BulkInsertRequest, \
+    BulkItemResult, BulkPatchRequest
+from semantic_search_service.domain.embedding_jobs import EmbeddingJob
 from semantic_search_service.domain.models import Model
-from semantic_search_service.fastapi_dependencies import get_psql_repo
-from semantic_search_service.services.articles_services import get_articles_service, insert_new_article_service, \
-    patch_article_service
+from semantic_search_service.fastapi_dependencies import get_article_embedding_cache, get_psql_repo, \
+    get_search_result_cache
+from semantic_search_service.services.embedding_jobs_services import get_embedding_jobs_service
+from semantic_search_service.services.export_services import export_articles_service
+from semantic_search_service.services.articles_services import delete_articles_service, get_articles_service, \
+    insert_articles_service, insert_new_article_service, patch_article_service, patch_articles_service, \
+    delete_article_service
 
 articles_router = APIRouter(prefix="/articles", tags=["articles"])
 
 
+@articles_router.get("/export")
+async def export_articles(
+    fields: str | None = None,
+    model: Model | None = None,
+    repo: PSQLRepo = Depends(get_psql_repo),
+) -> StreamingResponse:
+    """Stream all articles as NDJSON. With ``model``, its embeddings are added as base64 float32 strings."""
+    return StreamingResponse(export_articles_service(repo, fields, model), media_type="application/x-ndjson")
+
+
+# Declared before the /{article_id} routes, which would otherwise match "bulk"
+@articles_router.post("/bulk")
+async def post_articles(
+    bulk_request: BulkInsertRequest,
+    model: Model,
+    async_embeddings: bool = False,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+    embedding_cache: EmbeddingCache = Depends(get_article_embedding_cache),
+) -> JSONResponse:
+    results = await insert_articles_service(
+        bulk_request.articles, repo, model, result_cache, async_embeddings, embedding_cache
+    )
+    return JSONResponse(
+        [result.model_dump(mode="json") for result in results], status_code=202 if async_embeddings else 200
+    )
+
+
+@articles_router.patch("/bulk")
+async def patch_articles(
+    bulk_request: BulkPatchRequest,
+    model: Model,
+    async_embeddings: bool = False,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+    embedding_cache: EmbeddingCache = Depends(get_article_embedding_cache),
+) -> list[BulkItemResult]:
+    return await patch_articles_service(
+        bulk_request.articles, repo, model, result_cache, async_embeddings, embedding_cache
+    )
+
+
+@articles_router.delete("/bulk")
+async def delete_articles(
+    bulk_request: BulkDeleteRequest,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+) -> list[BulkItemResult]:
+    return await delete_articles_service(bulk_request.ids, repo, result_cache)
+
+
 @articles_router.get("/{article_id}")
 async def get_articles(article_id: int, repo: PSQLRepo = Depends(get_psql_repo)) -> Article:
     article =  await get_articles_service(article_id, repo)
@@ -21,23 +79,54 @@ async def get_articles(article_id: int, repo: PSQLRepo = Depends(get_psql_repo))
     return article
 
 
+@articles_router.get("/{article_id}/embeddings")
+async def get_embedding_jobs(article_id: int, repo: PSQLRepo = Depends(get_psql_repo)) -> list[EmbeddingJob]:
+    """Status of the queued embedding jobs of an article written with ``async_embeddings``."""
+    return await get_embedding_jobs_service(article_id, repo)
+
+
 @articles_router.post("/")
-async def post_article(article_body: Article, model: Model, repo: PSQLRepo = Depends(get_psql_repo)) -> JSONResponse:
-    inserted_id = await insert_new_article_service(article_body, repo, model)
+async def post_article(
+    article_body: Article,
+    model: Model,
+    async_embeddings: bool = False,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+    embedding_cache: EmbeddingCache = Depends(get_article_embedding_cache),
+) -> JSONResponse:
+    inserted_id = await insert_new_article_service(
+        article_body, repo, model, result_cache, async_embeddings, embedding_cache
+    )
+    if async_embeddings:
+        return JSONResponse({"msg": "Created new article, embeddings queued", "id": inserted_id}, status_code=202)
     return JSONResponse({"msg": "Created new article", "id": inserted_id})
 
 
 @articles_router.delete("/{article_id}")
-async def delete_article(article_id: int, repo: PSQLRepo = Depends(get_psql_repo)) -> JSONResponse:
-    deleted_id = await repo.delete_article_by_id(article_id)
+async def delete_article(
+    article_id: int,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+) -> JSONResponse:
+    deleted_id = await delete_article_service(article_id, repo, result_cache)
     if not deleted_id:
         raise HTTPException(status_code=404, detail=f"Article not found for {article_id=}")
     return JSONResponse({"msg": "Deleted article", "id": article_id})
 
 
 @articles_router.patch("/{article_id}")
-async def patch_article(article_id: int, article_body: ArticlePatch, model: Model ,repo: PSQLRepo = Depends(get_psql_repo)) -> Article:
-    updated_article = await patch_article_service(article_id, article_body, repo, model)
+async def patch_article(
+    article_id: int,
+    article_body: ArticlePatch,
+    model: Model,
+    async_embeddings: bool = False,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+    embedding_cache: EmbeddingCache = Depends(get_article_embedding_cache),
+) -> Article:
+    updated_article = await patch_article_service(
+        article_id, article_body, repo, model, result_cache, async_embeddings, embedding_cache
+    )
     if not updated_article:
         raise HTTPException(status_code=404, detail=f"Article not found for {article_id=}")
     return updated_article
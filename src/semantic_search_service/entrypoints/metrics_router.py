@@ -0,0 +1,84 @@
+from fastapi import APIRouter
+from fastapi.params import Depends
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache
+from semantic_search_service.adapters.metrics import histograms, render_gauge, request_timings
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.fastapi_dependencies import get_article_embedding_cache, get_psql_repo, \
+    get_query_embedding_cache, get_search_result_cache
+
+metrics_router = APIRouter(tags=["metrics"])
+
+CACHE_STATS = ("hits", "misses", "evictions", "hit_rate", "entries", "size_bytes")
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(
+    repo: PSQLRepo = Depends(get_psql_repo),
+    embedding_cache: EmbeddingCache = Depends(get_query_embedding_cache),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+    article_embedding_cache: EmbeddingCache = Depends(get_article_embedding_cache),
+) -> PlainTextResponse:
+    """Prometheus text exposition of the stage and encoder histograms, pool statistics and cache counters."""
+    cache_stats = {
+        "query_embeddings": embedding_cache.stats(),
+        "results": result_cache.stats(),
+        "article_embeddings": article_embedding_cache.stats(),
+    }
+    parts = [histogram.render() for histogram in histograms]
+    pools = repo.replicas.pools if repo.replicas is not None else [repo.pool]
+    pool_stats = {_pool.name: _pool.get_stats() for _pool in pools}
+    parts.extend(
+        render_gauge(
+            f"psycopg_{_name}",
+            f"psycopg_pool {_name} statistic.",
+            [({"pool": _pool}, stats[_name]) for _pool, stats in pool_stats.items() if _name in stats],
+        )
+        for _name in sorted(set().union(*pool_stats.values()))
+    )
+    if repo.replicas is not None:
+        parts.append(render_gauge(
+            "replica_healthy",
+            "Whether the replica passed its last health check.",
+            [({"pool": _pool.name}, int(_pool not in repo.replicas.unhealthy)) for _pool in repo.replicas.replicas],
+        ))
+    parts.extend(
+        render_gauge(
+            f"cache_{_stat}",
+            f"Cache {_stat.replace('_', ' ')}.",
+            [({"cache": _cache}, getattr(stats, _stat)) for _cache, stats in cache_stats.items()],
+        )
+        for _stat in CACHE_STATS
+    )
+    return PlainTextResponse("".join(parts), media_type="text/plain; version=0.0.4")
+
+
+class ServerTimingMiddleware:
+    """Collects the stages timed while handling a request and reports them in a Server-Timing header.
+
+    A plain ASGI middleware rather than ``BaseHTTPMiddleware``, which runs the endpoint in another task
+    and so would not see the context variable the stages are recorded in.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: dict[str, float] = {}
+        token = request_timings.set(timings)
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start" and timings:
+                header = ", ".join(f"{_stage};dur={_seconds * 1000:.2f}" for _stage, _seconds in timings.items())
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(token)
@@ -0,0 +1,50 @@
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from semantic_search_service.adapters.replicas import ClientWrites, client_writes, parse_lsn
+
+# Holds the WAL position of the client's last article write
+READ_AFTER_COOKIE = "read_after_lsn"
+
+
+class ReadYourWritesMiddleware:
+    """Carries each client's last write position between its requests in a cookie.
+
+    Reads of a request with the cookie skip replicas that haven't replayed that position, and a request that
+    writes sets the cookie to its own, valid for ``max_age_seconds``. Like ``ServerTimingMiddleware``, a
+    plain ASGI middleware so the endpoint runs in the context the position is set in.
+    """
+
+    def __init__(self, app: ASGIApp, max_age_seconds: float) -> None:
+        self.app = app
+        self.max_age_seconds = max_age_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        writes = ClientWrites(read_after=_read_after(HTTPConnection(scope).cookies.get(READ_AFTER_COOKIE)))
+        token = client_writes.set(writes)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes.written is not None:
+                cookie = (
+                    f"{READ_AFTER_COOKIE}={writes.written}; Max-Age={int(self.max_age_seconds)}; Path=/; "
+                    "HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            client_writes.reset(token)
+
+
+def _read_after(cookie: str | None) -> int | None:
+    if not cookie:
+        return None
+    try:
+        return parse_lsn(cookie)
+    except ValueError:
+        return None
@@ -2,12 +2,19 @@ from typing import Annotated
 
 from fastapi import APIRouter, Query
 from fastapi.params import Depends
+from pydantic import TypeAdapter
+from starlette.responses import Response, StreamingResponse
 
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import CacheStats, EmbeddingCache, SearchResultCache
+from semantic_search_service.adapters.metrics import timed
 from semantic_search_service.adapters.psql_repo import PSQLRepo
-from semantic_search_service.domain.articles import Article
 from semantic_search_service.domain.models import Model
-from semantic_search_service.fastapi_dependencies import get_psql_repo
-from semantic_search_service.services.search_services import semantic_search_service
+from semantic_search_service.domain.search import BatchSearchRequest, BatchSearchResult, SearchOptions, SearchPage
+from semantic_search_service.fastapi_dependencies import get_article_embedding_cache, get_psql_repo, \
+    get_query_embedding_cache, get_search_result_cache
+from semantic_search_service.services.export_services import export_search_service
+from semantic_search_service.services.search_services import batch_semantic_search_service, semantic_search_service
 
 search_router = APIRouter(
     prefix="/search",
@@ -16,11 +23,88 @@ search_router = APIRouter(
 
 user_query_param = Query(example="News about global economy")
 
+_batch_results_adapter = TypeAdapter(list[BatchSearchResult])
 
-@search_router.get("/", response_model=list[Article])
-async def search(user_query: Annotated[str, user_query_param], model: Model, repo: PSQLRepo = Depends(get_psql_repo)) -> list[Article]:
-    return await semantic_search_service(
+
+@search_router.get("/", response_model=SearchPage, response_model_exclude_unset=True)
+async def search(
+    user_query: Annotated[str, user_query_param],
+    model: Model,
+    options: Annotated[SearchOptions, Depends()],
+    repo: PSQLRepo = Depends(get_psql_repo),
+    embedding_cache: EmbeddingCache = Depends(get_query_embedding_cache),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+) -> Response:
+    page = await semantic_search_service(
         repo=repo,
         model=model,
         user_query=user_query,
+        options=options,
+        embedding_cache=embedding_cache,
+        result_cache=result_cache,
+    )
+    # Serialized here rather than by FastAPI so the time spent is part of the request's timings
+    with timed("serialize"):
+        return Response(page.model_dump_json(exclude_unset=True), media_type="application/json")
+
+
+@search_router.post("/batch", response_model=list[BatchSearchResult], response_model_exclude_unset=True)
+async def batch_search(
+    batch_request: BatchSearchRequest,
+    model: Model,
+    options: Annotated[SearchOptions, Depends()],
+    repo: PSQLRepo = Depends(get_psql_repo),
+    embedding_cache: EmbeddingCache = Depends(get_query_embedding_cache),
+) -> Response:
+    results = await batch_semantic_search_service(
+        user_queries=batch_request.user_queries,
+        model=model,
+        repo=repo,
+        options=options,
+        embedding_cache=embedding_cache,
+    )
+    with timed("serialize"):
+        body = _batch_results_adapter.dump_json(
+            [
+                BatchSearchResult(user_query=user_query, results=articles)
+                for user_query, articles in zip(batch_request.user_queries, results)
+            ],
+            exclude_unset=True,
+        )
+        return Response(body, media_type="application/json")
+
+
+@search_router.get("/export")
+async def export_search(
+    user_query: Annotated[str, user_query_param],
+    model: Model,
+    options: Annotated[SearchOptions, Depends()],
+    max_results: Annotated[int, Query(ge=1, le=settings.EXPORT_MAX_LIMIT)] = 1000,
+    include_embeddings: bool = False,
+    repo: PSQLRepo = Depends(get_psql_repo),
+    embedding_cache: EmbeddingCache = Depends(get_query_embedding_cache),
+) -> StreamingResponse:
+    """Stream up to ``max_results`` semantic search results as NDJSON, ignoring ``limit`` and ``cursor``."""
+    lines = await export_search_service(
+        user_query=user_query,
+        model=model,
+        repo=repo,
+        options=options,
+        limit=max_results,
+        include_embeddings=include_embeddings,
+        embedding_cache=embedding_cache,
     )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@search_router.get("/cache")
+async def search_cache_stats(
+    embedding_cache: EmbeddingCache = Depends(get_query_embedding_cache),
+    result_cache: SearchResultCache = Depends(get_search_result_cache),
+    article_embedding_cache: EmbeddingCache = Depends(get_article_embedding_cache),
+) -> dict[str, CacheStats]:
+    return {
+        "query_embeddings": embedding_cache.stats(),
+        "results": result_cache.stats(),
+        "article_embeddings": article_embedding_cache.stats(),
+    }
@@ -1,6 +1,24 @@
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache
+from semantic_search_service.adapters.memory_repo import InMemoryRepo
 from semantic_search_service.adapters.psql_repo import PSQLRepo
-from semantic_search_service.resources import pool
+from semantic_search_service.resources import article_embedding_cache, memory_index, pool, query_embedding_cache, \
+    replicas, search_result_cache
 
 
 def get_psql_repo() -> PSQLRepo:
-    return PSQLRepo(pool=pool, db_name="vectordb")
+    if settings.SEARCH_BACKEND == "memory":
+        return InMemoryRepo(pool=pool, db_name="vectordb", index=memory_index, replicas=replicas)
+    return PSQLRepo(pool=pool, db_name="vectordb", replicas=replicas)
+
+
+def get_query_embedding_cache() -> EmbeddingCache:
+    return query_embedding_cache
+
+
+def get_article_embedding_cache() -> EmbeddingCache:
+    return article_embedding_cache
+
+
+def get_search_result_cache() -> SearchResultCache:
+    return search_result_cache
@@ -0,0 +1,127 @@
+"""Pre-fork server: the app and models are loaded once, then forked workers share the weights copy-on-write.
+
+    semantic-search-serve --workers 4 --host 0.0.0.0 --port 8000
+
+``uvicorn --workers`` spawns fresh interpreters, so every worker would import the app and load its own copy of
+each model. Here the parent binds the socket, imports the app and loads ``ENABLED_MODELS`` without running them,
+then forks. Each worker limits torch to its share of the cores and serves the inherited socket.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from semantic_search_service import settings
+from semantic_search_service.domain.models import Model, get_model, set_model_threads, threads_per_worker
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before replacing a worker that exited, so one failing at startup doesn't fork in a loop
+RESTART_DELAY_SECONDS = 1
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload_models() -> None:
+    # Loading only: a forward pass would start torch's OpenMP pool, which doesn't survive fork().
+    # The workers warm the models up in their own lifespan.
+    for model in settings.ENABLED_MODELS:
+        get_model(Model(model))
+    # Keep the garbage collector from touching, and so unsharing, the pages of everything loaded so far
+    gc.freeze()
+
+
+def run_worker(app: str | object, sock: socket.socket, args: argparse.Namespace, num_threads: int) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    set_model_threads(num_threads)
+    config = uvicorn.Config(app, host=args.host, port=args.port, proxy_headers=True, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(app: str | object, sock: socket.socket, args: argparse.Namespace, num_threads: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    exit_code = 0
+    try:
+        run_worker(app, sock, args, num_threads)
+    except BaseException:
+        logger.exception("Worker %d failed", os.getpid())
+        exit_code = 1
+    finally:
+        # Skip the parent's atexit handlers and buffered output, which the fork inherited
+        os._exit(exit_code)
+
+
+def serve(args: argparse.Namespace) -> None:
+    num_threads = threads_per_worker(args.workers)
+    # Read by OpenMP and the tokenizers when they start, i.e. before any model is loaded
+    os.environ.setdefault("OMP_NUM_THREADS", str(num_threads))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    sock = bind_socket(args.host, args.port)
+    app: str | object = "semantic_search_service.main:app"
+    if args.preload:
+        from semantic_search_service.main import app
+
+        preload_models()
+    logger.info("Starting %d workers with %d torch threads each", args.workers, num_threads)
+    workers = {fork_worker(app, sock, args, num_threads) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            logger.warning("Worker %d exited with status %d, restarting", pid, os.waitstatus_to_exitcode(status))
+            time.sleep(RESTART_DELAY_SECONDS)
+            workers.add(fork_worker(app, sock, args, num_threads))
+    sock.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="semantic-search-serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=True,
+                        help="Import the app and load the models before forking the workers")
+    parser.add_argument("--log-level", default="info")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    if sys.platform == "win32":
+        sys.exit("semantic-search-serve forks its workers; use uvicorn on Windows")
+    serve(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
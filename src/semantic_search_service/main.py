@@ -3,25 +3,103 @@ import sys
 from contextlib import asynccontextmanager
 from typing import AsyncContextManager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from starlette.responses import JSONResponse
 
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import run_result_cache_invalidation
+from semantic_search_service.adapters.encoder import close_encoders
+from semantic_search_service.adapters.memory_repo import run_index_sync, wait_until_loaded
+from semantic_search_service.adapters.psql_repo import create_vector_extension
+from semantic_search_service.adapters.replicas import run_replica_health_checks
+from semantic_search_service.domain.models import ModelNotFound, warmup_models
+from semantic_search_service.domain.search import InvalidCursor, InvalidResultFields, UnsupportedSearchMode
 from semantic_search_service.entrypoints.articles_router import articles_router
+from semantic_search_service.entrypoints.metrics_router import ServerTimingMiddleware, metrics_router
+from semantic_search_service.entrypoints.read_your_writes import ReadYourWritesMiddleware
 from semantic_search_service.entrypoints.search_router import search_router
-from semantic_search_service.resources import pool
+from semantic_search_service.fastapi_dependencies import get_psql_repo
+from semantic_search_service.resources import article_embedding_cache, memory_index, pool, replicas, \
+    search_result_cache
+from semantic_search_service.services.embedding_jobs_services import run_embedding_worker
 
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI) -> AsyncContextManager[None]:
     if sys.platform == "win32":
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    await pool.open()
+    await create_vector_extension(settings.DATABASE_CONNINFO)
+    # Wait for min_size connections so the first requests don't pay for connecting
+    await pool.open(wait=True)
+    stop_worker = asyncio.Event()
+    health_checks = None
+    if replicas is not None:
+        await replicas.open()
+        # Replicas only serve reads once a first check has found them caught up
+        await replicas.check()
+        health_checks = asyncio.create_task(run_replica_health_checks(replicas, stop_worker))
+    if settings.WARMUP_MODELS:
+        await asyncio.to_thread(warmup_models)
+    index_sync = None
+    if settings.SEARCH_BACKEND == "memory":
+        index_sync = asyncio.create_task(
+            run_index_sync(
+                get_psql_repo(), memory_index, settings.DATABASE_CONNINFO, stop_worker, result_cache=search_result_cache
+            )
+        )
+        await wait_until_loaded(memory_index, index_sync, stop_worker)
+    cache_invalidation = None
+    if settings.SEARCH_BACKEND != "memory":
+        # The index sync already invalidates the cache on every change it applies
+        cache_invalidation = asyncio.create_task(
+            run_result_cache_invalidation(
+                search_result_cache,
+                settings.DATABASE_CONNINFO,
+                stop_worker,
+                replica_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS if replicas is not None else 0,
+            )
+        )
+    worker = None
+    if settings.EMBEDDING_WORKER_IN_APP:
+        worker = asyncio.create_task(
+            run_embedding_worker(
+                get_psql_repo(), stop_worker, result_cache=search_result_cache, embedding_cache=article_embedding_cache
+            )
+        )
     yield
+    stop_worker.set()
+    if worker is not None:
+        await worker
+    if index_sync is not None:
+        await index_sync
+    if cache_invalidation is not None:
+        await cache_invalidation
+    if health_checks is not None:
+        await health_checks
+        await replicas.close()
+    await close_encoders()
     await pool.close()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(search_router)
 app.include_router(articles_router)
+app.include_router(metrics_router)
+if settings.SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+if replicas is not None and settings.DB_READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware, max_age_seconds=settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+@app.exception_handler(ModelNotFound)
+@app.exception_handler(InvalidCursor)
+@app.exception_handler(InvalidResultFields)
+@app.exception_handler(UnsupportedSearchMode)
+async def invalid_request_handler(
+    request: Request, exc: ModelNotFound | InvalidCursor | InvalidResultFields | UnsupportedSearchMode
+) -> JSONResponse:
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
 
 @app.get("/")
 def status():
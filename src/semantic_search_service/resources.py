@@ -1,15 +1,58 @@
-import psycopg
-from pgvector.psycopg import register_vector_async
+from pathlib import Path
+
 from psycopg_pool import AsyncConnectionPool
 
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache
+from semantic_search_service.adapters.memory_repo import InMemoryVectorIndex
+from semantic_search_service.adapters.psql_repo import config_pool
+from semantic_search_service.adapters.replicas import ReplicaPools
+
+
+
+def build_pool(conn_info: str, name: str) -> AsyncConnectionPool:
+    return AsyncConnectionPool(
+        conninfo=conn_info,
+        open=False,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        timeout=settings.DB_POOL_TIMEOUT,
+        max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+        max_idle=settings.DB_POOL_MAX_IDLE,
+        configure=config_pool,
+        name=name,
+    )
+
+
+pool = build_pool(settings.DATABASE_CONNINFO, "semantic_search")
 
-conn_info = "dbname=vectordb host=potgres user=admin password=admin"
+replicas = ReplicaPools(
+    pool,
+    [
+        build_pool(_conn_info, f"semantic_search_replica_{_position}")
+        for _position, _conn_info in enumerate(settings.DATABASE_REPLICA_CONNINFOS, start=1)
+    ],
+) if settings.DATABASE_REPLICA_CONNINFOS else None
 
-async def config_pool(conn) -> None:
-    with psycopg.connect(conn_info, autocommit=True) as _conn:
-        _conn.execute("""CREATE EXTENSION IF NOT EXISTS vector""")
-    await register_vector_async(conn)
+query_embedding_cache = EmbeddingCache(
+    max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+    max_bytes=settings.QUERY_CACHE_MAX_BYTES,
+)
+
+article_embedding_cache = EmbeddingCache(
+    max_entries=settings.ARTICLE_EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ARTICLE_EMBEDDING_CACHE_TTL_SECONDS,
+    max_bytes=settings.ARTICLE_EMBEDDING_CACHE_MAX_BYTES,
+)
+
+search_result_cache = SearchResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+)
 
-pool = AsyncConnectionPool(
-    conninfo=conn_info, open=False, timeout=5, configure=config_pool
+memory_index = InMemoryVectorIndex(
+    settings.ENABLED_MODELS,
+    mmap_dir=Path(settings.MEMORY_INDEX_MMAP_DIR) if settings.MEMORY_INDEX_MMAP_DIR else None,
 )
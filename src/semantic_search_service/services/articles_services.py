@@ -1,27 +1,41 @@
-import asyncio
 import json
-import sys
 from pathlib import Path
-from typing import Callable
-
-import psycopg
-from pgvector.psycopg import register_vector_async
-from psycopg_pool import AsyncConnectionPool
-from sentence_transformers import SentenceTransformer
+from typing import Callable, TYPE_CHECKING
 
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache
 from semantic_search_service.adapters.psql_repo import PSQLRepo
 from semantic_search_service.domain.articles import ArticleWithEmbeddings, Article, ArticlePatch, \
-    ArticlePatchWithEmbeddings
+    ArticlePatchItem, ArticlePatchWithEmbeddings, BulkItemResult, BulkItemStatus, EmbeddingField, content_hash
 from semantic_search_service.domain.models import get_model, Model
+from semantic_search_service.services.chunks_services import sync_article_chunks
+from semantic_search_service.services.encoding_services import encode_article_texts
+from semantic_search_service.services.ingestion_services import encode_articles
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 
 async def get_articles_service(article_id: int, repo: PSQLRepo) -> Article:
     return await repo.select_article_by_id(article_id)
 
 
-async def insert_new_article_service(article: Article, repo: PSQLRepo, model: Model) -> int:
-    model = get_model(model)
-    title_embedding, excerpt_embedding, body_embedding = model.encode([article.title, article.excerpt, article.body])
+async def insert_new_article_service(
+    article: Article,
+    repo: PSQLRepo,
+    model: Model,
+    result_cache: SearchResultCache | None = None,
+    async_embeddings: bool = False,
+    embedding_cache: EmbeddingCache | None = None,
+) -> int:
+    """Insert an article with its embeddings, or with ``async_embeddings`` queue them for the embedding workers."""
+    if async_embeddings:
+        inserted_id = await repo.insert_new_article(article, model, enqueue_embeddings=True)
+        if result_cache is not None:
+            result_cache.invalidate()
+        return inserted_id[0]
+    title_embedding, excerpt_embedding, body_embedding = await encode_article_texts(
+        [article.title, article.excerpt, article.body], model, repo, embedding_cache
+    )
     article_with_embeddings = ArticleWithEmbeddings(
         title=article.title,
         excerpt=article.excerpt,
@@ -32,44 +46,173 @@ async def insert_new_article_service(article: Article, repo: PSQLRepo, model: Mo
         excerpt_embedding=excerpt_embedding,
         body_embedding=body_embedding,
     )
-    inserted_id = await repo.insert_new_article(article_with_embeddings)
+    inserted_id = await repo.insert_new_article(article_with_embeddings, model)
+    await sync_article_chunks(repo, model, [(inserted_id[0], article.body)])
+    if result_cache is not None:
+        result_cache.invalidate()
     return inserted_id[0]
 
 
-async def delete_article_service(article_id: int, repo: PSQLRepo) -> int | None:
+async def delete_article_service(
+    article_id: int, repo: PSQLRepo, result_cache: SearchResultCache | None = None
+) -> int | None:
     deleted_id = await repo.delete_article_by_id(article_id)
+    if deleted_id and result_cache is not None:
+        result_cache.invalidate()
     return deleted_id
 
 
-async def patch_article_service(article_id: int, article: ArticlePatch, repo: PSQLRepo, model: Model) -> Article | None:
-    article_dict = article.model_dump(exclude_none=True)
+async def patch_article_service(
+    article_id: int,
+    article: ArticlePatch,
+    repo: PSQLRepo,
+    model: Model,
+    result_cache: SearchResultCache | None = None,
+    async_embeddings: bool = False,
+    embedding_cache: EmbeddingCache | None = None,
+) -> Article | None:
+    stored_hashes = await repo.select_content_hashes(article_id)
+    if stored_hashes is None:
+        return None
+    # Fields patched to their current text keep their embeddings, for every model
+    article_dict = {
+        _k: _v
+        for _k, _v in article.model_dump(exclude_none=True).items()
+        if not (_k in stored_hashes and content_hash(_v) == stored_hashes[_k])
+    }
+    if async_embeddings:
+        updated_article = await repo.patch_article_by_id(
+            article_id, ArticlePatchWithEmbeddings(**article_dict), model, enqueue_embeddings=True
+        )
+        if updated_article and result_cache is not None:
+            result_cache.invalidate()
+        return updated_article
     embeddings_to_encode = [
         _k
         for _k, _v in article_dict.items()
         if _k in ["title", "excerpt", "body"] and _v
     ]
-    model = get_model(model)
-    new_embeddings = model.encode([article_dict[_field] for _field in embeddings_to_encode])
+    new_embeddings = await encode_article_texts(
+        [article_dict[_field] for _field in embeddings_to_encode], model, repo, embedding_cache
+    ) if embeddings_to_encode else []
     updated_embeddings = {f"{_field}_embedding": embedding for _field, embedding in zip(embeddings_to_encode, new_embeddings) }
     article_dict.update(updated_embeddings)
-    updated_article = await repo.patch_article_by_id(article_id, ArticlePatchWithEmbeddings(**article_dict))
+    updated_article = await repo.patch_article_by_id(article_id, ArticlePatchWithEmbeddings(**article_dict), model)
+    if updated_article and "body" in embeddings_to_encode:
+        await sync_article_chunks(repo, model, [(article_id, updated_article.body)])
+    if updated_article and result_cache is not None:
+        result_cache.invalidate()
     return updated_article
 
 
+async def insert_articles_service(
+    articles: list[Article],
+    repo: PSQLRepo,
+    model: Model,
+    result_cache: SearchResultCache | None = None,
+    async_embeddings: bool = False,
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[BulkItemResult]:
+    """Insert ``articles`` in one transaction, encoding every field of the batch with a single encoder call."""
+    if async_embeddings:
+        inserted_ids = await repo.insert_articles(articles, model, enqueue_embeddings=True)
+    else:
+        articles_with_embeddings = await encode_articles(
+            [article.model_dump() for article in articles], model, repo, embedding_cache
+        )
+        inserted_ids = await repo.insert_articles(articles_with_embeddings, model)
+        await sync_article_chunks(repo, model, [(_id, article.body) for _id, article in zip(inserted_ids, articles)])
+    if result_cache is not None:
+        result_cache.invalidate()
+    status = BulkItemStatus.QUEUED if async_embeddings else BulkItemStatus.CREATED
+    return [BulkItemResult(id=inserted_id, status=status) for inserted_id in inserted_ids]
+
+
+async def patch_articles_service(
+    patches: list[ArticlePatchItem],
+    repo: PSQLRepo,
+    model: Model,
+    result_cache: SearchResultCache | None = None,
+    async_embeddings: bool = False,
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[BulkItemResult]:
+    """Apply ``patches`` with one UPDATE, encoding the changed fields of all of them with a single encoder call."""
+    stored_hashes = await repo.select_content_hashes_by_ids([patch.id for patch in patches])
+    # As in patch_article_service, fields patched to their current text keep their embeddings
+    article_dicts = {
+        patch.id: {
+            _k: _v
+            for _k, _v in patch.model_dump(exclude_none=True, exclude={"id"}).items()
+            if not (_k in stored_hashes[patch.id] and content_hash(_v) == stored_hashes[patch.id][_k])
+        }
+        for patch in patches
+        if patch.id in stored_hashes
+    }
+    changed_fields = [
+        (article_id, _field) for article_id, article_dict in article_dicts.items() for _field in EmbeddingField
+        if article_dict.get(_field)
+    ]
+    if changed_fields and not async_embeddings:
+        embeddings = await encode_article_texts(
+            [article_dicts[article_id][_field] for article_id, _field in changed_fields], model, repo, embedding_cache
+        )
+        for (article_id, _field), embedding in zip(changed_fields, embeddings):
+            article_dicts[article_id][_field.attribute] = embedding
+    updated_articles = await repo.patch_articles(
+        {article_id: ArticlePatchWithEmbeddings(**article_dict) for article_id, article_dict in article_dicts.items()},
+        model,
+        enqueue_embeddings=async_embeddings,
+    ) if article_dicts else {}
+    if not async_embeddings:
+        await sync_article_chunks(repo, model, [
+            (article_id, updated_articles[article_id].body)
+            for article_id, _field in changed_fields
+            if _field == EmbeddingField.BODY and article_id in updated_articles
+        ])
+    if updated_articles and result_cache is not None:
+        result_cache.invalidate()
+    queued_ids = {article_id for article_id, _ in changed_fields} if async_embeddings else set()
+    return [
+        BulkItemResult(
+            id=patch.id,
+            status=(
+                BulkItemStatus.NOT_FOUND if patch.id not in updated_articles
+                else BulkItemStatus.QUEUED if patch.id in queued_ids
+                else BulkItemStatus.UPDATED
+            ),
+        )
+        for patch in patches
+    ]
+
+
+async def delete_articles_service(
+    article_ids: list[int], repo: PSQLRepo, result_cache: SearchResultCache | None = None
+) -> list[BulkItemResult]:
+    deleted_ids = set(await repo.delete_articles(article_ids))
+    if deleted_ids and result_cache is not None:
+        result_cache.invalidate()
+    return [
+        BulkItemResult(
+            id=article_id, status=BulkItemStatus.DELETED if article_id in deleted_ids else BulkItemStatus.NOT_FOUND
+        )
+        for article_id in article_ids
+    ]
+
+
 async def populate_articles_table(
     data_reader: Callable[[str], list[dict[str, str]]], psql_repo: PSQLRepo, model: str = "mp_net"
 ) -> None:
     path_to_data = Path(__file__).parent.parent / "adapters" / "data" / "articles.json"
     raw_articles = data_reader(str(path_to_data))
-    model = get_model(model)
+    sentence_transformer = get_model(model)
     articles_with_embeddings = [
-        generate_embeddings_from_article(article, model)  for article in raw_articles
+        generate_embeddings_from_article(article, sentence_transformer)  for article in raw_articles
     ]
-    await psql_repo.add_many_articles(articles_with_embeddings)
+    await psql_repo.add_many_articles(articles_with_embeddings, Model(model))
 
 
 def generate_embeddings_from_article(
-    article: dict[str, str], model: SentenceTransformer
+    article: dict[str, str], model: "SentenceTransformer"
 ) -> ArticleWithEmbeddings:
     title_embeddings, excerpt_embeddings, body_embeddings = model.encode(
         [article["title"], article["excerpt"], article["body"]]
@@ -89,29 +232,3 @@ def read_articles_from_json(path_to_data: str) -> list[dict[str, str]]:
         data = json.load(_fp)
         return data
 
-
-
-if __name__ == "__main__":
-    async def config_pool(conn) -> None:
-        await register_vector_async(conn)
-
-
-    if sys.platform == "win32":
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-
-    async def main():
-        conn_info = "dbname=vectordb host=localhost user=admin password=admin"
-        with psycopg.connect(conn_info, autocommit=True) as sync_conn:
-            sync_conn.execute("""CREATE EXTENSION IF NOT EXISTS vector""")
-
-        pool = AsyncConnectionPool(
-            conninfo=conn_info, open=False, timeout=5, configure=config_pool
-        )
-        await pool.open()
-        repo = PSQLRepo(pool, db_name="vectordb")
-        try:
-            await populate_articles_table(data_reader=read_articles_from_json, psql_repo=repo, model="mini_lm")
-        finally:
-            await pool.close()
-
-    asyncio.run(main())
\ No newline at end of file
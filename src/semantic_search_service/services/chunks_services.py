@@ -0,0 +1,45 @@
+import numpy as np
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.encoder import get_encoder
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.domain.articles import content_hash
+from semantic_search_service.domain.chunks import chunk_text
+from semantic_search_service.domain.models import Model
+
+
+async def sync_article_chunks(repo: PSQLRepo, model: Model, bodies: list[tuple[int, str]]) -> int:
+    """Re-chunk the (article id, body) pairs and store ``model``'s chunk embeddings.
+
+    Chunks whose text already has a stored embedding for the article are reused, so a patch only encodes
+    the chunks it changed. All new chunks go to the encoder in one call. Returns how many were encoded.
+    """
+    if not bodies:
+        return 0
+    chunked = {
+        article_id: chunk_text(body, settings.CHUNK_SIZE_WORDS, settings.CHUNK_OVERLAP_WORDS)
+        for article_id, body in bodies
+    }
+    embeddings: dict[tuple[int, str], np.ndarray] = {
+        (article_id, _hash): embedding
+        for article_id, _hash, embedding in await repo.select_chunk_embeddings(model, list(chunked))
+    }
+    missing = {
+        (article_id, content_hash(chunk)): chunk
+        for article_id, chunks in chunked.items()
+        for chunk in chunks
+        if (article_id, content_hash(chunk)) not in embeddings
+    }
+    if missing:
+        new_embeddings = await get_encoder(model).encode(list(missing.values()))
+        embeddings.update(zip(missing, new_embeddings))
+    await repo.upsert_article_chunks(
+        model,
+        [
+            (article_id, position, content_hash(chunk), chunk, embeddings[(article_id, content_hash(chunk))])
+            for article_id, chunks in chunked.items()
+            for position, chunk in enumerate(chunks)
+        ],
+        {article_id: len(chunks) for article_id, chunks in chunked.items()},
+    )
+    return len(missing)
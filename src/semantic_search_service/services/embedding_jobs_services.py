@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from itertools import groupby
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.domain.articles import EmbeddingField
+from semantic_search_service.domain.embedding_jobs import EmbeddingJob
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services.chunks_services import sync_article_chunks
+from semantic_search_service.services.encoding_services import encode_article_texts
+
+logger = logging.getLogger(__name__)
+
+
+async def get_embedding_jobs_service(article_id: int, repo: PSQLRepo) -> list[EmbeddingJob]:
+    return [EmbeddingJob(**job) for job in await repo.select_embedding_jobs(article_id)]
+
+
+async def process_embedding_jobs(
+    repo: PSQLRepo,
+    batch_size: int = settings.EMBEDDING_JOB_BATCH_SIZE,
+    result_cache: SearchResultCache | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> int:
+    """Claim one batch of queued jobs and encode each model's share with a single encoder call.
+
+    Returns the number of jobs claimed, so callers know whether the queue was empty.
+    """
+    jobs = await repo.claim_embedding_jobs(
+        batch_size, settings.EMBEDDING_JOB_LEASE_SECONDS, settings.EMBEDDING_JOB_MAX_ATTEMPTS
+    )
+    fields = list(EmbeddingField)
+    jobs_by_model = groupby(sorted(jobs, key=lambda job: job["model"]), key=lambda job: Model(job["model"]))
+    for model, model_jobs in jobs_by_model:
+        model_jobs = list(model_jobs)
+        try:
+            # Fields a patch left unchanged still hash to their stored embeddings and aren't encoded again
+            embeddings = await encode_article_texts(
+                [job[_field] for job in model_jobs for _field in fields], model, repo, embedding_cache
+            )
+            updated_ids = set(await repo.complete_embedding_jobs(model, [
+                (
+                    job["id"],
+                    job["article_id"],
+                    job["updated_at"],
+                    *embeddings[index * len(fields):(index + 1) * len(fields)],
+                )
+                for index, job in enumerate(model_jobs)
+            ]))
+            await sync_article_chunks(
+                repo, model, [(job["article_id"], job["body"]) for job in model_jobs if job["article_id"] in updated_ids]
+            )
+        except Exception as exc:
+            logger.exception("Embedding %d %s jobs failed", len(model_jobs), model)
+            await repo.fail_embedding_jobs(
+                [job["id"] for job in model_jobs], repr(exc), settings.EMBEDDING_JOB_MAX_ATTEMPTS
+            )
+    if jobs and result_cache is not None:
+        result_cache.invalidate()
+    return len(jobs)
+
+
+async def run_embedding_worker(
+    repo: PSQLRepo,
+    stop: asyncio.Event,
+    batch_size: int = settings.EMBEDDING_JOB_BATCH_SIZE,
+    poll_seconds: float = settings.EMBEDDING_JOB_POLL_SECONDS,
+    result_cache: SearchResultCache | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> None:
+    """Drain the job queue until ``stop`` is set, polling every ``poll_seconds`` while it is empty."""
+    while not stop.is_set():
+        try:
+            claimed = await process_embedding_jobs(repo, batch_size, result_cache, embedding_cache)
+        except Exception:
+            logger.exception("Claiming embedding jobs failed")
+            claimed = 0
+        if not claimed:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
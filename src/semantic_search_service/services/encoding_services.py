@@ -0,0 +1,37 @@
+import numpy as np
+
+from semantic_search_service.adapters.cache import EmbeddingCache
+from semantic_search_service.adapters.encoder import get_encoder
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.domain.articles import content_hash
+from semantic_search_service.domain.models import Model
+
+
+async def encode_article_texts(
+    texts: list[str],
+    model: Model,
+    repo: PSQLRepo | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[np.ndarray]:
+    """Encode article fields, sending each distinct text to the model at most once.
+
+    Texts are looked up by content hash in ``embedding_cache``, then among the embeddings already stored
+    in ``repo``, so boilerplate excerpts and re-imported articles cost no inference.
+    """
+    hashes = [content_hash(text) for text in texts]
+    embeddings: dict[str, np.ndarray] = {}
+    if embedding_cache is not None:
+        for _hash in set(hashes):
+            embedding = embedding_cache.get((Model(model), _hash))
+            if embedding is not None:
+                embeddings[_hash] = embedding
+    missing = {_hash: text for _hash, text in zip(hashes, texts) if _hash not in embeddings}
+    if missing and repo is not None:
+        embeddings.update(await repo.select_embeddings_by_hash(model, list(missing)))
+        missing = {_hash: text for _hash, text in missing.items() if _hash not in embeddings}
+    if missing:
+        embeddings.update(zip(missing, await get_encoder(model).encode(list(missing.values()))))
+    if embedding_cache is not None:
+        for _hash, embedding in embeddings.items():
+            embedding_cache.put((Model(model), _hash), embedding)
+    return [embeddings[_hash] for _hash in hashes]
@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator
+
+import numpy as np
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.cache import EmbeddingCache
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import SearchMode, SearchOptions, UnsupportedSearchMode, \
+    parse_result_fields
+from semantic_search_service.services.search_services import encode_user_query
+
+
+def export_articles_service(
+    repo: PSQLRepo, fields: str | None = None, model: Model | None = None
+) -> AsyncIterator[str]:
+    """Stream every article as NDJSON, with ``model``'s embeddings when a model is given.
+
+    Arguments are validated before the stream is returned, so bad requests fail before the response starts.
+    """
+    result_fields = parse_result_fields(fields)
+    return to_ndjson(repo.iter_articles(result_fields, model, chunk_size=settings.EXPORT_CHUNK_SIZE))
+
+
+async def export_search_service(
+    user_query: str,
+    model: Model,
+    repo: PSQLRepo,
+    options: SearchOptions,
+    limit: int,
+    include_embeddings: bool = False,
+    embedding_cache: EmbeddingCache | None = None,
+) -> AsyncIterator[str]:
+    """Stream up to ``limit`` semantic search results as NDJSON, ordered by score."""
+    # Export pages through the ANN index by (distance, id), which only the semantic mode ranks by
+    if options.mode != SearchMode.SEMANTIC:
+        raise UnsupportedSearchMode(f"Exports only support the {SearchMode.SEMANTIC} mode, not {options.mode}")
+    # Raise InvalidResultFields now rather than after the response has started
+    options.result_fields
+    user_query_embedding = await encode_user_query(user_query, model, embedding_cache)
+    return to_ndjson(repo.iter_semantic_search_articles(
+        user_query_embedding, model, options, limit, include_embeddings, chunk_size=settings.EXPORT_CHUNK_SIZE
+    ))
+
+
+async def to_ndjson(chunks: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    """Serialize each chunk of rows into one string of newline-terminated JSON objects."""
+    async for rows in chunks:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+
+def encode_embedding(embedding: np.ndarray) -> str:
+    """Base64 of the little-endian float32 bytes, several times smaller than a JSON list of floats."""
+    return base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode()
+
+
+def decode_embedding(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype="<f4")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return encode_embedding(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
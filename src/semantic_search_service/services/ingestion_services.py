@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from semantic_search_service.adapters.cache import EmbeddingCache
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.domain.articles import ArticleWithEmbeddings, EmbeddingField
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services.chunks_services import sync_article_chunks
+from semantic_search_service.services.encoding_services import encode_article_texts
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionReport:
+    articles: int
+    seconds: float
+
+    @property
+    def articles_per_second(self) -> float:
+        return self.articles / self.seconds if self.seconds else 0.0
+
+
+async def ingest_articles(
+    raw_articles: Iterable[dict[str, str]],
+    repo: PSQLRepo,
+    model: Model,
+    batch_size: int = 1024,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> IngestionReport:
+    """Encode and COPY articles in batches of ``batch_size``, then chunk and encode their bodies.
+
+    Each batch is encoded with a single call covering every field, and the COPY of one batch
+    runs while the next one is being encoded. Memory is bounded by two batches. Texts already
+    embedded, in the table or earlier in the run, are not encoded again.
+    """
+    started_at = time.perf_counter()
+    loaded = 0
+    pending_copy: asyncio.Task[int] | None = None
+    try:
+        for batch in iter_batches(raw_articles, batch_size):
+            articles_with_embeddings = await encode_articles(batch, model, repo, embedding_cache)
+            if pending_copy is not None:
+                loaded += await pending_copy
+                _report_progress(loaded, started_at, on_progress)
+            pending_copy = asyncio.create_task(repo.copy_articles(articles_with_embeddings, model))
+        if pending_copy is not None:
+            loaded += await pending_copy
+            _report_progress(loaded, started_at, on_progress)
+    finally:
+        # A failed or cancelled encode would otherwise leave the previous batch's COPY running unawaited
+        if pending_copy is not None:
+            pending_copy.cancel()
+            await asyncio.gather(pending_copy, return_exceptions=True)
+    # COPY doesn't return the new ids, so the chunks are filled in by id range afterwards
+    await backfill_chunk_embeddings(repo, model, batch_size=batch_size)
+    return IngestionReport(articles=loaded, seconds=time.perf_counter() - started_at)
+
+
+async def backfill_embeddings(
+    repo: PSQLRepo,
+    model: Model,
+    batch_size: int = 256,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+) -> IngestionReport:
+    """Fill in ``model``'s embeddings for articles that don't have them yet, one id range at a time.
+
+    Only rows with missing vectors are touched, so it can run against a live table while the API keeps
+    serving the other models. Articles edited while their batch was being encoded are skipped; the edit
+    either brought its own embeddings or queued a job, and otherwise the next run picks them up.
+    """
+    fields = list(EmbeddingField)
+    started_at = time.perf_counter()
+    updated, last_id = 0, 0
+    while rows := await repo.select_articles_missing_embeddings(model, after_id=last_id, limit=batch_size):
+        embeddings = await encode_article_texts([text for row in rows for text in row[1:4]], model, repo)
+        updated_ids = await repo.update_article_embeddings(model, [
+            (row[0], row[4], tuple(row[1:4]), tuple(embeddings[index * len(fields):(index + 1) * len(fields)]))
+            for index, row in enumerate(rows)
+        ])
+        updated += len(updated_ids)
+        last_id = rows[-1][0]
+        _report_progress(updated, started_at, on_progress)
+    return IngestionReport(articles=updated, seconds=time.perf_counter() - started_at)
+
+
+async def backfill_chunk_embeddings(
+    repo: PSQLRepo,
+    model: Model,
+    batch_size: int = 256,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+) -> IngestionReport:
+    """Chunk and encode the bodies of articles that have no chunks, or no ``model`` chunk embeddings, yet."""
+    started_at = time.perf_counter()
+    updated, last_id = 0, 0
+    while rows := await repo.select_articles_missing_chunk_embeddings(model, after_id=last_id, limit=batch_size):
+        await sync_article_chunks(repo, model, rows)
+        updated += len(rows)
+        last_id = rows[-1][0]
+        _report_progress(updated, started_at, on_progress)
+    return IngestionReport(articles=updated, seconds=time.perf_counter() - started_at)
+
+
+async def encode_articles(
+    raw_articles: list[dict[str, str]],
+    model: Model,
+    repo: PSQLRepo | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[ArticleWithEmbeddings]:
+    fields = list(EmbeddingField)
+    texts = [raw_article[_field] for raw_article in raw_articles for _field in fields]
+    embeddings = await encode_article_texts(texts, model, repo, embedding_cache)
+    return [
+        ArticleWithEmbeddings(
+            title=raw_article["title"],
+            excerpt=raw_article["excerpt"],
+            body=raw_article["body"],
+            updated_at=raw_article.get("updated_at"),
+            created_at=raw_article.get("created_at"),
+            **{
+                _field.attribute: embeddings[index * len(fields) + offset]
+                for offset, _field in enumerate(fields)
+            },
+        )
+        for index, raw_article in enumerate(raw_articles)
+    ]
+
+
+def _report_progress(
+    loaded: int, started_at: float, on_progress: Callable[[IngestionReport], None] | None
+) -> None:
+    report = IngestionReport(articles=loaded, seconds=time.perf_counter() - started_at)
+    logger.info("Loaded %d articles (%.1f articles/s)", report.articles, report.articles_per_second)
+    if on_progress is not None:
+        on_progress(report)
+
+
+def iter_batches(items: Iterable[dict[str, str]], batch_size: int) -> Iterator[list[dict[str, str]]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def iter_articles_from_file(path_to_data: str | Path) -> Iterator[dict[str, str]]:
+    if Path(path_to_data).suffix in (".jsonl", ".ndjson"):
+        return iter_articles_from_jsonl(path_to_data)
+    return iter_articles_from_json(path_to_data)
+
+
+def iter_articles_from_jsonl(path_to_data: str | Path) -> Iterator[dict[str, str]]:
+    with open(path_to_data, "r", encoding="utf-8") as _fp:
+        for line in _fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_articles_from_json(path_to_data: str | Path, chunk_size: int = 1 << 16) -> Iterator[dict[str, str]]:
+    """Yield the objects of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer, position, in_array = "", 0, False
+    with open(path_to_data, "r", encoding="utf-8") as _fp:
+        while True:
+            chunk = _fp.read(chunk_size)
+            buffer, position = buffer[position:] + chunk, 0
+            while True:
+                while position < len(buffer) and (buffer[position].isspace() or (in_array and buffer[position] == ",")):
+                    position += 1
+                if position >= len(buffer):
+                    break
+                if not in_array:
+                    if buffer[position] != "[":
+                        raise ValueError(f"{path_to_data} does not contain a JSON array")
+                    in_array = True
+                    position += 1
+                    continue
+                if buffer[position] == "]":
+                    return
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    # The object continues in the next chunk
+                    break
+                yield item
+            if not chunk:
+                raise ValueError(f"Unexpected end of file in {path_to_data}")
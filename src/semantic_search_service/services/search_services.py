@@ -1,20 +1,107 @@
+import numpy as np
+
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache, normalize_query
+from semantic_search_service.adapters.encoder import get_encoder
+from semantic_search_service.adapters.metrics import timed
 from semantic_search_service.adapters.psql_repo import PSQLRepo
-from semantic_search_service.domain.articles import Article
-from semantic_search_service.domain.models import Model, get_model
-
-
-async def semantic_search_service(user_query: str, model: Model, repo: PSQLRepo) -> list[Article]:
-    model = get_model(model)
-    user_query_embeddings = model.encode(user_query)
-    raw_articles = await repo.semantic_search_articles(user_query_embeddings)
-    articles = [
-        Article(
-            title=article[0][0],
-            body=article[0][1],
-            excerpt=article[0][2],
-            updated_at=article[0][3],
-            created_at=article[0][4],
-        )
-        for article in raw_articles
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import SearchMode, SearchOptions, SearchPage, SearchResult, \
+    UnsupportedSearchMode, encode_cursor
+
+
+async def semantic_search_service(
+    user_query: str,
+    model: Model,
+    repo: PSQLRepo,
+    options: SearchOptions | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+    result_cache: SearchResultCache | None = None,
+) -> SearchPage:
+    options = options or SearchOptions()
+    # Only the semantic mode pages by (distance, id); the other modes would return the first page again
+    if options.cursor is not None and options.mode != SearchMode.SEMANTIC:
+        raise UnsupportedSearchMode(f"Cursors only support the {SearchMode.SEMANTIC} mode, not {options.mode}")
+    if result_cache is not None:
+        cache_key = (Model(model), normalize_query(user_query), options.model_dump_json())
+        generation = result_cache.generation
+        cached_page = result_cache.get(cache_key)
+        if cached_page is not None:
+            return cached_page
+
+    user_query_embeddings = await encode_user_query(user_query, model, embedding_cache)
+    next_cursor = None
+    match options.mode:
+        case SearchMode.SEMANTIC:
+            rows = await repo.semantic_search_articles(user_query_embeddings, model, options)
+            if len(rows) == options.limit:
+                next_cursor = encode_cursor(rows[-1]["distance"], rows[-1]["id"])
+        case SearchMode.MULTI_FIELD:
+            rows = await repo.multi_field_search_articles(user_query_embeddings, model, options)
+        case SearchMode.HYBRID:
+            rows = await repo.hybrid_search_articles(user_query_embeddings, user_query, model, options)
+        case SearchMode.CHUNKS:
+            rows = await repo.chunk_search_articles(user_query_embeddings, model, options)
+    page = SearchPage(results=_to_results(rows), next_cursor=next_cursor)
+    if result_cache is not None:
+        result_cache.put(cache_key, page, generation)
+    return page
+
+
+async def batch_semantic_search_service(
+    user_queries: list[str],
+    model: Model,
+    repo: PSQLRepo,
+    options: SearchOptions | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[list[SearchResult]]:
+    options = options or SearchOptions()
+    if options.cursor is not None:
+        raise UnsupportedSearchMode("Batch searches don't support cursors")
+    user_query_embeddings = await encode_user_queries(user_queries, model, embedding_cache)
+    match options.mode:
+        case SearchMode.SEMANTIC:
+            raw_results = await repo.batch_semantic_search_articles(user_query_embeddings, model, options)
+        case SearchMode.MULTI_FIELD:
+            raw_results = await repo.batch_multi_field_search_articles(user_query_embeddings, model, options)
+        case SearchMode.HYBRID:
+            raw_results = await repo.batch_hybrid_search_articles(user_query_embeddings, user_queries, model, options)
+        case SearchMode.CHUNKS:
+            raw_results = await repo.batch_chunk_search_articles(user_query_embeddings, model, options)
+    return [_to_results(rows) for rows in raw_results]
+
+
+def _to_results(rows: list[dict]) -> list[SearchResult]:
+    # Only the selected columns are passed, so unselected ones stay unset and are left out of the response
+    return [SearchResult(**{_key: _value for _key, _value in row.items() if _key != "distance"}) for row in rows]
+
+
+async def encode_user_queries(
+    user_queries: list[str], model: Model, embedding_cache: EmbeddingCache | None = None
+) -> list[np.ndarray]:
+    """Encode many queries, sending only the ones missing from the cache to the model, in a single batch."""
+    cache_keys = [(Model(model), normalize_query(user_query)) for user_query in user_queries]
+    embeddings = [
+        embedding_cache.get(cache_key) if embedding_cache is not None else None for cache_key in cache_keys
     ]
-    return articles
+    missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        with timed("encode"):
+            new_embeddings = await get_encoder(model).encode([user_queries[index] for index in missing])
+        for index, embedding in zip(missing, new_embeddings):
+            embeddings[index] = embedding
+            if embedding_cache is not None:
+                embedding_cache.put(cache_keys[index], embedding)
+    return embeddings
+
+
+async def encode_user_query(user_query: str, model: Model, embedding_cache: EmbeddingCache | None = None) -> np.ndarray:
+    if embedding_cache is None:
+        with timed("encode"):
+            return await get_encoder(model).encode(user_query)
+    cache_key = (Model(model), normalize_query(user_query))
+    embedding = embedding_cache.get(cache_key)
+    if embedding is None:
+        with timed("encode"):
+            embedding = await get_encoder(model).encode(user_query)
+        embedding_cache.put(cache_key, embedding)
+    return embedding
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+
+
+DATABASE_CONNINFO = os.environ.get("DATABASE_CONNINFO", "dbname=vectordb host=potgres user=admin password=admin")
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "4"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "16"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", "3600"))
+# Connections above DB_POOL_MIN_SIZE are closed after this many idle seconds
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "600"))
+# Disable when connecting through PgBouncer in transaction mode
+DB_PREPARE_STATEMENTS = os.environ.get("DB_PREPARE_STATEMENTS", "true").lower() == "true"
+# ";"-separated conninfos of read replicas that serve searches, article lookups and exports
+DATABASE_REPLICA_CONNINFOS = [
+    _conninfo.strip() for _conninfo in os.environ.get("DATABASE_REPLICA_CONNINFOS", "").split(";") if _conninfo.strip()
+]
+DB_REPLICA_HEALTH_CHECK_SECONDS = float(os.environ.get("DB_REPLICA_HEALTH_CHECK_SECONDS", "5"))
+# Replicas further behind the primary stop serving reads until they catch up
+DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", "10"))
+# For this many seconds after an article write, the writing client's reads only use replicas that have replayed it,
+# tracked with a cookie; 0 reads from replicas right away
+DB_READ_YOUR_WRITES_SECONDS = float(os.environ.get("DB_READ_YOUR_WRITES_SECONDS", "0"))
+
+# postgres, or memory to answer semantic searches from an in-process copy of the embeddings kept in sync by NOTIFY
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "postgres")
+# Directory for memory-mapped embedding matrices; in anonymous memory when unset
+MEMORY_INDEX_MMAP_DIR = os.environ.get("MEMORY_INDEX_MMAP_DIR") or None
+MEMORY_INDEX_SYNC_BATCH_SIZE = int(os.environ.get("MEMORY_INDEX_SYNC_BATCH_SIZE", "1000"))
+MEMORY_INDEX_POLL_SECONDS = float(os.environ.get("MEMORY_INDEX_POLL_SECONDS", "1"))
+# Startup fails if the first load of the in-memory index takes longer than this
+MEMORY_INDEX_LOAD_TIMEOUT_SECONDS = float(os.environ.get("MEMORY_INDEX_LOAD_TIMEOUT_SECONDS", "600"))
+
+ENCODER_MAX_BATCH_SIZE = int(os.environ.get("ENCODER_MAX_BATCH_SIZE", "64"))
+ENCODER_MAX_WAIT_MS = float(os.environ.get("ENCODER_MAX_WAIT_MS", "5"))
+ENCODER_WORKERS = int(os.environ.get("ENCODER_WORKERS", "1"))
+
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.environ.get("IVFFLAT_LISTS", "100"))
+# relaxed_order or strict_order (pgvector >= 0.8) keeps filtered index scans going until the page is full.
+# With off, short filtered pages are retried with a wider ef_search / probes.
+ITERATIVE_SCAN = os.environ.get("ITERATIVE_SCAN", "off")
+# none, halfvec or binary. Semantic searches scan an index over the compact expression, then re-rank
+# max(candidates, limit) rows by exact cosine distance. Build the matching indexes with --quantization.
+SEARCH_QUANTIZATION = os.environ.get("SEARCH_QUANTIZATION", "none")
+# Stemming and stop words of the generated search_vector, fixed when the column is added; hybrid searches
+# parse queries with the configuration the column was actually built with
+TEXT_SEARCH_CONFIG = os.environ.get("TEXT_SEARCH_CONFIG", "spanish")
+
+# Bodies are embedded in overlapping word windows; 160 words stay under MiniLM's 256-token limit
+CHUNK_SIZE_WORDS = int(os.environ.get("CHUNK_SIZE_WORDS", "160"))
+CHUNK_OVERLAP_WORDS = int(os.environ.get("CHUNK_OVERLAP_WORDS", "32"))
+
+# Rows fetched per round trip by the server-side cursors behind the NDJSON exports
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "1000"))
+EXPORT_MAX_LIMIT = int(os.environ.get("EXPORT_MAX_LIMIT", "100000"))
+
+# Articles written with async_embeddings=true are encoded by workers draining the embedding_jobs table
+EMBEDDING_WORKER_IN_APP = os.environ.get("EMBEDDING_WORKER_IN_APP", "true").lower() == "true"
+EMBEDDING_JOB_BATCH_SIZE = int(os.environ.get("EMBEDDING_JOB_BATCH_SIZE", "64"))
+EMBEDDING_JOB_POLL_SECONDS = float(os.environ.get("EMBEDDING_JOB_POLL_SECONDS", "1"))
+EMBEDDING_JOB_LEASE_SECONDS = float(os.environ.get("EMBEDDING_JOB_LEASE_SECONDS", "300"))
+EMBEDDING_JOB_MAX_ATTEMPTS = int(os.environ.get("EMBEDDING_JOB_MAX_ATTEMPTS", "5"))
+
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "10000"))
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "3600"))
+QUERY_CACHE_MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Article field embeddings keyed by content hash, shared by identical texts across articles
+ARTICLE_EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("ARTICLE_EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+ARTICLE_EMBEDDING_CACHE_TTL_SECONDS = float(os.environ.get("ARTICLE_EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+ARTICLE_EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("ARTICLE_EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "5000"))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", "300"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# How often the listener invalidating the result cache on other processes' writes checks for shutdown
+RESULT_CACHE_POLL_SECONDS = float(os.environ.get("RESULT_CACHE_POLL_SECONDS", "1"))
+
+# Adds a Server-Timing header with the encode / pool_acquire / db_execute / serialize durations of each request
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "false").lower() == "true"
+
+ENABLED_MODELS = [_model.strip() for _model in os.environ.get("ENABLED_MODELS", "mini_lm,mp_net").split(",") if _model.strip()]
+WARMUP_MODELS = os.environ.get("WARMUP_MODELS", "true").lower() == "true"
+# torch, onnx or openvino. The onnx and openvino backends need sentence-transformers[onnx] / [openvino]
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "torch")
+MODEL_DEVICE = os.environ.get("MODEL_DEVICE") or None
+# torch intra-op threads per process. Unset, torch uses every core and semantic-search-serve splits them between workers
+MODEL_NUM_THREADS = int(os.environ["MODEL_NUM_THREADS"]) if os.environ.get("MODEL_NUM_THREADS") else None
+MODEL_QUANTIZE = os.environ.get("MODEL_QUANTIZE", "false").lower() == "true"
+ONNX_QUANTIZATION_CONFIG = os.environ.get("ONNX_QUANTIZATION_CONFIG", "avx2")
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", str(Path.home() / ".cache" / "semantic_search_service"))
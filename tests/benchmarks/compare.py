@@ -0,0 +1,66 @@
+"""Compare two benchmark result files, e.g. from the base and head of a branch.
+
+    python -m tests.benchmarks.compare benchmark-results/base.json benchmark-results/head.json --threshold 10
+
+Prints the change of every metric and exits with status 1 when one regressed by more than ``threshold`` percent.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def flatten(results: dict) -> dict[str, float]:
+    """Key every comparable number by the run it came from, e.g. ``100000 hnsw m=16 ef_search=40 x8 p95``."""
+    metrics = {}
+    for run in results["runs"]:
+        for path in (("ingest", "articles_per_second"), ("encoding", "articles_per_second")):
+            if path[0] in run:
+                metrics[f"{run['size']} {' '.join(path)}"] = run[path[0]][path[1]]
+        for search in run["searches"]:
+            index = " ".join(f"{_key}={_value}" for _key, _value in search["index"].items() if _key != "method")
+            scan = " ".join(f"{_key}={_value}" for _key, _value in search["scan"].items())
+            name = " ".join(filter(None, (
+                str(run["size"]), search["index"]["method"], index, scan, f"x{search['concurrency']}"
+            )))
+            metrics[f"{name} queries_per_second"] = search["queries_per_second"]
+            for percentile in ("p50", "p95", "p99"):
+                metrics[f"{name} latency_ms {percentile}"] = search["latency_ms"][percentile]
+            recall_key = f"recall_at_{search['k']}"
+            metrics[f"{name} {recall_key}"] = search[recall_key]
+    return metrics
+
+
+def higher_is_better(name: str) -> bool:
+    return "latency_ms" not in name
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[str], bool]:
+    base_metrics, head_metrics = flatten(base), flatten(head)
+    lines, regressed = [], False
+    for name in sorted(base_metrics.keys() & head_metrics.keys()):
+        before, after = base_metrics[name], head_metrics[name]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if higher_is_better(name) else change
+        flag = ""
+        if worse > threshold:
+            flag, regressed = "  REGRESSION", True
+        lines.append(f"{name:<70} {before:>12.3f} -> {after:>12.3f} ({change:+.1f}%){flag}")
+    return lines, regressed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks.compare")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression tolerance in percent")
+    args = parser.parse_args(argv)
+    base, head = json.loads(args.base.read_text()), json.loads(args.head.read_text())
+    print(f"base {base['metadata']['commit']}, head {head['metadata']['commit']}")
+    lines, regressed = compare(base, head, args.threshold)
+    print("\n".join(lines))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Synthetic, seeded corpora for the benchmarks.
+
+Embeddings are drawn from a mixture of Gaussian clusters instead of running the model, so a million
+articles can be generated in seconds and nearest-neighbour structure still resembles real text embeddings.
+"""
+from typing import Iterator
+
+import numpy as np
+
+from semantic_search_service.domain.articles import ArticleWithEmbeddings, EmbeddingField
+from tests.factories import make_article
+
+WORDS = (
+    "market economy inflation rates bank growth energy climate election policy court health vaccine research "
+    "science space launch football league transfer music festival film award technology startup chip software "
+    "security data privacy trade tariff oil gas housing prices jobs report strike union city transport rail"
+).split()
+
+
+class SyntheticCorpus:
+    """Articles whose embeddings lie around ``clusters`` random centres, reproducible from ``seed``.
+
+    Articles are generated in order, so the n-th article gets id n + 1 when COPY'd into an empty table.
+    Everything is generated in blocks of ``batch_size``, so the same seed always gives the same corpus.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        dimensions: int,
+        clusters: int = 100,
+        spread: float = 0.35,
+        seed: int = 0,
+        batch_size: int = 1024,
+    ) -> None:
+        self.size = size
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self.spread = spread
+        self.seed = seed
+        self.centres = _normalize(np.random.default_rng(seed).standard_normal((clusters, dimensions)))
+
+    def iter_embedding_batches(self, field: EmbeddingField) -> Iterator[np.ndarray]:
+        """``field``'s embeddings for the whole corpus, in order, as unit-norm float32 batches."""
+        rng = np.random.default_rng((self.seed, list(EmbeddingField).index(field)))
+        for start in range(0, self.size, self.batch_size):
+            count = min(self.batch_size, self.size - start)
+            centres = self.centres[rng.integers(0, len(self.centres), count)]
+            noise = rng.standard_normal((count, self.dimensions)) * self.spread / np.sqrt(self.dimensions)
+            yield _normalize(centres + noise).astype(np.float32)
+
+    def iter_article_batches(self) -> Iterator[list[ArticleWithEmbeddings]]:
+        rng = np.random.default_rng((self.seed, len(EmbeddingField)))
+        batches = zip(*(self.iter_embedding_batches(_field) for _field in EmbeddingField))
+        for start, field_embeddings in zip(range(0, self.size, self.batch_size), batches):
+            yield [
+                ArticleWithEmbeddings(
+                    **make_article(**self.texts(rng, start + offset)).model_dump(),
+                    **{
+                        _field.attribute: embeddings[offset]
+                        for _field, embeddings in zip(EmbeddingField, field_embeddings)
+                    },
+                )
+                for offset in range(len(field_embeddings[0]))
+            ]
+
+    @staticmethod
+    def texts(rng: np.random.Generator, index: int) -> dict[str, str]:
+        """Title, excerpt and body made unique by ``index``, so no text is deduplicated away when encoding."""
+        def sentence(words: int) -> str:
+            return " ".join(WORDS[_index] for _index in rng.integers(0, len(WORDS), words))
+
+        return {
+            "title": f"{sentence(8)} {index}",
+            "excerpt": f"{sentence(30)} {index}",
+            "body": f"{sentence(300)} {index}",
+        }
+
+    def queries(self, count: int) -> np.ndarray:
+        """Query embeddings drawn from the same clusters as the articles, independent of the corpus size."""
+        rng = np.random.default_rng((self.seed, 1_000_003))
+        centres = self.centres[rng.integers(0, len(self.centres), count)]
+        noise = rng.standard_normal((count, self.dimensions)) * self.spread / np.sqrt(self.dimensions)
+        return _normalize(centres + noise).astype(np.float32)
+
+
+class ExactTopK:
+    """Streaming brute-force top-k by cosine similarity, the ground truth recall is measured against.
+
+    Batches are folded in one at a time, so the corpus never has to fit in memory.
+    """
+
+    def __init__(self, queries: np.ndarray, k: int) -> None:
+        self.queries = _normalize(queries)
+        self.k = k
+        self.scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        self.ids = np.empty((len(queries), 0), dtype=np.int64)
+        self._offset = 0
+
+    def add(self, embeddings: np.ndarray) -> None:
+        ids = np.arange(self._offset + 1, self._offset + len(embeddings) + 1)
+        self._offset += len(embeddings)
+        scores = np.concatenate([self.scores, self.queries @ _normalize(embeddings).T], axis=1)
+        ids = np.concatenate([self.ids, np.broadcast_to(ids, (len(self.queries), len(ids)))], axis=1)
+        keep = np.argsort(-scores, axis=1, kind="stable")[:, :self.k]
+        self.scores = np.take_along_axis(scores, keep, axis=1)
+        self.ids = np.take_along_axis(ids, keep, axis=1)
+
+    def neighbours(self) -> list[list[int]]:
+        return self.ids.tolist()
+
+
+def recall_at_k(found: list[list[int]], truth: list[list[int]]) -> float:
+    """Mean fraction of each query's true nearest neighbours that the search returned."""
+    return float(np.mean([len(set(_found) & set(_truth)) / len(_truth) for _found, _truth in zip(found, truth)]))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
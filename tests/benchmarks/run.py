@@ -0,0 +1,282 @@
+"""Ingest, encoding and search benchmarks against a scratch database.
+
+    python -m tests.benchmarks.run --sizes 10000 100000 --output benchmark-results/$(git rev-parse --short HEAD).json
+
+For every corpus size the ``benchdb`` database is recreated, the synthetic corpus is COPY'd in, and each index
+setting is built and queried at every concurrency level. Results are written as JSON; compare two runs with
+``python -m tests.benchmarks.compare``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+from semantic_search_service import settings
+from semantic_search_service.adapters.encoder import close_encoders
+from semantic_search_service.adapters.psql_repo import PSQLRepo, config_pool
+from semantic_search_service.cli import create_schema
+from semantic_search_service.domain.articles import EmbeddingField
+from semantic_search_service.domain.models import Model, model_dimensions
+from semantic_search_service.domain.search import IndexMethod, Quantization, SearchOptions
+from semantic_search_service.services.ingestion_services import encode_articles
+from tests.benchmarks.corpus import ExactTopK, SyntheticCorpus, recall_at_k
+
+logger = logging.getLogger(__name__)
+
+# Same server as the integration tests in docker-compose; the benchmark database is created next to it
+default_conn_info = "dbname=postgres host=postgres user=admin password=admin"
+BENCHMARK_DB = "benchdb"
+
+
+def parse_index(spec: str) -> dict:
+    """``none``, ``hnsw:m=16,ef_construction=64``, ``ivfflat:lists=1000`` or ``hnsw:quantization=binary``."""
+    method, _, params = spec.partition(":")
+    if method == "none":
+        return {"method": "none"}
+    index = {"method": IndexMethod(method)}
+    for param in filter(None, params.split(",")):
+        name, _, value = param.partition("=")
+        index[name.strip()] = Quantization(value) if name.strip() == "quantization" else int(value)
+    return index
+
+
+def recreate_database(conn_info: str) -> str:
+    with psycopg.connect(conn_info, autocommit=True) as conn:
+        conn.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(BENCHMARK_DB)))
+        conn.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(BENCHMARK_DB)))
+    bench_conn_info = make_conninfo(conn_info, dbname=BENCHMARK_DB)
+    with psycopg.connect(bench_conn_info, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    return bench_conn_info
+
+
+async def benchmark_ingest(repo: PSQLRepo, corpus: SyntheticCorpus, model: Model) -> dict:
+    """COPY the corpus with its precomputed embeddings, i.e. the database side of ``ingest_articles``."""
+    started_at = time.perf_counter()
+    loaded = 0
+    for batch in corpus.iter_article_batches():
+        loaded += await repo.copy_articles(batch, model)
+    seconds = time.perf_counter() - started_at
+    return {"articles": loaded, "seconds": seconds, "articles_per_second": loaded / seconds}
+
+
+async def benchmark_encoding(corpus: SyntheticCorpus, model: Model, sample: int, batch_size: int) -> dict:
+    """Encode ``sample`` articles' title, excerpt and body with the real model."""
+    rng = np.random.default_rng(corpus.seed)
+    raw_articles = [corpus.texts(rng, index) for index in range(sample)]
+    started_at = time.perf_counter()
+    for start in range(0, sample, batch_size):
+        await encode_articles(raw_articles[start:start + batch_size], model)
+    seconds = time.perf_counter() - started_at
+    return {"articles": sample, "seconds": seconds, "articles_per_second": sample / seconds}
+
+
+async def build_index(repo: PSQLRepo, model: Model, field: EmbeddingField, index: dict) -> float:
+    for method in IndexMethod:
+        for quantization in Quantization:
+            await repo.drop_embedding_index(model, field, method, quantization)
+    # Searches re-rank the quantized candidates only when the index they scan is quantized
+    repo.quantization = index.get("quantization", Quantization.NONE)
+    if index["method"] == "none":
+        return 0.0
+    started_at = time.perf_counter()
+    await repo.create_embedding_index(
+        model, field, index["method"], **{_key: _value for _key, _value in index.items() if _key != "method"}
+    )
+    async with repo.pool.connection() as conn:
+        await conn.execute("ANALYZE articles")
+    return time.perf_counter() - started_at
+
+
+async def index_bytes(repo: PSQLRepo, model: Model, field: EmbeddingField, index: dict) -> int:
+    if index["method"] == "none":
+        return 0
+    name = repo._embedding_index_name(model, field, index["method"], index.get("quantization", Quantization.NONE))
+    async with repo.pool.connection() as conn:
+        cur = await conn.execute("SELECT pg_relation_size(to_regclass(%s))", (name,))
+        return (await cur.fetchone())[0]
+
+
+async def benchmark_search(
+    repo: PSQLRepo,
+    model: Model,
+    queries: np.ndarray,
+    options: SearchOptions,
+    concurrency: int,
+) -> tuple[dict, list[list[int]]]:
+    """Run every query once with ``concurrency`` searches in flight; returns latency stats and the ids found."""
+    latencies = [0.0] * len(queries)
+    found: list[list[int]] = [[] for _ in queries]
+    next_query = iter(range(len(queries)))
+
+    async def client() -> None:
+        for index in next_query:
+            started_at = time.perf_counter()
+            rows = await repo.semantic_search_articles(queries[index], model, options)
+            latencies[index] = time.perf_counter() - started_at
+            found[index] = [row["id"] for row in rows]
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started_at
+    latencies_ms = np.array(latencies) * 1000
+    stats = {
+        "queries": len(queries),
+        "queries_per_second": len(queries) / seconds,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            **{f"p{_q}": float(np.percentile(latencies_ms, _q)) for _q in (50, 95, 99)},
+        },
+    }
+    return stats, found
+
+
+def scan_settings(index: dict, ef_search: list[int], probes: list[int], candidates: list[int]) -> list[dict]:
+    match index["method"]:
+        case IndexMethod.HNSW:
+            scans = [{"ef_search": _value} for _value in ef_search]
+        case IndexMethod.IVFFLAT:
+            scans = [{"probes": _value} for _value in probes]
+        case _:
+            return [{}]
+    if index.get("quantization", Quantization.NONE) == Quantization.NONE:
+        return scans
+    return [{**_scan, "candidates": _candidates} for _scan in scans for _candidates in candidates]
+
+
+async def benchmark_size(args: argparse.Namespace, size: int) -> dict:
+    bench_conn_info = recreate_database(args.conninfo)
+    corpus = SyntheticCorpus(
+        size, model_dimensions[args.model], clusters=args.clusters, seed=args.seed, batch_size=args.batch_size
+    )
+    queries = corpus.queries(args.queries)
+    ground_truth = ExactTopK(queries, args.k)
+    for embeddings in corpus.iter_embedding_batches(args.field):
+        ground_truth.add(embeddings)
+    truth = ground_truth.neighbours()
+
+    pool = AsyncConnectionPool(
+        conninfo=bench_conn_info, open=False, timeout=30, min_size=max(args.concurrency), configure=config_pool
+    )
+    await pool.open()
+    repo = PSQLRepo(pool, db_name=BENCHMARK_DB)
+    try:
+        await create_schema(repo)
+        logger.info("Loading %d articles", size)
+        result = {"size": size, "ingest": await benchmark_ingest(repo, corpus, args.model)}
+        if args.encode_sample:
+            result["encoding"] = await benchmark_encoding(corpus, args.model, args.encode_sample, args.batch_size)
+        result["searches"] = []
+        for index in args.index:
+            logger.info("Building %s index", index)
+            build_seconds = await build_index(repo, args.model, args.field, index)
+            size_bytes = await index_bytes(repo, args.model, args.field, index)
+            for scan in scan_settings(index, args.ef_search, args.probes, args.candidates):
+                options = SearchOptions(limit=args.k, field=args.field, fields="updated_at", **scan)
+                # Untimed pass so every setting is measured with the index in shared buffers
+                await benchmark_search(repo, args.model, queries, options, max(args.concurrency))
+                for concurrency in args.concurrency:
+                    stats, found = await benchmark_search(repo, args.model, queries, options, concurrency)
+                    result["searches"].append({
+                        "index": {**index, "method": str(index["method"])},
+                        "index_build_seconds": build_seconds,
+                        "index_bytes": size_bytes,
+                        "scan": scan,
+                        "concurrency": concurrency,
+                        "k": args.k,
+                        f"recall_at_{args.k}": recall_at_k(found, truth),
+                        **stats,
+                    })
+                    logger.info("%s %s x%d: %s", index["method"], scan, concurrency, result["searches"][-1])
+        return result
+    finally:
+        await pool.close()
+
+
+def metadata(args: argparse.Namespace) -> dict:
+    def git(*command: str) -> str:
+        return subprocess.run(["git", *command], capture_output=True, text=True).stdout.strip()
+
+    with psycopg.connect(args.conninfo) as conn:
+        postgres_version = conn.execute("SHOW server_version").fetchone()[0]
+        pgvector_version = conn.execute(
+            "SELECT default_version FROM pg_available_extensions WHERE name = 'vector'"
+        ).fetchone()
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "postgres": postgres_version,
+        "pgvector": pgvector_version[0] if pgvector_version else None,
+        "model": str(args.model),
+        "field": str(args.field),
+        "seed": args.seed,
+        "iterative_scan": settings.ITERATIVE_SCAN,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results = {"metadata": metadata(args), "runs": []}
+    try:
+        for size in args.sizes:
+            results["runs"].append(await benchmark_size(args, size))
+    finally:
+        await close_encoders()
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks.run")
+    parser.add_argument("--conninfo", default=default_conn_info,
+                        help=f"Server to benchmark; the {BENCHMARK_DB} database on it is dropped and recreated")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--model", type=Model, choices=list(Model), default=Model.MINI_LM)
+    parser.add_argument("--field", type=EmbeddingField, choices=list(EmbeddingField), default=EmbeddingField.BODY)
+    parser.add_argument("--index", type=parse_index, nargs="+",
+                        default=[parse_index("none"), parse_index("hnsw:m=16,ef_construction=64"),
+                                 parse_index("ivfflat:lists=100")])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 200],
+                        help="Rows re-ranked at full precision, swept for quantized indexes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--encode-sample", type=int, default=0,
+                        help="Also time the real model on this many articles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="JSON results file, stdout when unset")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    args = build_parser().parse_args(argv)
+    results = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output is None:
+        print(results)
+    else:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(results + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -65,14 +65,58 @@ async def create_empty_table(async_connection_pool: AsyncConnectionPool) -> None
                 title VARCHAR(255) NOT NULL,
                 excerpt TEXT NOT NULL,
                 body TEXT NOT NULL,
-                title_embedding vector(384),
-                excerpt_embedding vector(384),
-                body_embedding vector(384)
+                mini_lm_title_embedding vector(384),
+                mini_lm_excerpt_embedding vector(384),
+                mini_lm_body_embedding vector(384),
+                mp_net_title_embedding vector(768),
+                mp_net_excerpt_embedding vector(768),
+                mp_net_body_embedding vector(768),
+                title_hash TEXT GENERATED ALWAYS AS (md5(title)) STORED,
+                excerpt_hash TEXT GENERATED ALWAYS AS (md5(excerpt)) STORED,
+                body_hash TEXT GENERATED ALWAYS AS (md5(body)) STORED,
+                mini_lm_title_embedding_hash TEXT,
+                mini_lm_excerpt_embedding_hash TEXT,
+                mini_lm_body_embedding_hash TEXT,
+                mp_net_title_embedding_hash TEXT,
+                mp_net_excerpt_embedding_hash TEXT,
+                mp_net_body_embedding_hash TEXT,
+                search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', title), 'A') ||
+                    setweight(to_tsvector('english', excerpt), 'B') ||
+                    setweight(to_tsvector('english', body), 'C')
+                ) STORED
             );
         """
-    drop_table_query = """DROP TABLE IF EXISTS articles;"""
+    chunks_table_query: LiteralString = """
+            CREATE TABLE IF NOT EXISTS article_chunks (
+                article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk TEXT NOT NULL,
+                mini_lm_embedding vector(384),
+                mp_net_embedding vector(768),
+                PRIMARY KEY (article_id, position)
+            );
+        """
+    jobs_table_query: LiteralString = """
+            CREATE TABLE IF NOT EXISTS embedding_jobs (
+                id BIGSERIAL PRIMARY KEY,
+                article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+                model TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                locked_until TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (article_id, model)
+            );
+        """
+    drop_table_query = """DROP TABLE IF EXISTS embedding_jobs, article_chunks, articles;"""
     async with async_connection_pool.connection() as conn:
         await conn.execute(table_query)
+        await conn.execute(chunks_table_query)
+        await conn.execute(jobs_table_query)
         await conn.commit()
         yield
         await conn.execute(drop_table_query)
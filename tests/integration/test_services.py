@@ -1,10 +1,25 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import numpy as np
 import pytest
 from psycopg_pool import AsyncConnectionPool
 
 from tests.factories import make_article
+from tests.integration.conftest import test_db_conn_info
+from semantic_search_service.adapters.cache import SearchResultCache, run_result_cache_invalidation
 from semantic_search_service.adapters.psql_repo import PSQLRepo
-from semantic_search_service.domain.models import Model
-from semantic_search_service.services.articles_services import insert_new_article_service
+from semantic_search_service.domain.articles import ArticlePatch, ArticleWithEmbeddings, EmbeddingField
+from semantic_search_service.domain.chunks import ChunkAggregation
+from semantic_search_service.domain.embedding_jobs import JobStatus
+from semantic_search_service.domain.models import EmbeddingDimensionMismatch, Model
+from semantic_search_service.domain.search import FusionMethod, IndexMethod, ResultField, SearchMode, SearchOptions
+from semantic_search_service.services.articles_services import insert_articles_service, insert_new_article_service, \
+    patch_article_service
+from semantic_search_service.services.embedding_jobs_services import get_embedding_jobs_service, process_embedding_jobs
+from semantic_search_service.services.ingestion_services import backfill_embeddings, ingest_articles
+from semantic_search_service.services.search_services import batch_semantic_search_service, semantic_search_service
 
 
 @pytest.mark.anyio
@@ -25,3 +40,331 @@ async def test_insert_new_article_service(async_connection_pool: AsyncConnection
 
     expected_article = article.model_dump()
     assert inserted_article.model_dump() == expected_article
+
+
+@pytest.mark.anyio
+async def test_semantic_search_service_uses_ann_index(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Central banks raise interest rates")
+    await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+    await repo.create_embedding_index(Model.MINI_LM, EmbeddingField.TITLE, IndexMethod.HNSW, m=8, ef_construction=32)
+
+    page = await semantic_search_service(
+        user_query="interest rates",
+        model=Model.MINI_LM,
+        repo=repo,
+        options=SearchOptions(field=EmbeddingField.TITLE, ef_search=100),
+    )
+
+    assert article.title in [result.title for result in page.results]
+    await repo.drop_embedding_index(Model.MINI_LM, EmbeddingField.TITLE, IndexMethod.HNSW)
+
+
+@pytest.mark.anyio
+async def test_ingest_articles_copies_all_batches(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    raw_articles = [make_article(title=f"ingested {index}").model_dump() for index in range(5)]
+
+    report = await ingest_articles(raw_articles, repo, Model.MINI_LM, batch_size=2)
+
+    assert report.articles == 5
+    async with async_connection_pool.connection() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                "SELECT count(*) FROM articles WHERE title LIKE %s AND mini_lm_body_embedding IS NOT NULL", ("ingested %",)
+            )
+            assert await cursor.fetchone() == (5,)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("fusion", list(FusionMethod))
+async def test_multi_field_search_ranks_by_title_weight(
+    async_connection_pool: AsyncConnectionPool, create_empty_table, fusion: FusionMethod
+) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Volcano eruption in Iceland", excerpt="Travel news", body="Flights were cancelled.")
+    await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+
+    page = await semantic_search_service(
+        user_query="volcano eruption",
+        model=Model.MINI_LM,
+        repo=repo,
+        options=SearchOptions(mode=SearchMode.MULTI_FIELD, fusion=fusion, title_weight=3, excerpt_weight=0),
+    )
+
+    assert page.results[0].title == article.title
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", list(SearchMode))
+async def test_batch_search_returns_results_per_query(
+    async_connection_pool: AsyncConnectionPool, create_empty_table, mode: SearchMode
+) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    # Bodies repeat the titles, so chunk search has something to tell the articles apart by
+    football = make_article(title="Football final ends in penalties", body="Football final ends in penalties")
+    markets = make_article(
+        title="Stock markets fall after inflation report", body="Stock markets fall after inflation report"
+    )
+    for article in (football, markets):
+        await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+
+    results = await batch_semantic_search_service(
+        user_queries=["football match", "stock market"],
+        model=Model.MINI_LM,
+        repo=repo,
+        options=SearchOptions(mode=mode, field=EmbeddingField.TITLE),
+    )
+
+    assert [articles[0].title for articles in results] == [football.title, markets.title]
+
+
+@pytest.mark.anyio
+async def test_backfill_adds_second_model_embeddings(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Backfilled article about glaciers")
+    await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+
+    await backfill_embeddings(repo, Model.MP_NET, batch_size=2)
+
+    assert await repo.select_articles_missing_embeddings(Model.MP_NET, after_id=0, limit=10) == []
+    page = await semantic_search_service(user_query="glaciers", model=Model.MP_NET, repo=repo)
+    assert article.title in [result.title for result in page.results]
+
+
+@pytest.mark.anyio
+async def test_embeddings_with_wrong_dimension_are_rejected(async_connection_pool: AsyncConnectionPool) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article()
+    mini_lm_embedding = np.zeros(384, dtype=np.float32)
+    article_with_embeddings = ArticleWithEmbeddings(
+        **article.model_dump(),
+        title_embedding=mini_lm_embedding,
+        excerpt_embedding=mini_lm_embedding,
+        body_embedding=mini_lm_embedding,
+    )
+
+    with pytest.raises(EmbeddingDimensionMismatch):
+        await repo.insert_new_article(article_with_embeddings, Model.MP_NET)
+
+
+@pytest.mark.anyio
+async def test_hybrid_search_finds_exact_keyword_matches(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Quarterly report", excerpt="Zyxtronica posts record profits", body="Earnings grew.")
+    await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+
+    page = await semantic_search_service(
+        user_query="Zyxtronica",
+        model=Model.MINI_LM,
+        repo=repo,
+        options=SearchOptions(mode=SearchMode.HYBRID, semantic_weight=0.5, lexical_weight=2),
+    )
+
+    assert page.results[0].title == article.title
+
+
+@pytest.mark.anyio
+async def test_hybrid_search_parses_queries_with_the_config_of_the_column(
+    async_connection_pool: AsyncConnectionPool, create_empty_table
+) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+
+    # The test table is built with the english configuration, whatever the setting says
+    assert await repo.select_text_search_config() == "english"
+
+
+@pytest.mark.anyio
+async def test_search_pages_with_cursor_and_filters(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    for index in range(5):
+        article = make_article(title=f"Paged article {index}", created_at=f"2001-01-0{index + 1} 00:00:00")
+        await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+    options = SearchOptions(
+        field=EmbeddingField.TITLE, limit=2, created_after=datetime(2001, 1, 1), created_before=datetime(2001, 1, 6)
+    )
+
+    titles = []
+    while True:
+        page = await semantic_search_service(user_query="paged article", model=Model.MINI_LM, repo=repo, options=options)
+        titles.extend(result.title for result in page.results)
+        if page.next_cursor is None:
+            break
+        options = options.model_copy(update={"cursor": page.next_cursor})
+
+    assert sorted(titles) == [f"Paged article {index}" for index in range(5)]
+
+
+@pytest.mark.anyio
+async def test_search_returns_scores_and_only_requested_fields(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Wildfires spread across California", excerpt="Evacuations ordered", body="Long body")
+    await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+
+    page = await semantic_search_service(
+        user_query="wildfires", model=Model.MINI_LM, repo=repo, options=SearchOptions(fields="title,excerpt")
+    )
+
+    result = page.results[0]
+    assert (result.title, result.excerpt, result.body) == (article.title, article.excerpt, None)
+    assert result.model_fields_set == {"id", "score", "title", "excerpt"}
+    assert 0 < result.score <= 1
+
+
+@pytest.mark.anyio
+async def test_export_articles_streams_every_article(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    # The table is shared with the other tests, so only this test's articles are checked
+    prefix = f"exported {uuid.uuid4()}"
+    raw_articles = [make_article(title=f"{prefix} {index}").model_dump() for index in range(5)]
+    await ingest_articles(raw_articles, repo, Model.MINI_LM, batch_size=2)
+
+    chunks = [chunk async for chunk in repo.iter_articles([ResultField.TITLE], Model.MINI_LM, chunk_size=2)]
+
+    assert all(0 < len(chunk) <= 2 for chunk in chunks)
+    all_rows = [row for chunk in chunks for row in chunk]
+    assert [row["id"] for row in all_rows] == sorted(row["id"] for row in all_rows)
+    rows = [row for row in all_rows if row["title"].startswith(prefix)]
+    assert [row["title"] for row in rows] == [f"{prefix} {index}" for index in range(5)]
+    assert len(rows[0]["title_embedding"]) == 384
+    assert "body" not in rows[0]
+
+
+@pytest.mark.anyio
+async def test_async_write_is_searchable_once_its_job_runs(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Queued article about lighthouses")
+
+    article_id = await insert_new_article_service(article, repo, Model.MINI_LM, async_embeddings=True)
+    [job] = await get_embedding_jobs_service(article_id, repo)
+    assert job.status == JobStatus.PENDING
+
+    while await process_embedding_jobs(repo, batch_size=10):
+        pass
+
+    [job] = await get_embedding_jobs_service(article_id, repo)
+    assert (job.status, job.attempts) == (JobStatus.DONE, 1)
+    page = await semantic_search_service(user_query="lighthouses", model=Model.MINI_LM, repo=repo)
+    assert article.title in [result.title for result in page.results]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("aggregation", "last_sentence", "user_query"),
+    [
+        (ChunkAggregation.MAX, "A rare comet was photographed over Patagonia.", "comet photographed over Patagonia"),
+        (ChunkAggregation.MEAN, "A humpback whale was seen breaching near the Azores.", "whale breaching near the Azores"),
+    ],
+)
+async def test_chunk_search_finds_text_past_the_model_max_length(
+    async_connection_pool: AsyncConnectionPool,
+    create_empty_table,
+    aggregation: ChunkAggregation,
+    last_sentence: str,
+    user_query: str,
+) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    # Each case has its own last sentence, so the article of another case can't rank first
+    body = "The committee discussed budgets and schedules. " * 120 + last_sentence
+    article = make_article(title="Long meeting minutes", body=body)
+    article_id = await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+
+    page = await semantic_search_service(
+        user_query=user_query,
+        model=Model.MINI_LM,
+        repo=repo,
+        options=SearchOptions(mode=SearchMode.CHUNKS, chunk_aggregation=aggregation, fields="title"),
+    )
+
+    assert page.results[0].id == article_id
+
+
+@pytest.mark.anyio
+async def test_patch_with_unchanged_text_keeps_every_model_embedding(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article = make_article(title="Unchanged title about tides")
+    article_id = await insert_new_article_service(article=article, repo=repo, model=Model.MINI_LM)
+    await backfill_embeddings(repo, Model.MP_NET)
+
+    await patch_article_service(
+        article_id, ArticlePatch(title=article.title, excerpt=article.excerpt), repo, Model.MINI_LM
+    )
+
+    assert await repo.select_articles_missing_embeddings(Model.MP_NET, after_id=article_id - 1, limit=1) == []
+
+
+@pytest.mark.anyio
+async def test_bulk_inserted_articles_are_searchable(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    articles = [make_article(title="Bulk article about glaciers"), make_article(title="Bulk article about deserts")]
+
+    results = await insert_articles_service(articles, repo, Model.MINI_LM)
+
+    page = await semantic_search_service(
+        user_query="glaciers", model=Model.MINI_LM, repo=repo, options=SearchOptions(field=EmbeddingField.TITLE)
+    )
+    assert (page.results[0].id, page.results[0].title) == (results[0].id, "Bulk article about glaciers")
+    async with async_connection_pool.connection() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                "SELECT count(*) FROM articles WHERE id = ANY(%s) AND mini_lm_body_embedding IS NOT NULL",
+                ([result.id for result in results],),
+            )
+            assert await cursor.fetchone() == (2,)
+
+
+@pytest.mark.anyio
+async def test_async_patch_is_embedded_again_once_its_job_runs(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article_id = await insert_new_article_service(make_article(title="Patched title about volcanoes"), repo, Model.MINI_LM)
+    query = "SELECT mini_lm_title_embedding FROM articles WHERE id = %s"
+    async with async_connection_pool.connection() as connection:
+        (old_embedding,) = await (await connection.execute(query, (article_id,))).fetchone()
+
+    await patch_article_service(
+        article_id, ArticlePatch(title="Patched title about orchids"), repo, Model.MINI_LM, async_embeddings=True
+    )
+    while await process_embedding_jobs(repo, batch_size=10):
+        pass
+
+    async with async_connection_pool.connection() as connection:
+        (new_embedding,) = await (await connection.execute(query, (article_id,))).fetchone()
+    assert not np.allclose(old_embedding, new_embedding)
+
+
+@pytest.mark.anyio
+async def test_result_cache_is_invalidated_by_writes_of_other_processes(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    await repo.create_article_change_triggers(notify_ids=False)
+    result_cache = SearchResultCache()
+    stop = asyncio.Event()
+    listener = asyncio.create_task(
+        run_result_cache_invalidation(result_cache, test_db_conn_info, stop, poll_seconds=0.1)
+    )
+    # The listener invalidates once it is listening
+    async with asyncio.timeout(5):
+        while result_cache.generation == 0:
+            await asyncio.sleep(0.05)
+    await semantic_search_service(user_query="harbours", model=Model.MINI_LM, repo=repo, result_cache=result_cache)
+    assert result_cache.stats().entries == 1
+
+    # Written without the cache, as another worker or the CLI would
+    await insert_new_article_service(make_article(title="Article about harbours"), repo, Model.MINI_LM)
+
+    async with asyncio.timeout(5):
+        while result_cache.stats().entries:
+            await asyncio.sleep(0.05)
+    stop.set()
+    await listener
+
+
+@pytest.mark.anyio
+async def test_backfill_leaves_articles_edited_while_encoding_alone(async_connection_pool: AsyncConnectionPool, create_empty_table) -> None:
+    repo = PSQLRepo(pool=async_connection_pool, db_name="test_db")
+    article_id = await insert_new_article_service(make_article(title="Backfilled title about canals"), repo, Model.MINI_LM)
+    [row] = await repo.select_articles_missing_embeddings(Model.MP_NET, after_id=article_id - 1, limit=1)
+
+    await patch_article_service(article_id, ArticlePatch(title="Edited title about bridges"), repo, Model.MINI_LM)
+    stale_embeddings = tuple(np.ones(768, dtype=np.float32) for _ in EmbeddingField)
+
+    assert await repo.update_article_embeddings(Model.MP_NET, [(row[0], row[4], tuple(row[1:4]), stale_embeddings)]) == []
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services import chunks_services, encoding_services
+
+
+class FakeEncoder:
+    """Records every batch it encodes and embeds each text as its length, repeated ``dimensions`` times."""
+
+    def __init__(self, dimensions: int = 1, fail: bool = False) -> None:
+        self.calls: list[list[str]] = []
+        self.dimensions = dimensions
+        self.fail = fail
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(texts)
+        if self.fail:
+            raise RuntimeError("out of memory")
+        return np.array([[float(len(text))] * self.dimensions for text in texts], dtype=np.float32)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def encoders(monkeypatch) -> dict[Model, FakeEncoder]:
+    """One ``FakeEncoder`` per model, returned by ``get_encoder`` wherever the services encode."""
+    encoders = {model: FakeEncoder() for model in Model}
+    for module in (encoding_services, chunks_services):
+        monkeypatch.setattr(module, "get_encoder", encoders.__getitem__)
+    return encoders
+
+
+@pytest.fixture
+def encoder(encoders: dict[Model, FakeEncoder]) -> FakeEncoder:
+    return encoders[Model.MINI_LM]
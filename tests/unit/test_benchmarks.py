@@ -0,0 +1,52 @@
+import numpy as np
+
+from semantic_search_service.domain.articles import EmbeddingField
+from tests.benchmarks.compare import compare
+from tests.benchmarks.corpus import ExactTopK, SyntheticCorpus, recall_at_k
+from tests.benchmarks.run import parse_index, scan_settings
+
+
+def test_streaming_ground_truth_matches_brute_force() -> None:
+    corpus = SyntheticCorpus(size=250, dimensions=16, clusters=5, batch_size=64)
+    queries = corpus.queries(8)
+    ground_truth = ExactTopK(queries, k=5)
+    batches = list(corpus.iter_embedding_batches(EmbeddingField.BODY))
+    for embeddings in batches:
+        ground_truth.add(embeddings)
+
+    scores = queries @ np.concatenate(batches).T
+    expected = (np.argsort(-scores, axis=1, kind="stable")[:, :5] + 1).tolist()
+    assert ground_truth.neighbours() == expected
+    assert recall_at_k(expected, ground_truth.neighbours()) == 1.0
+
+
+def test_corpus_is_reproducible() -> None:
+    first = [batch[0].title for batch in SyntheticCorpus(size=10, dimensions=8, batch_size=4).iter_article_batches()]
+    second = [batch[0].title for batch in SyntheticCorpus(size=10, dimensions=8, batch_size=4).iter_article_batches()]
+
+    assert first == second
+    assert len(first) == 3
+
+
+def test_compare_flags_latency_regressions() -> None:
+    def results(p95: float) -> dict:
+        search = {
+            "index": {"method": "hnsw", "m": 16}, "scan": {"ef_search": 40}, "concurrency": 8, "k": 10,
+            "recall_at_10": 0.95, "queries_per_second": 100.0, "latency_ms": {"p50": 5.0, "p95": p95, "p99": 20.0},
+        }
+        return {"runs": [{"size": 1000, "ingest": {"articles_per_second": 5000.0}, "searches": [search]}]}
+
+    lines, regressed = compare(results(10.0), results(12.0), threshold=10)
+
+    assert regressed
+    assert any("1000 hnsw m=16 ef_search=40 x8 latency_ms p95" in line and "REGRESSION" in line for line in lines)
+
+
+def test_quantized_indexes_sweep_rerank_candidates() -> None:
+    index = parse_index("hnsw:m=16,quantization=binary")
+
+    assert index == {"method": "hnsw", "m": 16, "quantization": "binary"}
+    assert scan_settings(index, ef_search=[40], probes=[1], candidates=[50, 200]) == [
+        {"ef_search": 40, "candidates": 50}, {"ef_search": 40, "candidates": 200}
+    ]
+    assert scan_settings(parse_index("ivfflat:lists=10"), [40], [1], [50]) == [{"probes": 1}]
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from semantic_search_service.adapters.cache import SearchResultCache
+from semantic_search_service.domain.articles import Article, ArticlePatchItem, ArticlePatchWithEmbeddings, \
+    BulkItemStatus, content_hash
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services import articles_services
+from semantic_search_service.services.articles_services import insert_articles_service, patch_articles_service
+
+
+class FakeRepo:
+    def __init__(self, stored: dict[int, Article] | None = None) -> None:
+        self.stored = stored or {}
+        self.inserted: list = []
+        self.patched: dict[int, ArticlePatchWithEmbeddings] = {}
+
+    async def select_embeddings_by_hash(self, model: Model, hashes: list[str]) -> dict[str, np.ndarray]:
+        return {}
+
+    async def insert_articles(self, articles: list, model: Model, enqueue_embeddings: bool = False) -> list[int]:
+        self.inserted.extend(articles)
+        return list(range(1, len(articles) + 1))
+
+    async def select_content_hashes_by_ids(self, article_ids: list[int]) -> dict[int, dict[str, str]]:
+        return {
+            article_id: {_field: content_hash(getattr(article, _field)) for _field in ("title", "excerpt", "body")}
+            for article_id, article in self.stored.items()
+            if article_id in article_ids
+        }
+
+    async def patch_articles(
+        self, patches: dict[int, ArticlePatchWithEmbeddings], model: Model, enqueue_embeddings: bool = False
+    ) -> dict[int, Article]:
+        self.patched.update(patches)
+        return {
+            article_id: self.stored[article_id].model_copy(
+                update=patch.model_dump(include={"title", "body"}, exclude_none=True)
+            )
+            for article_id, patch in patches.items()
+        }
+
+
+def make_article(title: str, body: str) -> Article:
+    return Article(title=title, excerpt="excerpt", body=body, created_at=None, updated_at=None)
+
+
+@pytest.fixture
+def synced_chunks(monkeypatch) -> list[list[tuple[int, str]]]:
+    synced = []
+
+    async def sync_article_chunks(repo: FakeRepo, model: Model, bodies: list[tuple[int, str]]) -> int:
+        synced.append(bodies)
+        return len(bodies)
+
+    monkeypatch.setattr(articles_services, "sync_article_chunks", sync_article_chunks)
+    return synced
+
+
+@pytest.mark.anyio
+async def test_bulk_insert_encodes_the_whole_batch_at_once(encoder, synced_chunks) -> None:
+    articles = [make_article(f"title {index}", "b" * index) for index in range(1, 4)]
+    repo = FakeRepo()
+    cache = SearchResultCache()
+
+    results = await insert_articles_service(articles, repo, Model.MINI_LM, cache)
+
+    assert len(encoder.calls) == 1
+    assert encoder.calls[0][:3] == ["title 1", "excerpt", "b"]
+    assert repo.inserted[2].body_embedding.tolist() == [3.0]
+    assert [(result.id, result.status) for result in results] == [(_id, BulkItemStatus.CREATED) for _id in (1, 2, 3)]
+    assert synced_chunks == [[(1, "b"), (2, "bb"), (3, "bbb")]]
+    assert cache.generation == 1
+
+
+@pytest.mark.anyio
+async def test_bulk_patch_only_encodes_changed_texts(encoder, synced_chunks) -> None:
+    repo = FakeRepo({
+        1: make_article("same", "old body"),
+        2: make_article("old title", "body"),
+    })
+    patches = [
+        ArticlePatchItem(id=1, title="same", body="new body"),
+        ArticlePatchItem(id=2, title="new title"),
+        ArticlePatchItem(id=3, title="missing"),
+    ]
+
+    results = await patch_articles_service(patches, repo, Model.MINI_LM)
+
+    assert encoder.calls == [["new body", "new title"]]
+    assert repo.patched[1].title is None
+    assert repo.patched[2].title_embedding.tolist() == [9.0]
+    assert [result.status for result in results] == [
+        BulkItemStatus.UPDATED, BulkItemStatus.UPDATED, BulkItemStatus.NOT_FOUND
+    ]
+    assert synced_chunks == [[(1, "new body")]]
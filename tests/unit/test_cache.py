@@ -0,0 +1,77 @@
+import numpy as np
+
+from semantic_search_service.adapters.cache import EmbeddingCache, SearchResultCache, normalize_query
+from semantic_search_service.domain.search import SearchPage, SearchResult
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_embedding(value: float = 1.0) -> np.ndarray:
+    return np.full(384, value, dtype=np.float32)
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", make_embedding())
+    cache.put("b", make_embedding())
+    cache.get("a")
+    cache.put("c", make_embedding())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats().evictions == 1
+
+
+def test_expired_entries_are_misses() -> None:
+    clock = FakeClock()
+    cache = EmbeddingCache(ttl_seconds=10, clock=clock)
+    cache.put("a", make_embedding())
+
+    clock.now = 11
+
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations, stats.entries) == (0, 1, 1, 0)
+
+
+def test_memory_cap_bounds_cache_size() -> None:
+    embedding_size = make_embedding().nbytes
+    cache = EmbeddingCache(max_bytes=embedding_size * 3)
+    for key in range(10):
+        cache.put(key, make_embedding())
+
+    stats = cache.stats()
+    assert stats.size_bytes <= embedding_size * 3
+    assert stats.entries < 3
+
+
+def test_normalize_query_ignores_case_and_spacing() -> None:
+    assert normalize_query("  Global   Economy\n") == normalize_query("global economy")
+
+
+def test_search_results_computed_before_a_write_are_not_cached() -> None:
+    cache = SearchResultCache()
+    generation = cache.generation
+    cache.invalidate()
+
+    cache.put("query", SearchPage(results=[SearchResult(id=1, score=0.9, title="article title")]), generation)
+
+    assert cache.get("query") is None
+
+
+def test_invalidate_drops_cached_search_results() -> None:
+    cache = SearchResultCache()
+    page = SearchPage(results=[SearchResult(id=1, score=0.9, title="article title")])
+    cache.put("query", page, cache.generation)
+    assert cache.get("query") == page
+    assert cache.get("query").results[0].model_fields_set == {"id", "score", "title"}
+
+    cache.invalidate()
+
+    assert cache.get("query") is None
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from tests.unit.conftest import FakeEncoder
+from semantic_search_service import settings
+from semantic_search_service.domain.articles import content_hash
+from semantic_search_service.domain.chunks import chunk_text
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services.chunks_services import sync_article_chunks
+
+
+def test_chunks_overlap_and_cover_every_word() -> None:
+    text = " ".join(f"w{index}" for index in range(10))
+
+    assert chunk_text(text, size=4, overlap=1) == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+
+
+def test_short_and_empty_texts() -> None:
+    assert chunk_text("just three words", size=4, overlap=1) == ["just three words"]
+    assert chunk_text("  ", size=4, overlap=1) == []
+
+
+class FakeChunkRepo:
+    def __init__(self, stored: list[tuple[int, str, np.ndarray]]) -> None:
+        self.stored = stored
+        self.upserted: list[tuple] = []
+        self.chunk_counts: dict[int, int] = {}
+
+    async def select_chunk_embeddings(self, model: Model, article_ids: list[int]) -> list[tuple[int, str, np.ndarray]]:
+        return [row for row in self.stored if row[0] in article_ids]
+
+    async def upsert_article_chunks(self, model: Model, chunks: list[tuple], chunk_counts: dict[int, int]) -> None:
+        self.upserted, self.chunk_counts = chunks, chunk_counts
+
+
+@pytest.mark.anyio
+async def test_only_changed_chunks_are_encoded(monkeypatch, encoder: FakeEncoder) -> None:
+    monkeypatch.setattr(settings, "CHUNK_SIZE_WORDS", 2)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP_WORDS", 0)
+    encoder.dimensions = 384
+    stored_embedding = np.zeros(384, dtype=np.float32)
+    repo = FakeChunkRepo(stored=[(1, content_hash("a b"), stored_embedding), (1, content_hash("c d"), stored_embedding)])
+
+    encoded = await sync_article_chunks(repo, Model.MINI_LM, [(1, "a b c e f")])
+
+    assert encoded == 2
+    assert encoder.calls == [["c e", "f"]]
+    assert [(position, chunk) for _, position, _, chunk, _ in repo.upserted] == [(0, "a b"), (1, "c e"), (2, "f")]
+    assert repo.upserted[0][4] is stored_embedding
+    assert repo.chunk_counts == {1: 3}
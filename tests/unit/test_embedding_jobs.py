@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from tests.unit.conftest import FakeEncoder
+from semantic_search_service.adapters.cache import SearchResultCache
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services import embedding_jobs_services
+from semantic_search_service.services.embedding_jobs_services import process_embedding_jobs
+
+
+class FakeRepo:
+    def __init__(self, jobs: list[dict]) -> None:
+        self.jobs = jobs
+        self.completed: dict[Model, list[tuple]] = {}
+        self.failed: list[int] = []
+
+    async def claim_embedding_jobs(self, limit: int, lease_seconds: float, max_attempts: int) -> list[dict]:
+        claimed, self.jobs = self.jobs[:limit], self.jobs[limit:]
+        return claimed
+
+    async def select_embeddings_by_hash(self, model: Model, hashes: list[str]) -> dict[str, np.ndarray]:
+        return {}
+
+    async def complete_embedding_jobs(self, model: Model, embeddings: list[tuple]) -> list[int]:
+        self.completed.setdefault(model, []).extend(embeddings)
+        return [article_id for _, article_id, *_ in embeddings]
+
+    async def fail_embedding_jobs(self, job_ids: list[int], error: str, max_attempts: int) -> None:
+        self.failed.extend(job_ids)
+
+
+def make_job(job_id: int, model: Model) -> dict:
+    return {
+        "id": job_id,
+        "article_id": job_id * 10,
+        "model": str(model),
+        "title": "t" * job_id,
+        "excerpt": "e",
+        "body": "body",
+        "updated_at": datetime(2024, 1, 1),
+    }
+
+
+@pytest.fixture
+def synced_chunks(monkeypatch) -> list[tuple[Model, list[tuple[int, str]]]]:
+    synced = []
+
+    async def sync_article_chunks(repo: FakeRepo, model: Model, bodies: list[tuple[int, str]]) -> int:
+        synced.append((model, bodies))
+        return len(bodies)
+
+    monkeypatch.setattr(embedding_jobs_services, "sync_article_chunks", sync_article_chunks)
+    return synced
+
+
+@pytest.mark.anyio
+async def test_claimed_jobs_are_encoded_once_per_model(encoders: dict[Model, FakeEncoder], synced_chunks) -> None:
+    repo = FakeRepo([make_job(1, Model.MP_NET), make_job(2, Model.MINI_LM), make_job(3, Model.MINI_LM)])
+    cache = SearchResultCache()
+
+    assert await process_embedding_jobs(repo, batch_size=10, result_cache=cache) == 3
+
+    assert encoders[Model.MINI_LM].calls == [["tt", "e", "body", "ttt"]]
+    job_id, article_id, _, title_embedding, *_ = repo.completed[Model.MINI_LM][1]
+    assert (job_id, article_id, title_embedding.tolist()) == (3, 30, [3.0])
+    assert [job[0] for job in repo.completed[Model.MP_NET]] == [1]
+    assert cache.generation == 1
+    assert synced_chunks == [(Model.MINI_LM, [(20, "body"), (30, "body")]), (Model.MP_NET, [(10, "body")])]
+
+
+@pytest.mark.anyio
+async def test_jobs_of_a_failing_model_are_released(encoders: dict[Model, FakeEncoder], synced_chunks) -> None:
+    encoders[Model.MINI_LM].fail = True
+    repo = FakeRepo([make_job(1, Model.MP_NET), make_job(2, Model.MINI_LM)])
+
+    await process_embedding_jobs(repo, batch_size=10)
+
+    assert repo.failed == [2]
+    assert list(repo.completed) == [Model.MP_NET]
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from semantic_search_service.adapters.encoder import BatchEncoder
+
+
+class FakeModel:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        self.batches.append(list(texts))
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_are_encoded_in_one_batch() -> None:
+    model = FakeModel()
+    encoder = BatchEncoder(model, max_batch_size=64, max_wait_ms=20)
+
+    single, many = await asyncio.gather(encoder.encode("a"), encoder.encode(["bb", "ccc"]))
+    await encoder.close()
+
+    assert model.batches == [["a", "bb", "ccc"]]
+    assert single.tolist() == [1.0]
+    assert many.tolist() == [[2.0], [3.0]]
+
+
+@pytest.mark.anyio
+async def test_full_batch_is_dispatched_without_waiting() -> None:
+    model = FakeModel()
+    encoder = BatchEncoder(model, max_batch_size=2, max_wait_ms=10_000)
+
+    result = await asyncio.wait_for(encoder.encode(["a", "b"]), timeout=1)
+    await encoder.close()
+
+    assert result.shape == (2, 1)
+    assert model.batches == [["a", "b"]]
+
+
+@pytest.mark.anyio
+async def test_lazy_model_is_loaded_in_the_worker_pool() -> None:
+    model = FakeModel()
+    loaded_in: list[str] = []
+
+    def load_model() -> FakeModel:
+        loaded_in.append(threading.current_thread().name)
+        return model
+
+    encoder = BatchEncoder(load_model=load_model, max_wait_ms=1)
+    await asyncio.gather(encoder.encode("a"), encoder.encode("bb"))
+    await encoder.encode("ccc")
+    await encoder.close()
+
+    assert len(loaded_in) == 1 and loaded_in[0].startswith("encoder")
+    assert model.batches == [["a", "bb"], ["ccc"]]
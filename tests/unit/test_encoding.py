@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from tests.unit.conftest import FakeEncoder
+from semantic_search_service.adapters.cache import EmbeddingCache
+from semantic_search_service.domain.articles import content_hash
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services.encoding_services import encode_article_texts
+
+
+class FakeRepo:
+    def __init__(self, stored: dict[str, np.ndarray]) -> None:
+        self.stored = stored
+        self.lookups: list[list[str]] = []
+
+    async def select_embeddings_by_hash(self, model: Model, hashes: list[str]) -> dict[str, np.ndarray]:
+        self.lookups.append(hashes)
+        return {_hash: self.stored[_hash] for _hash in hashes if _hash in self.stored}
+
+
+@pytest.mark.anyio
+async def test_identical_texts_are_encoded_once(encoder: FakeEncoder) -> None:
+    embeddings = await encode_article_texts(["boilerplate", "title", "boilerplate"], Model.MINI_LM)
+
+    assert encoder.calls == [["boilerplate", "title"]]
+    assert [embedding.tolist() for embedding in embeddings] == [[11.0], [5.0], [11.0]]
+
+
+@pytest.mark.anyio
+async def test_stored_and_cached_embeddings_are_reused(encoder: FakeEncoder) -> None:
+    stored = np.array([42.0], dtype=np.float32)
+    repo = FakeRepo({content_hash("already stored"): stored})
+    cache = EmbeddingCache()
+
+    first = await encode_article_texts(["already stored", "new text"], Model.MINI_LM, repo, cache)
+    second = await encode_article_texts(["new text"], Model.MINI_LM, repo, cache)
+
+    assert first[0] is stored
+    assert encoder.calls == [["new text"]]
+    assert second[0].tolist() == [8.0]
+    assert len(repo.lookups) == 1
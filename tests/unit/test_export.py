@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import SearchMode, SearchOptions, UnsupportedSearchMode
+from semantic_search_service.services.export_services import decode_embedding, export_search_service, to_ndjson
+
+
+async def chunks(*chunked_rows: list[dict]):
+    for rows in chunked_rows:
+        yield rows
+
+
+@pytest.mark.anyio
+async def test_each_chunk_becomes_one_block_of_ndjson_lines() -> None:
+    created_at = datetime(2024, 5, 1, 12, 30)
+    rows = [{"id": index, "title": f"title {index}", "created_at": created_at} for index in range(3)]
+
+    blocks = [block async for block in to_ndjson(chunks(rows[:2], rows[2:]))]
+
+    assert len(blocks) == 2
+    lines = "".join(blocks).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": index, "title": f"title {index}", "created_at": "2024-05-01T12:30:00"} for index in range(3)
+    ]
+
+
+@pytest.mark.anyio
+async def test_embeddings_are_exported_as_base64_float32() -> None:
+    embedding = np.linspace(-1, 1, 384, dtype=np.float32)
+
+    [block] = [block async for block in to_ndjson(chunks([{"id": 1, "body_embedding": embedding}]))]
+
+    np.testing.assert_array_equal(decode_embedding(json.loads(block)["body_embedding"]), embedding)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", [SearchMode.MULTI_FIELD, SearchMode.HYBRID, SearchMode.CHUNKS])
+async def test_search_export_rejects_modes_it_cannot_page_through(mode: SearchMode) -> None:
+    with pytest.raises(UnsupportedSearchMode, match=str(mode)):
+        await export_search_service("query", Model.MINI_LM, repo=None, options=SearchOptions(mode=mode), limit=10)
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+from semantic_search_service.domain.models import Model
+from semantic_search_service.services import ingestion_services
+from semantic_search_service.services.ingestion_services import ingest_articles, iter_articles_from_file, \
+    iter_articles_from_json, iter_batches
+
+
+@pytest.fixture
+def raw_articles() -> list[dict[str, str]]:
+    return [
+        {"title": f"title {index}", "excerpt": "excerpt with [brackets], and commas", "body": "body " * index}
+        for index in range(25)
+    ]
+
+
+def test_json_array_is_read_across_chunk_boundaries(tmp_path, raw_articles) -> None:
+    path = tmp_path / "articles.json"
+    path.write_text(json.dumps(raw_articles, indent=2), encoding="utf-8")
+
+    assert list(iter_articles_from_json(path, chunk_size=7)) == raw_articles
+
+
+def test_jsonl_file_is_read_line_by_line(tmp_path, raw_articles) -> None:
+    path = tmp_path / "articles.jsonl"
+    path.write_text("\n".join(json.dumps(article) for article in raw_articles) + "\n", encoding="utf-8")
+
+    assert list(iter_articles_from_file(path)) == raw_articles
+
+
+def test_batches_are_bounded(raw_articles) -> None:
+    batches = list(iter_batches(raw_articles, 10))
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+class SlowCopyRepo:
+    def __init__(self) -> None:
+        self.copy_started = asyncio.Event()
+        self.copy_cancelled = False
+
+    async def copy_articles(self, articles: list, model: Model) -> int:
+        self.copy_started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.copy_cancelled = True
+            raise
+        return len(articles)
+
+
+@pytest.mark.anyio
+async def test_failed_encode_cancels_the_pending_copy(monkeypatch, raw_articles) -> None:
+    repo = SlowCopyRepo()
+
+    encoded_batches = 0
+
+    async def encode_articles(batch, model, repo_, embedding_cache=None):
+        nonlocal encoded_batches
+        encoded_batches += 1
+        if encoded_batches == 1:
+            return batch
+        # Fail while the first batch's COPY is running
+        await repo.copy_started.wait()
+        raise RuntimeError("encoder crashed")
+
+    monkeypatch.setattr(ingestion_services, "encode_articles", encode_articles)
+
+    with pytest.raises(RuntimeError, match="encoder crashed"):
+        await ingest_articles(raw_articles, repo, Model.MINI_LM, batch_size=10)
+    assert repo.copy_cancelled
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from semantic_search_service.adapters.memory_repo import InMemoryVectorIndex, wait_until_loaded
+from semantic_search_service.domain.articles import EmbeddingField
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import SearchOptions, encode_cursor
+
+rng = np.random.default_rng(0)
+
+
+def make_row(article_id: int, embedding: np.ndarray | None = None, created_at: datetime | None = None) -> dict:
+    embedding = rng.standard_normal(384).astype(np.float32) if embedding is None else embedding
+    return {
+        "id": article_id,
+        "title": f"title {article_id}",
+        "excerpt": "excerpt",
+        "body": "body",
+        "created_at": created_at or datetime(2024, 1, 1),
+        "updated_at": datetime(2024, 1, 1),
+        **{_field.column(Model.MINI_LM): embedding for _field in EmbeddingField},
+    }
+
+
+async def make_index(rows: list[dict]) -> InMemoryVectorIndex:
+    index = InMemoryVectorIndex([Model.MINI_LM])
+    await index.apply([row["id"] for row in rows], rows)
+    index.loaded.set()
+    return index
+
+
+@pytest.mark.anyio
+async def test_search_matches_brute_force_and_pages_by_cursor() -> None:
+    rows = [make_row(article_id) for article_id in range(1, 2001)]
+    index = await make_index(rows)
+    query = rng.standard_normal(384).astype(np.float32)
+
+    embeddings = np.array([row["mini_lm_body_embedding"] for row in rows])
+    similarities = embeddings @ query / np.linalg.norm(embeddings, axis=1) / np.linalg.norm(query)
+    expected = [rows[position]["id"] for position in np.argsort(-similarities)[:20]]
+
+    first = await index.search(query, Model.MINI_LM, SearchOptions(limit=10, fields="title"))
+    cursor = encode_cursor(first[-1]["distance"], first[-1]["id"])
+    second = await index.search(query, Model.MINI_LM, SearchOptions(limit=10, cursor=cursor))
+
+    assert [row["id"] for row in first + second] == expected
+    assert first[0]["title"] == f"title {expected[0]}"
+    assert first[0]["score"] == pytest.approx(similarities.max(), abs=1e-5)
+
+
+@pytest.mark.anyio
+async def test_filters_deletes_and_updates_are_applied() -> None:
+    query = np.ones(384, dtype=np.float32)
+    index = await make_index([
+        make_row(1, embedding=query, created_at=datetime(2023, 1, 1)),
+        make_row(2, embedding=query * 0.5),
+        make_row(3, embedding=-query),
+    ])
+
+    filtered = await index.search(query, Model.MINI_LM, SearchOptions(created_after=datetime(2023, 6, 1)))
+    await index.apply([2, 3], [make_row(3, embedding=query)])
+    updated = await index.search(query, Model.MINI_LM, SearchOptions())
+
+    assert [row["id"] for row in filtered] == [2, 3]
+    assert [row["id"] for row in updated] == [1, 3]
+    assert index.size == 2
+
+
+@pytest.mark.anyio
+async def test_updates_leave_the_copy_searches_are_reading_untouched() -> None:
+    query = np.ones(384, dtype=np.float32)
+    index = await make_index([make_row(1, embedding=query), make_row(2, embedding=-query)])
+    searched = index._snapshot()
+
+    await index.apply([1, 2], [make_row(2, embedding=query)])
+
+    assert searched.size == 2
+    assert searched.ids[:2].tolist() == [1, 2]
+    assert searched.matrices[(Model.MINI_LM, EmbeddingField.BODY)][1] @ query < 0
+    assert [row["id"] for row in await index.search(query, Model.MINI_LM, SearchOptions())] == [2]
+
+
+@pytest.mark.anyio
+async def test_startup_raises_when_the_index_sync_fails_or_hangs() -> None:
+    async def failing_sync() -> None:
+        raise ConnectionError("database is down")
+
+    stop = asyncio.Event()
+    with pytest.raises(ConnectionError, match="database is down"):
+        await wait_until_loaded(InMemoryVectorIndex([Model.MINI_LM]), asyncio.create_task(failing_sync()), stop)
+    assert stop.is_set()
+
+    hanging_sync = asyncio.create_task(asyncio.Event().wait())
+    with pytest.raises(TimeoutError):
+        await wait_until_loaded(InMemoryVectorIndex([Model.MINI_LM]), hanging_sync, asyncio.Event(), timeout=0.01)
+    await asyncio.sleep(0)
+    assert hanging_sync.cancelled()
+
+    loaded = InMemoryVectorIndex([Model.MINI_LM])
+    loaded.loaded.set()
+    running_sync = asyncio.create_task(asyncio.Event().wait())
+    await wait_until_loaded(loaded, running_sync, asyncio.Event())
+    assert not running_sync.done()
+    running_sync.cancel()
@@ -0,0 +1,34 @@
+from semantic_search_service.adapters.metrics import Histogram, record_stage, request_timings, timed
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("stage_seconds", "Stage durations.", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="encode")
+    histogram.observe(0.5, stage="encode")
+    histogram.observe(5, stage="encode")
+
+    lines = histogram.render().splitlines()
+
+    assert lines[:2] == ["# HELP stage_seconds Stage durations.", "# TYPE stage_seconds histogram"]
+    assert lines[2:] == [
+        'stage_seconds_bucket{stage="encode",le="0.1"} 1',
+        'stage_seconds_bucket{stage="encode",le="1.0"} 2',
+        'stage_seconds_bucket{stage="encode",le="+Inf"} 3',
+        'stage_seconds_sum{stage="encode"} 5.55',
+        'stage_seconds_count{stage="encode"} 3',
+    ]
+
+
+def test_stages_are_summed_into_the_request_timings() -> None:
+    timings: dict[str, float] = {}
+    token = request_timings.set(timings)
+    try:
+        with timed("encode"):
+            pass
+        record_stage("db_execute", 0.25)
+        record_stage("db_execute", 0.5)
+    finally:
+        request_timings.reset(token)
+
+    assert set(timings) == {"encode", "db_execute"}
+    assert timings["db_execute"] == 0.75
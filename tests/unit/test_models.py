@@ -0,0 +1,11 @@
+from semantic_search_service import settings
+from semantic_search_service.domain.models import threads_per_worker
+
+
+def test_workers_split_the_cores_unless_threads_are_configured(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "MODEL_NUM_THREADS", None)
+    assert threads_per_worker(4, cpu_count=16) == 4
+    assert threads_per_worker(8, cpu_count=4) == 1
+
+    monkeypatch.setattr(settings, "MODEL_NUM_THREADS", 2)
+    assert threads_per_worker(4, cpu_count=16) == 2
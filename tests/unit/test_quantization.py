@@ -0,0 +1,59 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from psycopg import sql
+
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.domain.articles import EmbeddingField
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import IndexMethod, Quantization, SearchOptions
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    async def execute(self, query: sql.Composable) -> None:
+        self.queries.append(query.as_string(None))
+
+    async def commit(self) -> None:
+        pass
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.conn = FakeConnection()
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self.conn
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("quantization, expression", [
+    (Quantization.NONE, '("mini_lm_title_embedding" vector_cosine_ops)'),
+    (Quantization.HALFVEC, '(("mini_lm_title_embedding"::halfvec(384)) halfvec_cosine_ops)'),
+    (Quantization.BINARY, '((binary_quantize("mini_lm_title_embedding")::bit(384)) bit_hamming_ops)'),
+])
+async def test_quantized_indexes_are_built_over_the_compact_expression(quantization, expression) -> None:
+    pool = FakePool()
+    repo = PSQLRepo(pool, db_name="test")
+
+    await repo.create_embedding_index(Model.MINI_LM, EmbeddingField.TITLE, IndexMethod.HNSW, quantization=quantization)
+
+    assert f"USING hnsw {expression}" in pool.conn.queries[0]
+
+
+def test_quantized_search_reranks_candidates_at_full_precision() -> None:
+    repo = PSQLRepo(FakePool(), db_name="test", quantization=Quantization.BINARY)
+    options = SearchOptions(limit=10, candidates=40, fields="title")
+
+    query = repo._nearest_query(Model.MINI_LM, options, sql.Placeholder("embedding"), sql.SQL("")).as_string(None)
+
+    assert (
+        'ORDER BY (binary_quantize("mini_lm_body_embedding")::bit(384)) <~> '
+        '(binary_quantize(%(embedding)s)::bit(384)), id LIMIT GREATEST(%(candidates)s, %(limit)s)'
+    ) in query
+    assert query.startswith('SELECT id, "mini_lm_body_embedding" <=> %(embedding)s AS distance, "title"')
+    assert query.endswith("ORDER BY distance, id LIMIT %(limit)s")
+    assert repo._scan_size(options) == 40
@@ -0,0 +1,136 @@
+from contextlib import asynccontextmanager
+
+import psycopg
+import pytest
+from psycopg_pool import PoolTimeout
+
+from semantic_search_service.adapters.psql_repo import PSQLRepo
+from semantic_search_service.adapters.replicas import PRIMARY_LSN_QUERY, ClientWrites, ReplicaPools, \
+    client_writes, parse_lsn
+
+
+class FakeCursor:
+    def __init__(self, row: tuple) -> None:
+        self.row = row
+
+    async def fetchone(self) -> tuple:
+        return self.row
+
+
+class FakePool:
+    def __init__(self, name: str, lag: float | None = 0.0, lsn: str = "0/0") -> None:
+        self.name = name
+        # None makes every connection attempt fail
+        self.lag = lag
+        self.lsn = lsn
+
+    @asynccontextmanager
+    async def connection(self):
+        if self.lag is None:
+            raise PoolTimeout(f"couldn't get a connection to {self.name}")
+        yield self
+
+    async def execute(self, query: str, params: dict | None = None) -> FakeCursor:
+        # The primary's WAL position, or the replica's lag and replayed position
+        if query == PRIMARY_LSN_QUERY:
+            return FakeCursor((self.lsn,))
+        return FakeCursor((self.lag, self.lsn))
+
+
+class UnreplayedPool(FakePool):
+    """A reachable replica that hasn't replayed a transaction yet, whose lag query returns NULL."""
+
+    async def execute(self, query: str, params: dict | None = None) -> FakeCursor:
+        return FakeCursor((None, None))
+
+
+def test_reads_rotate_over_healthy_replicas() -> None:
+    primary, first, second = FakePool("primary"), FakePool("first"), FakePool("second")
+    replicas = ReplicaPools(primary, [first, second])
+
+    assert [replicas.read_pool() for _ in range(4)] == [first, second, first, second]
+    replicas.mark_unhealthy(first)
+    assert [replicas.read_pool() for _ in range(2)] == [second, second]
+    replicas.mark_unhealthy(second)
+    assert replicas.read_pool() is primary
+
+
+@pytest.mark.anyio
+async def test_a_client_reads_its_writes_from_replicas_that_replayed_them() -> None:
+    primary, behind, caught_up = FakePool("primary", lsn="0/300"), FakePool("behind"), FakePool("caught_up")
+    replicas = ReplicaPools(primary, [behind, caught_up])
+    behind.lsn, caught_up.lsn = "0/100", "0/300"
+    await replicas.check()
+
+    writer = ClientWrites()
+    token = client_writes.set(writer)
+    try:
+        replicas.mark_written("0/200")
+        assert writer.written == "0/200"
+        assert {replicas.read_pool() for _ in range(4)} == {caught_up}
+        caught_up.lsn = "0/100"
+        await replicas.check()
+        assert replicas.read_pool() is primary
+    finally:
+        client_writes.reset(token)
+
+    # Clients that didn't write keep reading from every healthy replica
+    token = client_writes.set(ClientWrites())
+    try:
+        assert {replicas.read_pool() for _ in range(4)} == {behind, caught_up}
+    finally:
+        client_writes.reset(token)
+
+
+def test_lsns_compare_as_wal_positions() -> None:
+    assert parse_lsn("1/0") > parse_lsn("0/FFFFFFFF") > parse_lsn("0/A")
+
+
+@pytest.mark.anyio
+async def test_lagging_and_unreachable_replicas_are_taken_out_until_they_recover() -> None:
+    caught_up, lagging, down = FakePool("caught_up", 0.5), FakePool("lagging", 30.0), FakePool("down", None)
+    replicas = ReplicaPools(FakePool("primary"), [caught_up, lagging, down], max_lag_seconds=10)
+
+    await replicas.check()
+    assert replicas.unhealthy == {lagging, down}
+
+    lagging.lag = 1.0
+    await replicas.check()
+    assert replicas.unhealthy == {down}
+
+
+@pytest.mark.anyio
+async def test_replicas_keep_their_state_while_the_primary_is_unreachable() -> None:
+    primary, replica = FakePool("primary", None), FakePool("replica", 30.0)
+    replicas = ReplicaPools(primary, [replica], max_lag_seconds=10)
+
+    await replicas.check()
+    assert replicas.unhealthy == set()
+
+    primary.lag = 0.0
+    await replicas.check()
+    assert replicas.unhealthy == {replica}
+
+
+@pytest.mark.anyio
+async def test_replicas_without_a_replay_timestamp_are_unhealthy() -> None:
+    replica = UnreplayedPool("replica")
+    replicas = ReplicaPools(FakePool("primary"), [replica])
+
+    await replicas.check()
+    assert replicas.unhealthy == {replica}
+
+
+@pytest.mark.anyio
+async def test_reads_fall_back_to_the_primary_when_a_replica_is_unreachable() -> None:
+    primary, down = FakePool("primary"), FakePool("down", None)
+    repo = PSQLRepo(primary, db_name="test", replicas=ReplicaPools(primary, [down]))
+
+    async with repo._read_connection() as conn:
+        assert conn is primary
+    assert repo.replicas.unhealthy == {down}
+
+    primary.lag = None
+    with pytest.raises(psycopg.OperationalError):
+        async with repo._read_connection():
+            pass
@@ -0,0 +1,22 @@
+import pytest
+
+from semantic_search_service.domain.models import Model
+from semantic_search_service.domain.search import SearchMode, SearchOptions, UnsupportedSearchMode, encode_cursor
+from semantic_search_service.services.search_services import batch_semantic_search_service, semantic_search_service
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", [SearchMode.MULTI_FIELD, SearchMode.HYBRID, SearchMode.CHUNKS])
+async def test_cursors_are_rejected_by_modes_that_cannot_page(mode: SearchMode) -> None:
+    options = SearchOptions(mode=mode, cursor=encode_cursor(0.25, 7))
+
+    with pytest.raises(UnsupportedSearchMode, match=str(mode)):
+        await semantic_search_service("query", Model.MINI_LM, repo=None, options=options)
+
+
+@pytest.mark.anyio
+async def test_batch_searches_reject_cursors() -> None:
+    options = SearchOptions(cursor=encode_cursor(0.25, 7))
+
+    with pytest.raises(UnsupportedSearchMode):
+        await batch_semantic_search_service(["query"], Model.MINI_LM, repo=None, options=options)